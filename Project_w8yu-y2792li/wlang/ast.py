@@ -51,7 +51,8 @@ class StmtList(Ast):
 class Stmt(Ast):
     """A single statement"""
 
-    pass
+    # source line of the statement, set by the parser
+    line = None
 
 
 class SkipStmt(Stmt):
@@ -106,10 +107,12 @@ class IfStmt(Stmt):
 class WhileStmt(Stmt):
     """While statement"""
 
-    def __init__(self, cond, body, inv=None):
+    def __init__(self, cond, body, inv=None, bound=None):
         self.cond = cond
         self.body = body
         self.inv = inv
+        # number of iterations to unroll, overrides that of the engine
+        self.bound = bound
 
     def __eq__(self, other):
         return (
@@ -117,6 +120,7 @@ class WhileStmt(Stmt):
             and self.cond == other.cond
             and self.body == other.body
             and self.inv == other.inv
+            and self.bound == other.bound
         )
 
 
@@ -260,7 +264,7 @@ def parse_string(v, filename="<builit-in>"):
     import wlang.parser as parser
     import wlang.semantics as sem
 
-    p = parser.WhileLangParser(parseinfo=False)
+    p = parser.WhileLangParser(parseinfo=True)
     ast = p.parse(v, start="start", filename=filename, semantics=sem.WlangSemantics())
     return ast
 
@@ -455,6 +459,11 @@ class PrintVisitor(AstVisitor):
     def visit_WhileStmt(self, node, *args, **kwargs):
         self._write("while ")
         self.visit(node.cond, no_brkt=True)
+        if node.inv is not None:
+            self._write(" inv ")
+            self.visit(node.inv, no_brkt=True)
+        if node.bound is not None:
+            self._write(" bound {}".format(node.bound))
         self._write(" do")
         self._write("\n")
         self._indent(indent=kwargs["indent"] + 2)
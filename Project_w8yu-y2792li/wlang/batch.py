@@ -0,0 +1,274 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Runs the interpreter or the symbolic executor over a corpus of programs
+
+Jobs are distributed over a pool of worker processes. Every worker
+imports the parser and z3 once and caches parsed programs, so a job only
+pays for its own execution. Results are streamed as JSON lines in the
+order in which jobs finish.
+"""
+
+import io
+import json
+import os
+import signal
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout
+
+from . import ast
+
+MODES = ("int", "sym")
+
+# seconds past its deadline after which an interpreter job is stopped
+ALARM_GRACE = 1.0
+
+
+class Job(object):
+    """A single program run"""
+
+    def __init__(self, id, file, mode="int", inputs=None):
+        self.id = id
+        self.file = file
+        self.mode = mode
+        # inputs of the interpreter: a map from variable to the value of
+        # its havoc, or a list of havoc values in execution order
+        self.inputs = inputs
+
+    def to_json(self):
+        return {
+            "id": self.id,
+            "file": self.file,
+            "mode": self.mode,
+            "inputs": self.inputs,
+        }
+
+
+class JobTimeout(Exception):
+    """Raised inside a worker when a job runs out of time"""
+
+    pass
+
+
+# per-worker cache of parsed programs
+_programs = dict()
+
+
+def _init_worker():
+    # pay for the imports once per worker rather than once per job
+    import z3  # noqa: F401
+
+    from . import int, parser, semantics, sym  # noqa: F401
+
+
+def _parse(fname):
+    prg = _programs.get(fname)
+    if prg is None:
+        prg = ast.parse_file(fname)
+        _programs[fname] = prg
+    return prg
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeout()
+
+
+def _exec_int(prg, job, res, timeout, fuel):
+    from . import havoc, int
+
+    st = int.State()
+    provider = None
+    if isinstance(job.inputs, dict):
+        provider = havoc.NamedProvider(job.inputs)
+    elif job.inputs is not None:
+        provider = havoc.SequenceProvider(job.inputs)
+    interp = int.Interpreter(fuel=fuel, timeout=timeout, havoc=provider)
+    interp.compile(prg)
+    try:
+        interp.run_compiled(st)
+        res["status"] = "ok"
+    except AssertionError as e:
+        res["status"] = "assert"
+        res["error"] = str(e)
+    except int.BudgetExceeded as e:
+        res["status"] = "budget"
+        res["error"] = str(e)
+        res["reason"] = e.reason
+        res["line"] = e.line
+    res["env"] = {k: v for k, v in st.env.items()}
+
+
+def _exec_sym(prg, job, res, timeout):
+    import z3
+
+    from . import sym
+
+    solver = z3.Solver()
+    if timeout is not None:
+        # the timer signal is only handled once z3 returns control
+        solver.set("timeout", max(1, round(timeout * 1000)))
+    st = sym.SymState(sym.PathSolver(solver))
+    states = sym.SymExec().run(prg, st)
+    res["status"] = "ok"
+    res["states"] = [str(s) for s in states]
+
+
+def run_job(job, timeout=None, fuel=None):
+    """Runs a job in the current process, returns a JSON-able result
+
+    The interpreter checks timeout and fuel (number of loop iterations)
+    itself and reports a "budget" status with the partial state. A timer
+    signal stops everything else, with a "timeout" status. In sym mode
+    every solver query is limited to the timeout as well, as the signal
+    cannot interrupt z3.
+    """
+    res = job.to_json()
+    start = time.perf_counter()
+    out = io.StringIO()
+    use_alarm = timeout is not None and hasattr(signal, "setitimer")
+    if use_alarm:
+        alarm = timeout
+        if job.mode == "int":
+            # only a backstop, the interpreter checks its own deadline
+            alarm = timeout + ALARM_GRACE
+        old = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, alarm)
+    try:
+        with redirect_stdout(out):
+            prg = _parse(job.file)
+            if job.mode == "sym":
+                _exec_sym(prg, job, res, timeout)
+            else:
+                _exec_int(prg, job, res, timeout, fuel)
+    except JobTimeout:
+        res["status"] = "timeout"
+    except Exception as e:
+        res["status"] = "error"
+        res["error"] = "{}: {}".format(type(e).__name__, e)
+    finally:
+        if use_alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old)
+    res["time"] = time.perf_counter() - start
+    res["output"] = out.getvalue()
+    return res
+
+
+def run_jobs(jobs, workers=None, timeout=None, fuel=None):
+    """Runs jobs on a process pool, yields results as they complete"""
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker
+    ) as pool:
+        futures = [pool.submit(run_job, j, timeout, fuel) for j in jobs]
+        for f in as_completed(futures):
+            yield f.result()
+
+
+def load_jobs(source, mode="int", inputs_file=None):
+    """Creates jobs for a directory of .prg files or a JSONL manifest
+
+    Every manifest line is an object with a "file" and optionally a
+    "mode" and "inputs". An inputs file holds one input vector per line,
+    a JSON object of havoc values by variable or a JSON list of havoc
+    values in execution order; every program is run once with each of
+    them.
+    """
+    entries = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.endswith(".prg"):
+                entries.append({"file": os.path.join(source, name)})
+    else:
+        base = os.path.dirname(source)
+        with open(source) as f:
+            for line in f:
+                line = line.strip()
+                if len(line) == 0:
+                    continue
+                e = json.loads(line)
+                e["file"] = os.path.join(base, e["file"])
+                entries.append(e)
+
+    vectors = [None]
+    if inputs_file is not None:
+        with open(inputs_file) as f:
+            vectors = [json.loads(line) for line in f if line.strip()]
+
+    jobs = []
+    for e in entries:
+        if e.get("inputs") is not None:
+            e_vectors = [e["inputs"]]
+        else:
+            e_vectors = vectors
+        for v in e_vectors:
+            jobs.append(Job(len(jobs), e["file"], e.get("mode", mode), v))
+    return jobs
+
+
+def _parse_args():
+    import argparse
+
+    ap = argparse.ArgumentParser(
+        prog="batch", description="Run WLang programs in batch"
+    )
+    ap.add_argument(
+        "source", metavar="SOURCE", help="Directory of .prg files or JSONL manifest"
+    )
+    ap.add_argument("--mode", choices=MODES, default="int", help="Default engine")
+    ap.add_argument(
+        "--inputs", metavar="FILE", help="JSONL file of input vectors"
+    )
+    ap.add_argument(
+        "--jobs", "-j", type=int, default=None, help="Number of workers"
+    )
+    ap.add_argument(
+        "--timeout", type=float, default=None, help="Per-job timeout in seconds"
+    )
+    ap.add_argument(
+        "--fuel", type=int, default=None, help="Per-job limit on loop iterations"
+    )
+    ap.add_argument("--out", metavar="FILE", help="Write results to FILE")
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    jobs = load_jobs(args.source, args.mode, args.inputs)
+    out = sys.stdout
+    if args.out is not None:
+        out = open(args.out, "w")
+    try:
+        for res in run_jobs(jobs, args.jobs, args.timeout, args.fuel):
+            out.write(json.dumps(res))
+            out.write("\n")
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,535 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Micro-benchmarks for the WLang execution engines
+
+Run with python -m wlang.bench [NAME ...]
+"""
+
+import sys
+import time
+
+from . import ast, int, programs, vm
+
+# a loop-heavy program; N is replaced by the number of iterations
+LOOP_PRG = """
+x := 0; s := 0;
+while x < N do {
+  if x > 4 and not x = 7 then s := s + x * 2 else s := s - 1;
+  x := x + 1
+}
+"""
+
+
+def _time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        t = time.perf_counter() - start
+        if best is None or t < best:
+            best = t
+    return best
+
+
+def _report(name, base, t):
+    print("{:<24} {:10.6f}s  {:8.1f}x".format(name, t, base / t))
+
+
+def bench_compile(n=200, repeat=5):
+    """Tree-walking interpreter vs. closure-compiled programs"""
+    prg = ast.parse_string(LOOP_PRG.replace("N", str(n)))
+    interp = int.Interpreter()
+
+    base = _time(lambda: interp.run(prg, int.State()), repeat)
+    _report("visit_*", base, base)
+
+    interp.compile(prg)
+    t = _time(lambda: interp.run_compiled(int.State()), repeat)
+    _report("compiled", base, t)
+
+    code = vm.compile(prg)
+    t = _time(lambda: vm.run(code), repeat)
+    _report("vm", base, t)
+
+
+def bench_loop(n=100000):
+    """Loop throughput of the tree-walking and compiled interpreters"""
+    prg = ast.parse_string(LOOP_PRG.replace("N", str(n)))
+    interp = int.Interpreter()
+    interp.compile(prg)
+    code = vm.compile(prg)
+    for name, fn in [
+        ("visit_*", lambda: interp.run(prg, int.State())),
+        ("compiled", lambda: interp.run_compiled(int.State())),
+        ("vm", lambda: vm.run(code)),
+    ]:
+        t = _time(fn, 1)
+        print("{:<24} {:12.0f} iterations/sec".format(name, n / t))
+
+
+def bench_vec(n=10000):
+    """One compiled run per input vs. one vectorized run over all inputs"""
+    import numpy as np
+
+    from . import vec_int
+
+    prg = ast.parse_string("havoc x; y := 0; while x > 0 do { x := x - 1; y := y + 2 }")
+    body = ast.StmtList(prg.stmts[1:])
+    xs = np.random.default_rng(0).integers(0, 50, size=n)
+
+    interp = int.Interpreter()
+    interp.compile(body)
+
+    def _scalar():
+        for x in xs.tolist():
+            st = int.State()
+            st.env["x"] = x
+            interp.run_compiled(st)
+
+    base = _time(_scalar, 1)
+    _report("compiled x " + str(n), base, base)
+    t = _time(
+        lambda: vec_int.VecInterpreter().run(prg, vec_int.VecState(n, {"x": xs})), 1
+    )
+    _report("vectorized", base, t)
+
+
+def bench_cov(n=2000, repeat=5):
+    """Overhead of coverage instrumentation on compiled programs"""
+    from . import cov
+
+    prg = ast.parse_string(LOOP_PRG.replace("N", str(n)))
+    interp = int.Interpreter()
+    interp.compile(prg)
+    base = _time(lambda: interp.run_compiled(int.State()), repeat)
+    _report("compiled", base, base)
+
+    c = cov.Coverage(prg)
+    code = c.compile()
+    t = _time(lambda: c.run(int.State(), code), repeat)
+    _report("with coverage", base, t)
+
+
+def bench_trace(n=100000):
+    """Cost of recording a trace and of querying it"""
+    import os
+    import tempfile
+
+    from . import trace
+
+    prg = ast.parse_string(LOOP_PRG.replace("N", str(n)))
+    interp = int.Interpreter()
+    interp.compile(prg)
+    base = _time(lambda: interp.run_compiled(int.State()), 1)
+    _report("compiled", base, base)
+
+    fd, fname = tempfile.mkstemp(suffix=".trace")
+    os.close(fd)
+    try:
+        t = _time(lambda: trace.record(prg, int.State(), fname), 1)
+        _report("with trace", base, t)
+        with trace.Trace(fname) as tr:
+            t = _time(lambda: tr.last_value("s", len(tr) // 2), 1)
+            print("{:<24} {:10.6f}s  {} records".format("last value", t, len(tr)))
+    finally:
+        os.remove(fname)
+
+
+def _branch_prg(n):
+    """The program of programs.branch_prg(), parsed"""
+    return ast.parse_string(programs.branch_prg(n))
+
+
+def bench_sym(n=8, repeat=3):
+    """Fresh solver per fork vs. one shared solver, with and without a cache"""
+    import z3
+
+    from . import sym
+
+    class _ReplayState(sym.SymState):
+        # the original SymState: a fork re-asserts the whole path
+        def __init__(self, solver=None):
+            super(_ReplayState, self).__init__()
+            self._z3 = z3.Solver()
+
+        def add_pc(self, *exp):
+            self.path.extend(exp)
+            self._z3.append(exp)
+
+        def is_empty(self):
+            return self._z3.check() == z3.unsat
+
+        def fork(self):
+            child = _ReplayState()
+            child.env = dict(self.env)
+            child.add_pc(*self.path)
+            return (self, child)
+
+        def push(self):
+            self._saved_states.append((dict(self.env), list(self.path)))
+            self._z3.push()
+
+        def pop(self):
+            self.env, self.path = self._saved_states.pop()
+            self._z3.pop()
+
+    prg = _branch_prg(n)
+    base = _time(lambda: sym.SymExec().run(prg, _ReplayState()), repeat)
+    _report("replay on fork", base, base)
+    t = _time(
+        lambda: sym.SymExec().run(prg, sym.SymState(sym.PathSolver(cache=False))),
+        repeat,
+    )
+    _report("shared solver", base, t)
+    t = _time(lambda: sym.SymExec().run(prg, sym.SymState()), repeat)
+    _report("with query cache", base, t)
+
+
+def _independent_prg(n):
+    """N pairs of inputs with nonlinear branches that never interact"""
+    lines = ["havoc " + ", ".join("x{0}, y{0}".format(i) for i in range(n)) + ";"]
+    for i in range(n):
+        lines.append(
+            "if x{0} * x{0} + y{0} * y{0} > {1} then y{0} := y{0} * x{0} "
+            "else x{0} := x{0} - y{0};".format(i, 7 * i + 3)
+        )
+        lines.append(
+            "if x{0} * y{0} > {1} then x{0} := x{0} + 1 else skip;".format(i, i + 2)
+        )
+    lines.append("skip")
+    return ast.parse_string("\n".join(lines))
+
+
+def bench_slice(n=5, repeat=1):
+    """Whole path conditions vs. independent constraint groups"""
+    from . import sym
+
+    prg = _independent_prg(n)
+    base = None
+    for name, cache, slicing in [
+        ("whole path", False, False),
+        ("query cache", True, False),
+        ("sliced", False, True),
+        ("sliced and cache", True, True),
+    ]:
+
+        def _run():
+            solver = sym.PathSolver(cache=cache, slicing=slicing)
+            sym.SymExec().run(prg, sym.SymState(solver))
+
+        t = _time(_run, repeat)
+        if base is None:
+            base = t
+        _report(name, base, t)
+
+
+def bench_search(n=9):
+    """Time to first bug and peak worklist size of the search strategies"""
+    from . import sym, worklist
+
+    prg = ast.parse_string(programs.SEARCH_PRG.replace("N", str(n)))
+    print("{:<24} {:>10} {:>12} {:>10}".format("", "steps", "first error", "pending"))
+    for name in worklist.SCHEDULERS:
+        engine = worklist.WorklistExec(name, loop_bound=n + 1)
+        engine.run(prg, sym.SymState())
+        print(
+            "{:<24} {:>10} {:>12} {:>10}".format(
+                name, engine.steps, engine.first_error_step, engine.max_pending
+            )
+        )
+
+
+def bench_parallel(n=10, jobs=(1, 2, 4)):
+    """Scaling of parallel exploration with the number of workers"""
+    import os
+
+    from . import parallel
+
+    text = programs.branch_prg(n)
+    print("cpus:", os.cpu_count())
+    base = None
+    for j in jobs:
+        t = _time(lambda: parallel.ParallelExec(j).run(text), 1)
+        if base is None:
+            base = t
+        _report("jobs " + str(j), base, t)
+
+
+def bench_merge(ns=(4, 8, 12)):
+    """Final states and time with and without merging at if joins"""
+    from . import sym, worklist
+
+    print("{:<24} {:>10} {:>10}".format("", "states", "queries"))
+    for n in ns:
+        prg = _branch_prg(n)
+        res = []
+        for merge in (False, True):
+            engine = worklist.WorklistExec(merge=merge)
+            solver = sym.PathSolver()
+            t = _time(lambda: engine.run(prg, sym.SymState(solver)), 1)
+            res.append(t)
+            print(
+                "{:<24} {:>10} {:>10}".format(
+                    "n={} {}".format(n, "merge" if merge else "fork"),
+                    len(engine.states),
+                    solver.num_queries,
+                )
+            )
+        _report("n={} merge".format(n), res[0], res[1])
+
+
+def bench_states(n=2000, nvars=50, depth=200):
+    """Memory and time per live state: copied vs. persistent env and path"""
+    import tracemalloc
+
+    import z3
+
+    from . import sym
+
+    class _CopyState(sym.SymState):
+        # the SymState before persistent structures: a dict and a list
+        def __init__(self, solver=None):
+            super(_CopyState, self).__init__(solver)
+            self.env = dict()
+            self.path = list()
+
+        def fork(self):
+            child = _CopyState(self._solver)
+            child.env = dict(self.env)
+            child.path = list(self.path)
+            return (self, child)
+
+    xs = z3.Ints(" ".join("x{}".format(i) for i in range(nvars)))
+    conds = [x > i for i, x in enumerate(xs)]
+
+    def _live(cls):
+        root = cls()
+        for x in xs:
+            root.env[str(x)] = x
+        root.add_pc(*(conds[i % nvars] for i in range(depth)))
+        states = []
+        for i in range(n):
+            _, child = root.fork()
+            child.env["x0"] = xs[i % nvars]
+            child.add_pc(conds[i % nvars])
+            states.append(child)
+        return states
+
+    print("{:<24} {:>10}".format("", "bytes"))
+    times = []
+    for name, cls in (("dict and list", _CopyState), ("persistent", sym.SymState)):
+        tracemalloc.start()
+        states = _live(cls)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del states
+        print("{:<24} {:>10}".format(name, size // n))
+        times.append(_time(lambda: _live(cls), 3))
+    _report("fork persistent", times[0], times[1])
+
+
+def bench_concrete(n=100, repeat=3):
+    """Symbolic execution of a mostly concrete program, z3 constants vs. ints"""
+    import z3
+
+    from . import sym, worklist
+
+    class _LiftedExec(worklist.WorklistExec):
+        # every constant is a z3 term, as before hybrid values
+        def visit_BoolConst(self, node, *args, **kwargs):
+            return z3.BoolVal(node.val)
+
+        def visit_IntConst(self, node, *args, **kwargs):
+            return z3.IntVal(node.val)
+
+    prg = ast.parse_string(programs.CONCRETE_PRG.replace("N", str(n)))
+    base = None
+    for name, cls in (("z3 constants", _LiftedExec), ("hybrid", worklist.WorklistExec)):
+        solver = sym.PathSolver()
+        t = _time(lambda: cls(loop_bound=n + 1).run(prg, sym.SymState(solver)), repeat)
+        if base is None:
+            base = t
+        _report(name, base, t)
+        print("{:<24} {:>10}".format("  queries per run", solver.num_queries // repeat))
+
+
+UNROLL_PRGS = {
+    "linear": "r := 3 * r + y - i",
+    "merged": "if y > i then r := r + 1 else r := r - 1",
+}
+
+
+def bench_unroll(n=30):
+    """Solver time on deep unrolls with simplified terms and fresh constants
+
+    Merging keeps a single path through the loop, and makes r an If term
+    in the merged program.
+    """
+    from . import sym, worklist
+
+    class _TimedSolver(sym.PathSolver):
+        # time spent in z3, including the translation of terms
+        def __init__(self):
+            super(_TimedSolver, self).__init__()
+            self.time = 0.0
+
+        def _check(self, path):
+            start = time.perf_counter()
+            res = super(_TimedSolver, self)._check(path)
+            self.time += time.perf_counter() - start
+            return res
+
+    print("{:<24} {:>10} {:>10} {:>10}".format("", "size", "defs", "solver(s)"))
+    for name, body in UNROLL_PRGS.items():
+        prg = ast.parse_string(
+            "havoc x, y; r := x; i := 0;\n"
+            "while i < {} do {{ {}; i := i + 1; assert not (r = 12345 + i) }}".format(
+                n, body
+            )
+        )
+        for max_size, simplify in ((None, False), (None, True), (16, False), (16, True)):
+            solver = _TimedSolver()
+            engine = worklist.WorklistExec(
+                loop_bound=n + 1,
+                merge=True,
+                max_term_size=max_size,
+                simplify=simplify,
+            )
+            states = engine.run(prg, sym.SymState(solver))
+            size = max(sym.term_size(sym.lift(s.env["r"])) for s in states)
+            label = "{} {}{}".format(
+                name, "simp" if simplify else "plain", "" if max_size is None else " ssa"
+            )
+            print(
+                "{:<24} {:>10} {:>10} {:>10.4f}".format(
+                    label, size, engine.num_defs, solver.time
+                )
+            )
+
+
+def bench_bmc(ns=(8, 10, 12)):
+    """Path enumeration vs. bounded model checking on 2^N paths"""
+    from . import bmc, sym, worklist
+
+    for n in ns:
+        prg = _branch_prg(n)
+        base = _time(lambda: worklist.WorklistExec().run(prg, sym.SymState()), 1)
+        _report("n={} paths".format(n), base, base)
+        t = _time(lambda: bmc.Bmc().check(prg), 1)
+        _report("n={} bmc".format(n), base, t)
+    prg = ast.parse_string(programs.SEARCH_PRG.replace("N", "10"))
+    base = _time(lambda: worklist.WorklistExec(loop_bound=11).run(prg, sym.SymState()), 1)
+    _report("loops paths", base, base)
+    t = _time(lambda: bmc.Bmc(loop_bound=11).check(prg), 1)
+    _report("loops bmc", base, t)
+    t = _time(lambda: bmc.Bmc(loop_bound=11, single=True).check(prg), 1)
+    _report("loops bmc single", base, t)
+
+
+def bench_concolic(n=1000, repeat=3):
+    """Symbolic exploration vs. concolic runs of the concrete interpreter
+
+    The last program fails after N/2 iterations of an input dependent
+    loop, beyond the default loop bound of the symbolic engine.
+    """
+    from . import concolic, sym, worklist
+
+    print("{:<24} {:>10} {:>10} {:>10}".format("", "time(s)", "queries", "errors"))
+    prgs = (
+        ("concrete", programs.CONCRETE_PRG.replace("N", str(n)), n + 1, 10),
+        ("search", programs.SEARCH_PRG.replace("N", "9"), 10, 100),
+        ("deep bug", programs.DEEP_BUG_PRG.replace("N", "40"), 10, 25),
+    )
+    for name, text, bound, runs in prgs:
+        prg = ast.parse_string(text)
+        engines = []
+
+        def _sym():
+            solver = sym.PathSolver()
+            engine = worklist.WorklistExec(loop_bound=bound)
+            engine.run(prg, sym.SymState(solver))
+            engines[:] = [solver.num_queries, len(engine.errors)]
+
+        def _concolic():
+            engine = concolic.Concolic(max_runs=runs)
+            engine.run(prg)
+            engines[:] = [engine.num_solver_calls, len(engine.errors)]
+
+        for label, fn in (("symbolic", _sym), ("concolic", _concolic)):
+            t = _time(fn, repeat)
+            print("{:<24} {:>10.4f} {:>10} {:>10}".format(name + " " + label, t, *engines))
+
+
+def bench_subsume(bounds=(10, 20, 40), n=3):
+    """Loop unrolling with and without subsumption at loop heads and joins
+
+    x saturates at N, after which the states at the loop head repeat.
+    """
+    from . import sym, worklist
+
+    prg = ast.parse_string(programs.SUBSUME_PRG.replace("N", str(n)))
+    print("{:<24} {:>10} {:>10} {:>10}".format("", "time(s)", "states", "pruned"))
+    for bound in bounds:
+        for subsume in (False, True):
+            engine = worklist.WorklistExec(loop_bound=bound, subsume=subsume)
+            t = _time(lambda: engine.run(prg, sym.SymState()), 1)
+            label = "bound={} {}".format(bound, "subsume" if subsume else "plain")
+            print(
+                "{:<24} {:>10.4f} {:>10} {:>10}".format(
+                    label, t, len(engine.states), engine.num_subsumed
+                )
+            )
+
+
+BENCHMARKS = {
+    "compile": bench_compile,
+    "loop": bench_loop,
+    "vec": bench_vec,
+    "cov": bench_cov,
+    "trace": bench_trace,
+    "sym": bench_sym,
+    "slice": bench_slice,
+    "search": bench_search,
+    "parallel": bench_parallel,
+    "merge": bench_merge,
+    "states": bench_states,
+    "concrete": bench_concrete,
+    "unroll": bench_unroll,
+    "bmc": bench_bmc,
+    "concolic": bench_concolic,
+    "subsume": bench_subsume,
+}
+
+
+def main():
+    names = sys.argv[1:]
+    if len(names) == 0:
+        names = list(BENCHMARKS.keys())
+    for name in names:
+        print("==", name, "==")
+        BENCHMARKS[name]()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,398 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Bounded model checking of WLang programs
+
+The program is encoded as a single formula rather than explored path by
+path. Every assignment defines a new version of its variable (static
+single assignment), loops are unrolled up to their bound (see
+SymExec.bound_of()), and the versions of the two branches of an if are
+merged with If terms. Every assertion becomes a query: can its guard,
+the condition under which execution reaches it, hold together with the
+negation of the asserted condition?
+
+The encoding follows WorklistExec: paths that need more iterations of a
+loop than its bound are dropped, and a loop with an invariant is checked
+against the invariant and then replaced by it. A loop that drops a
+feasible path is counted in bound_hits, once per loop rather than once
+per path. The errors found are the
+assertions and invariant checks that fail on some path of WorklistExec,
+and the witness of an error holds the values of the variables at the
+failing check.
+"""
+
+import sys
+
+import z3
+
+from . import ast, int, sym
+
+ASSERT = "assert"
+INV = "inv"
+
+
+class Check(object):
+    """A check of the program: an assertion or an invariant check"""
+
+    def __init__(self, kind, node, guard, cond, env):
+        self.kind = kind
+        # the assert or while statement
+        self.node = node
+        # condition under which execution reaches the check
+        self.guard = guard
+        self.cond = cond
+        # map from variable to its term at the check
+        self.env = env
+        # an int.State with the values of the variables, if it may fail
+        self.witness = None
+
+    def violation(self):
+        return z3.And(self.guard, z3.Not(self.cond))
+
+    def __str__(self):
+        line = "?" if self.node.line is None else self.node.line
+        return "{} at line {}".format(self.kind, line)
+
+
+class _Ssa(object):
+    """The current version of every variable, in the form of a SymState
+
+    Values are hybrid as in SymExec: concrete values are Python ints.
+    """
+
+    def __init__(self, env=None):
+        self.env = dict() if env is None else env
+
+    def copy(self):
+        return _Ssa(dict(self.env))
+
+
+class Bmc(sym.SymExec):
+    """Encodes a program into a formula and checks its assertions
+
+    With single, all checks are solved as one disjunctive query, repeated
+    without the checks it was found to violate until it is unsat.
+    Otherwise every check is one query on an incremental solver.
+    """
+
+    def __init__(self, loop_bound=10, single=False, loop_bounds=None):
+        super(Bmc, self).__init__(loop_bound=loop_bound, loop_bounds=loop_bounds)
+        self.single = single
+        # defining equalities of the versions of variables
+        self.defs = []
+        self.checks = []
+        self.num_checks = 0
+        # loops and guards under which they need more than their bound
+        self.cuts = []
+        # map from variable name to its number of versions
+        self._versions = dict()
+
+    def _new(self, name, val=None, sort=None):
+        """A new version of a variable, defined as val if it is given"""
+        k = self._versions.get(name, 0)
+        self._versions[name] = k + 1
+        if sort is None:
+            const = z3.Int("{}!{}".format(name, k))
+        else:
+            const = z3.Const("{}!{}".format(name, k), sort)
+        if val is not None:
+            self.defs.append(const == val)
+        return const
+
+    def _read(self, ssa, name):
+        val = ssa.env.get(name)
+        if val is None:
+            # the initial value of an input
+            val = z3.Int(name)
+            ssa.env[name] = val
+        return val
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        return self._read(kwargs["state"], node.name)
+
+    def _exp(self, ssa, exp):
+        return self.visit(exp, state=ssa)
+
+    def encode(self, prg):
+        """Encodes prg, fills in self.defs and self.checks
+
+        The encoding of an earlier program is discarded.
+        """
+        self.defs = []
+        self.checks = []
+        self.cuts = []
+        self.bound_hits = dict()
+        self._versions = dict()
+        self.visit(prg, state=_Ssa(), guard=True)
+
+    def _and(self, guard, cond):
+        if sym.is_concrete(cond):
+            return guard if cond else False
+        if sym.is_concrete(guard):
+            return cond if guard else False
+        return z3.And(guard, cond)
+
+    def _check(self, kind, node, ssa, guard, cond):
+        """Records a check, returns the guard after it"""
+        if guard is False or cond is True:
+            return guard
+        self.checks.append(
+            Check(kind, node, sym.lift(guard), sym.lift(cond), dict(ssa.env))
+        )
+        return self._and(guard, cond)
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        ssa, guard = kwargs["state"], kwargs["guard"]
+        for s in node.stmts:
+            if guard is False:
+                break
+            ssa, guard = self.visit(s, state=ssa, guard=guard)
+        return ssa, guard
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        return kwargs["state"], kwargs["guard"]
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        return kwargs["state"], kwargs["guard"]
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        ssa = kwargs["state"]
+        val = self._exp(ssa, node.rhs)
+        if not sym.is_concrete(val):
+            val = self._new(node.lhs.name, val)
+        ssa.env[node.lhs.name] = val
+        return ssa, kwargs["guard"]
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        ssa = kwargs["state"]
+        for v in node.vars:
+            ssa.env[v.name] = self._new(v.name)
+        return ssa, kwargs["guard"]
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        ssa = kwargs["state"]
+        return ssa, self._and(kwargs["guard"], self._exp(ssa, node.cond))
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        ssa, guard = kwargs["state"], kwargs["guard"]
+        cond = self._exp(ssa, node.cond)
+        return ssa, self._check(ASSERT, node, ssa, guard, cond)
+
+    def _branch(self, ssa, guard, cond, then_fn, else_fn):
+        """Encodes both sides of a branch on cond and merges them"""
+        if sym.is_concrete(cond):
+            return then_fn(ssa, guard) if cond else else_fn(ssa, guard)
+        then_ssa, then_guard = then_fn(ssa.copy(), self._and(guard, cond))
+        else_ssa, else_guard = else_fn(ssa, self._and(guard, z3.Not(cond)))
+        return self._join(then_ssa, then_guard, else_ssa, else_guard)
+
+    def _join(self, then_ssa, then_guard, else_ssa, else_guard):
+        """Merges the versions and guards of the two sides of a branch"""
+        if then_guard is False:
+            return else_ssa, else_guard
+        if else_guard is False:
+            return then_ssa, then_guard
+        merged = _Ssa()
+        for name in set(then_ssa.env) | set(else_ssa.env):
+            a = then_ssa.env.get(name)
+            b = else_ssa.env.get(name)
+            if a is None or b is None:
+                # undefined on one side, the other value is as good as any
+                merged.env[name] = a if b is None else b
+            elif a is b or (sym.is_concrete(a) and sym.is_concrete(b) and a == b):
+                merged.env[name] = a
+            else:
+                merged.env[name] = self._new(name, z3.If(then_guard, a, b))
+        merged_guard = self._new("guard", z3.Or(then_guard, else_guard), z3.BoolSort())
+        return merged, merged_guard
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        ssa, guard = kwargs["state"], kwargs["guard"]
+
+        def _then(s, g):
+            return self.visit(node.then_stmt, state=s, guard=g)
+
+        def _else(s, g):
+            if node.has_else():
+                return self.visit(node.else_stmt, state=s, guard=g)
+            return s, g
+
+        return self._branch(ssa, guard, self._exp(ssa, node.cond), _then, _else)
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        ssa, guard = kwargs["state"], kwargs["guard"]
+        if node.inv is not None:
+            return self._inv_loop(node, ssa, guard)
+        return self._unroll(node, ssa, guard, self.bound_of(node))
+
+    def _unroll(self, node, ssa, guard, n):
+        """Encodes n iterations of loop node and the exit after them
+
+        The iterations are encoded first, remembering the exit of every
+        iteration whose condition is symbolic, and the exits are merged
+        from the last one back, so that deep unrollings do not recurse.
+        """
+        exits = []
+        while True:
+            cond = self._exp(ssa, node.cond)
+            if n == 0:
+                # only the exit remains, paths that stay in the loop are cut
+                cut = self._and(guard, cond)
+                if cut is not False:
+                    self.cuts.append((node, cut))
+                res = ssa, self._and(guard, sym._not(cond))
+                break
+            if sym.is_concrete(cond):
+                if not cond:
+                    res = ssa, guard
+                    break
+            else:
+                exits.append((ssa, self._and(guard, z3.Not(cond))))
+                ssa, guard = ssa.copy(), self._and(guard, cond)
+            ssa, guard = self.visit(node.body, state=ssa, guard=guard)
+            if guard is False:
+                res = ssa, guard
+                break
+            n -= 1
+        for exit_ssa, exit_guard in reversed(exits):
+            res = self._join(res[0], res[1], exit_ssa, exit_guard)
+        return res
+
+    def _inv_loop(self, node, ssa, guard):
+        guard = self._check(INV, node, ssa, guard, self._exp(ssa, node.inv))
+        for name in self._defs(node):
+            ssa.env[name] = self._new(name)
+        guard = self._and(guard, self._exp(ssa, node.inv))
+        cond = self._exp(ssa, node.cond)
+        # an arbitrary iteration must preserve the invariant
+        body_ssa, body_guard = self.visit(
+            node.body, state=ssa.copy(), guard=self._and(guard, cond)
+        )
+        if body_guard is not False:
+            self._check(INV, node, body_ssa, body_guard, self._exp(body_ssa, node.inv))
+        return ssa, self._and(guard, sym._not(cond))
+
+    def check(self, prg):
+        """Encodes and checks prg, returns the checks that may fail"""
+        self.encode(prg)
+        solver = z3.Solver()
+        solver.add(self.defs)
+        if self.single:
+            failed = self._check_single(solver)
+        else:
+            failed = self._check_each(solver)
+        self._check_cuts(solver)
+        return [c for c in self.checks if c in failed]
+
+    def _check_cuts(self, solver):
+        """Counts the loops that cut a feasible path in bound_hits"""
+        for node, guard in self.cuts:
+            if node.line in self.bound_hits:
+                continue
+            solver.push()
+            solver.add(sym.lift(guard))
+            self.num_checks += 1
+            if solver.check() == z3.sat:
+                self._cut(node)
+            solver.pop()
+
+    def _check_each(self, solver):
+        failed = []
+        for c in self.checks:
+            solver.push()
+            solver.add(c.violation())
+            self.num_checks += 1
+            if solver.check() == z3.sat:
+                c.witness = self._witness(solver.model(), c)
+                failed.append(c)
+            solver.pop()
+        return failed
+
+    def _check_single(self, solver):
+        failed = []
+        todo = list(self.checks)
+        while len(todo) > 0:
+            solver.push()
+            solver.add(z3.Or([c.violation() for c in todo]))
+            self.num_checks += 1
+            res = solver.check()
+            model = solver.model() if res == z3.sat else None
+            solver.pop()
+            if model is None:
+                break
+            rest = []
+            for c in todo:
+                if z3.is_true(model.eval(c.violation(), model_completion=True)):
+                    c.witness = self._witness(model, c)
+                    failed.append(c)
+                else:
+                    rest.append(c)
+            todo = rest
+        return failed
+
+    def _witness(self, model, check):
+        st = int.State()
+        for name, val in check.env.items():
+            st.env[name] = model.eval(sym.lift(val), model_completion=True)
+        return st
+
+
+def _parse_args():
+    import argparse
+    import builtins
+
+    ap = argparse.ArgumentParser(
+        prog="bmc", description="Bounded model checking of WLang programs"
+    )
+    ap.add_argument("in_file", metavar="FILE", help="WLang program to check")
+    ap.add_argument(
+        "--bound", type=builtins.int, default=10, help="Number of loop unrollings"
+    )
+    ap.add_argument(
+        "--single",
+        action="store_true",
+        help="Check all assertions with one disjunctive query",
+    )
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    prg = ast.parse_file(args.in_file)
+    bmc = Bmc(args.bound, args.single)
+    failed = bmc.check(prg)
+    for c in failed:
+        print("[bmc]: {} may fail".format(c))
+        print(c.witness, end="")
+    print(
+        "[bmc]: {} checks, {} may fail, {} solver calls".format(
+            len(bmc.checks), len(failed), bmc.num_checks
+        )
+    )
+    for line in sorted(bmc.bound_hits):
+        print("[bmc]: loop at line {} cut paths at its bound".format(line))
+    return 0 if len(failed) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Control flow graphs of WLang programs
+
+Every statement of a program becomes a node of the graph and a node id
+is a program point. Branching statements have two successors: then and
+else for an if, body and exit for a while. The end of every loop body is
+a BACK node whose only successor is the loop head, and the end of the
+program is the EXIT node.
+"""
+
+import sys
+from collections import deque
+
+from . import ast
+
+# kinds of nodes
+STMT = "stmt"
+IF = "if"
+LOOP = "loop"
+BACK = "back"
+EXIT = "exit"
+
+
+class Node(object):
+    def __init__(self, id, kind, stmt=None):
+        self.id = id
+        self.kind = kind
+        # the statement of the node, the WhileStmt for BACK nodes
+        self.stmt = stmt
+        # successors: [next] for STMT and BACK nodes, [then, else] for IF
+        # nodes, [body, exit] for LOOP nodes, [] for the EXIT node
+        self.succs = []
+        # for IF nodes, the point where both branches meet again
+        self.join = None
+        # number of loops the node is nested in
+        self.loop_depth = 0
+
+    def __str__(self):
+        line = "?" if self.stmt is None or self.stmt.line is None else self.stmt.line
+        return "{}:{}:{}".format(self.id, self.kind, line)
+
+
+class Cfg(object):
+    """Control flow graph of a program"""
+
+    def __init__(self, prg):
+        self.prg = prg
+        self.nodes = []
+        self.exit = self._add(EXIT).id
+        self.entry = self._build(prg, self.exit)
+        self.preds = [[] for _ in self.nodes]
+        for n in self.nodes:
+            for s in n.succs:
+                self.preds[s].append(n.id)
+
+    def _add(self, kind, stmt=None, depth=0):
+        n = Node(len(self.nodes), kind, stmt)
+        n.loop_depth = depth
+        self.nodes.append(n)
+        return n
+
+    def _build(self, stmt, next, depth=0):
+        """Adds the nodes of stmt, followed by next. Returns its entry"""
+        if isinstance(stmt, ast.StmtList):
+            for s in reversed(stmt.stmts):
+                next = self._build(s, next, depth)
+            return next
+
+        if isinstance(stmt, ast.IfStmt):
+            n = self._add(IF, stmt, depth)
+            then_entry = self._build(stmt.then_stmt, next, depth)
+            if stmt.has_else():
+                else_entry = self._build(stmt.else_stmt, next, depth)
+            else:
+                else_entry = next
+            n.succs = [then_entry, else_entry]
+            n.join = next
+            return n.id
+
+        if isinstance(stmt, ast.WhileStmt):
+            n = self._add(LOOP, stmt, depth)
+            back = self._add(BACK, stmt, depth + 1)
+            back.succs = [n.id]
+            n.succs = [self._build(stmt.body, back.id, depth + 1), next]
+            return n.id
+
+        n = self._add(STMT, stmt, depth)
+        n.succs = [next]
+        return n.id
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def node(self, i):
+        return self.nodes[i]
+
+    def find(self, pred):
+        """Ids of nodes that satisfy pred"""
+        return [n.id for n in self.nodes if pred(n)]
+
+    def distances(self, targets):
+        """Number of edges from every node to the nearest of targets
+
+        Nodes from which no target is reachable are missing.
+        """
+        dist = dict()
+        queue = deque()
+        for t in targets:
+            dist[t] = 0
+            queue.append(t)
+        while len(queue) > 0:
+            n = queue.popleft()
+            for p in self.preds[n]:
+                if p not in dist:
+                    dist[p] = dist[n] + 1
+                    queue.append(p)
+        return dist
+
+    def reachable(self, start):
+        """Ids of the nodes reachable from start, including start"""
+        seen = {start}
+        queue = deque([start])
+        while len(queue) > 0:
+            n = queue.popleft()
+            for s in self.nodes[n].succs:
+                if s not in seen:
+                    seen.add(s)
+                    queue.append(s)
+        return seen
+
+    def query_counts(self, start, loop_bound):
+        """Estimated number of branching queries after start
+
+        Every condition of an if or a loop that is reachable from start
+        counts as one query per execution, and a node nested in k loops
+        is assumed to run loop_bound^k times. Returns the total and a map
+        from variable name to the number of queries that read it.
+        """
+        total = 0
+        per_var = dict()
+        for i in self.reachable(start):
+            n = self.nodes[i]
+            if n.kind not in (IF, LOOP):
+                continue
+            w = loop_bound**n.loop_depth
+            total += w
+            for name in uses(n):
+                per_var[name] = per_var.get(name, 0) + w
+        return total, per_var
+
+
+def is_assert(node):
+    return node.kind == STMT and isinstance(node.stmt, ast.AssertStmt)
+
+
+def uses(node):
+    """Names of variables read by the condition of node
+
+    None if the node does not evaluate a condition.
+    """
+    if node.kind in (IF, LOOP):
+        return _exp_vars(node.stmt.cond)
+    if node.kind == STMT and isinstance(node.stmt, (ast.AssertStmt, ast.AssumeStmt)):
+        return _exp_vars(node.stmt.cond)
+    return None
+
+
+def _exp_vars(exp):
+    if isinstance(exp, ast.IntVar):
+        return {exp.name}
+    res = set()
+    if isinstance(exp, ast.Exp):
+        for a in exp.args:
+            res |= _exp_vars(a)
+    return res
+
+
+def main():
+    prg = ast.parse_file(sys.argv[1])
+    cfg = Cfg(prg)
+    for n in cfg.nodes:
+        print(n, "->", ", ".join(str(s) for s in n.succs))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
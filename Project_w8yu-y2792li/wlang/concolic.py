@@ -0,0 +1,391 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Concolic execution of WLang programs
+
+The program is run by the concrete interpreter on a vector of inputs,
+the values of its havoc statements, while a shadow environment keeps the
+symbolic value of every variable that depends on the inputs. Each branch
+taken on a symbolic condition is recorded, and new inputs are obtained
+by negating one recorded branch and solving the path condition up to it
+with z3. Branches and assertions on concrete conditions cost nothing,
+so deep loops that do not depend on the inputs run at interpreter speed.
+
+The search is generational: a run that was generated by flipping its
+j-th branch only flips branches past j, so that no path prefix is
+explored twice, and all children of a run are generated with one
+incremental solver. Runs are scheduled by the number of new branch
+directions their parent covered. Division follows z3 (see sym._div)
+rather than Python's, so that the concrete and the symbolic values
+agree, and a division by 0 ends the run.
+"""
+
+import heapq
+import operator
+import sys
+
+import z3
+
+from . import ast, int
+
+_REL_OPS = {
+    "<=": operator.le,
+    "<": operator.lt,
+    "=": operator.eq,
+    ">=": operator.ge,
+    ">": operator.gt,
+}
+
+_ARITH_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+}
+
+
+def _div(x, y):
+    if y > 0:
+        return x // y
+    # raises ZeroDivisionError for 0
+    return -(x // -y)
+
+
+class _Stop(Exception):
+    """Ends a run at a failed assertion or assumption"""
+
+
+class Branch(object):
+    """A branch taken on a symbolic condition"""
+
+    def __init__(self, node, cond, taken, flip=True):
+        # the if, while, assert or assume statement, or a division
+        self.node = node
+        self.cond = cond
+        # direction of the branch in this run
+        self.taken = taken
+        # False for assumptions, whose other side blocks the run
+        self.flip = flip
+
+    def constraint(self):
+        return self.cond if self.taken else z3.Not(self.cond)
+
+
+class ConcolicState(int.State):
+    """A concrete state with the symbolic values of input dependent variables"""
+
+    def __init__(self, inputs=None):
+        super(ConcolicState, self).__init__()
+        # values of the havoc statements, in execution order
+        self.inputs = list(inputs) if inputs is not None else []
+        # z3 constants of the inputs read so far
+        self.consts = []
+        # variables without an entry have a concrete value
+        self.sym = dict()
+        self.branches = []
+        # the failed assertion, if any
+        self.error = None
+        # True if an assumption failed
+        self.blocked = False
+
+
+class ConcolicInterpreter(int.Interpreter):
+    """Runs a program concretely and records its symbolic branches
+
+    Expressions evaluate to pairs of a concrete value and a z3 term, the
+    term being None when the value does not depend on the inputs.
+    Inputs past the end of the input vector are 0.
+    """
+
+    def run(self, ast, state):
+        try:
+            super(ConcolicInterpreter, self).run(ast, state)
+        except _Stop:
+            pass
+        return state
+
+    def _branch(self, node, cond, state, flip=True):
+        c, s = cond
+        c = bool(c)
+        if s is not None:
+            state.branches.append(Branch(node, s, c, flip))
+        return c
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        return st.env[node.name], st.sym.get(node.name)
+
+    def visit_Const(self, node, *args, **kwargs):
+        return node.val, None
+
+    def visit_RelExp(self, node, *args, **kwargs):
+        lc, ls = self.visit(node.arg(0), *args, **kwargs)
+        rc, rs = self.visit(node.arg(1), *args, **kwargs)
+        fn = _REL_OPS[node.op]
+        s = None
+        if ls is not None or rs is not None:
+            s = fn(ls if ls is not None else lc, rs if rs is not None else rc)
+        return fn(lc, rc), s
+
+    def visit_BExp(self, node, *args, **kwargs):
+        kids = [self.visit(a, *args, **kwargs) for a in node.args]
+
+        if node.op == "not":
+            assert node.is_unary()
+            c, s = kids[0]
+            return not c, (None if s is None else z3.Not(s))
+
+        assert node.op in ("and", "or")
+        concrete = [c for c, _ in kids]
+        c = all(concrete) if node.op == "and" else any(concrete)
+        syms = [s for _, s in kids if s is not None]
+        # a concrete kid that decides the result makes it concrete
+        if len(syms) == 0 or any(s is None and k == (node.op == "or") for k, s in kids):
+            return c, None
+        fn = z3.And if node.op == "and" else z3.Or
+        return c, (syms[0] if len(syms) == 1 else fn(syms))
+
+    def visit_AExp(self, node, *args, **kwargs):
+        kids = [self.visit(a, *args, **kwargs) for a in node.args]
+
+        if node.op == "/":
+            fn = _div
+            sfn = operator.truediv
+        else:
+            fn = sfn = _ARITH_OPS[node.op]
+
+        c, s = kids[0]
+        for kc, ks in kids[1:]:
+            if fn is _div and ks is not None:
+                # a branch to a run that does not divide by 0
+                self._branch(node, (kc != 0, ks != 0), kwargs["state"])
+            if s is not None or ks is not None:
+                s = sfn(
+                    s if s is not None else z3.IntVal(c),
+                    ks if ks is not None else z3.IntVal(kc),
+                )
+            c = fn(c, kc)
+        return c, s
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        c, s = self.visit(node.rhs, *args, **kwargs)
+        st.env[node.lhs.name] = c
+        if s is None:
+            st.sym.pop(node.lhs.name, None)
+        else:
+            st.sym[node.lhs.name] = s
+        return st
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        if self._branch(node, self.visit(node.cond, *args, **kwargs), st):
+            return self.visit(node.then_stmt, *args, **kwargs)
+        if node.has_else():
+            return self.visit(node.else_stmt, *args, **kwargs)
+        return st
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        budget = self.budget
+        while self._branch(node, self.visit(node.cond, *args, **kwargs), st):
+            if budget is not None:
+                budget.tick(node)
+            self.visit(node.body, *args, **kwargs)
+        return st
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        if not self._branch(node, self.visit(node.cond, *args, **kwargs), st):
+            st.error = node
+            raise _Stop()
+        return st
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        if not self._branch(node, self.visit(node.cond, *args, **kwargs), st, False):
+            st.blocked = True
+            raise _Stop()
+        return st
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        for v in node.vars:
+            k = len(st.consts)
+            if k == len(st.inputs):
+                st.inputs.append(0)
+            const = z3.Int("{}!{}".format(v.name, k))
+            st.consts.append(const)
+            st.env[v.name] = st.inputs[k]
+            st.sym[v.name] = const
+        return st
+
+
+class Run(object):
+    """One concrete run of the program"""
+
+    def __init__(self, inputs, bound, expected):
+        self.inputs = inputs
+        # branches before bound are not flipped
+        self.bound = bound
+        # directions of the first branches predicted by the solver
+        self.expected = expected
+        self.state = None
+        # number of branch directions first covered by this run
+        self.score = 0
+
+    def is_error(self):
+        return self.state.error is not None
+
+    def diverged(self):
+        """True if the run did not follow the path it was generated for"""
+        taken = [b.taken for b in self.state.branches[: len(self.expected)]]
+        return taken != self.expected
+
+
+class Concolic(object):
+    """Generational concolic search
+
+    Explores the program from the given inputs until max_runs runs have
+    been made or no branch is left to flip. Each run gets fuel loop
+    iterations, see int.Budget.
+    """
+
+    def __init__(self, max_runs=100, fuel=10000):
+        self.max_runs = max_runs
+        self.fuel = fuel
+        self.runs = []
+        self.errors = []
+        self.num_solver_calls = 0
+        self.num_divergences = 0
+        # (id of node, direction) pairs of the branches covered so far
+        self.covered = set()
+
+    def stats(self):
+        return {
+            "runs": len(self.runs),
+            "errors": len(self.errors),
+            "solver calls": self.num_solver_calls,
+            "divergences": self.num_divergences,
+            "branches": len(self.covered),
+        }
+
+    def run(self, prg, inputs=None):
+        """Returns the runs that failed an assertion"""
+        for r in self.explore(prg, inputs):
+            pass
+        return self.errors
+
+    def explore(self, prg, inputs=None):
+        """Yields the runs as they are made"""
+        interp = ConcolicInterpreter(fuel=self.fuel)
+        # max-heap on the score, FIFO among equal scores
+        todo = [(0, 0, Run(list(inputs or []), 0, []))]
+        count = 1
+        while len(todo) > 0 and len(self.runs) < self.max_runs:
+            _, _, r = heapq.heappop(todo)
+            r.state = ConcolicState(r.inputs)
+            try:
+                interp.run(prg, r.state)
+            except (int.BudgetExceeded, ZeroDivisionError):
+                # the run is cut short, its branches are still explored
+                pass
+            self.runs.append(r)
+            if r.diverged():
+                self.num_divergences += 1
+            if r.is_error():
+                self.errors.append(r)
+            yield r
+
+            for child in self._children(r):
+                heapq.heappush(todo, (-r.score, count, child))
+                count += 1
+
+    def _children(self, r):
+        """New runs, one for every feasible flip of a branch past the bound"""
+        st = r.state
+        covered = len(self.covered)
+        self.covered.update((id(b.node), b.taken) for b in st.branches)
+        r.score = len(self.covered) - covered
+
+        solver = z3.Solver()
+        index = dict((str(c), k) for k, c in enumerate(st.consts))
+        res = []
+        for j, b in enumerate(st.branches):
+            if j >= r.bound and b.flip:
+                solver.push()
+                solver.add(z3.Not(b.constraint()))
+                self.num_solver_calls += 1
+                if solver.check() == z3.sat:
+                    res.append(self._child(r, j, solver.model(), index))
+                solver.pop()
+            solver.add(b.constraint())
+        return res
+
+    def _child(self, r, j, model, index):
+        inputs = list(r.state.inputs)
+        for d in model.decls():
+            k = index.get(d.name())
+            if k is not None:
+                inputs[k] = model[d].as_long()
+        expected = [b.taken for b in r.state.branches[:j]] + [not r.state.branches[j].taken]
+        return Run(inputs, j + 1, expected)
+
+
+def _parse_args():
+    import argparse
+    import builtins
+
+    ap = argparse.ArgumentParser(
+        prog="concolic", description="Concolic testing of WLang programs"
+    )
+    ap.add_argument("in_file", metavar="FILE", help="WLang program to test")
+    ap.add_argument(
+        "--runs", type=builtins.int, default=100, help="Maximal number of runs"
+    )
+    ap.add_argument(
+        "--fuel",
+        type=builtins.int,
+        default=10000,
+        help="Maximal number of loop iterations per run",
+    )
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    prg = ast.parse_file(args.in_file)
+    engine = Concolic(args.runs, args.fuel)
+    for r in engine.explore(prg):
+        if r.is_error():
+            print("[concolic]: assertion at line {} fails on inputs {}".format(
+                r.state.error.line, r.inputs))
+    print(
+        "[concolic]: "
+        + ", ".join("{} {}".format(v, k) for k, v in engine.stats().items())
+    )
+    return 0 if len(engine.errors) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Statement and branch coverage of WLang programs
+
+Every statement and every branch outcome (then/else of an if, entering
+and leaving a while) is given a dense integer id. An instrumented
+program, compiled to closures, sets one byte of a preallocated bitmap
+per id that it reaches. Bitmaps of several runs can be merged.
+"""
+
+import builtins
+import sys
+from io import StringIO
+
+from . import ast, int, undef_visitor
+
+STMT = "stmt"
+THEN = "then"
+ELSE = "else"
+BODY = "body"
+EXIT = "exit"
+
+
+class Coverage(object):
+    """Coverage points of a program and the bitmap of points reached"""
+
+    def __init__(self, prg):
+        self.prg = prg
+        # list of (kind, statement) indexed by id
+        self.points = []
+        # map from id of a statement node to its statement id
+        self._stmt_ids = dict()
+        # map from id of an if or while node to its two branch ids
+        self._branch_ids = dict()
+        self._number(prg)
+        self.bits = bytearray(len(self.points))
+        # (trigger, lo, hi): the statements with ids in [lo, hi) are
+        # covered whenever the point trigger is. Filled in by compile().
+        self._segments = []
+
+    def _add(self, kind, node):
+        self.points.append((kind, node))
+        return len(self.points) - 1
+
+    def _number(self, node):
+        # statements of a list get consecutive ids, so that a straight-line
+        # block can be marked with a single slice assignment
+        if isinstance(node, ast.StmtList):
+            stmts = node.stmts
+        else:
+            stmts = [node]
+        for s in stmts:
+            self._stmt_ids[id(s)] = self._add(STMT, s)
+
+        for s in stmts:
+            if isinstance(s, ast.IfStmt):
+                self._branch_ids[id(s)] = (self._add(THEN, s), self._add(ELSE, s))
+                self._number(s.then_stmt)
+                if s.has_else():
+                    self._number(s.else_stmt)
+            elif isinstance(s, ast.WhileStmt):
+                self._branch_ids[id(s)] = (self._add(BODY, s), self._add(EXIT, s))
+                self._number(s.body)
+
+    def stmt_id(self, node):
+        return self._stmt_ids[id(node)]
+
+    def branch_ids(self, node):
+        return self._branch_ids[id(node)]
+
+    def compile(self):
+        """Compiles the program with coverage instrumentation"""
+        self._segments = []
+        return CoverageCompiler(self).compile(self.prg)
+
+    def add_segment(self, trigger, lo, hi):
+        self._segments.append((trigger, lo, hi))
+
+    def _sync(self):
+        """Sets the bits of statements implied by the bits set at runtime"""
+        bits = self.bits
+        for trigger, lo, hi in self._segments:
+            if bits[trigger]:
+                bits[lo:hi] = bytes([1]) * (hi - lo)
+
+    def run(self, state, code=None):
+        """Runs the instrumented program on a state"""
+        if code is None:
+            code = self.compile()
+        code(state.env)
+        return state
+
+    def reset(self):
+        # clear in place, compiled programs hold on to the bitmap
+        self.bits[:] = bytes(len(self.bits))
+
+    def merge(self, bits):
+        """Merges a bitmap of another run into this one"""
+        assert len(bits) == len(self.bits)
+        n = len(self.bits)
+        a = builtins.int.from_bytes(self.bits, "little")
+        b = builtins.int.from_bytes(bits, "little")
+        self.bits[:] = (a | b).to_bytes(n, "little")
+
+    def is_covered(self, i):
+        self._sync()
+        return self.bits[i] != 0
+
+    def num_covered(self, kinds=None):
+        self._sync()
+        return sum(
+            1
+            for i, (kind, _) in enumerate(self.points)
+            if self.bits[i] and (kinds is None or kind in kinds)
+        )
+
+    def num_points(self, kinds=None):
+        return sum(1 for kind, _ in self.points if kinds is None or kind in kinds)
+
+    def by_line(self):
+        """Map from source line to a list of (kind, covered) pairs"""
+        self._sync()
+        res = dict()
+        for i, (kind, node) in enumerate(self.points):
+            res.setdefault(node.line, []).append((kind, self.bits[i] != 0))
+        return res
+
+    def report(self):
+        buf = StringIO()
+        for line, points in sorted(self.by_line().items(), key=_line_key):
+            buf.write("{:>5}: ".format("?" if line is None else line))
+            buf.write(
+                " ".join("{}{}".format("+" if c else "-", k) for k, c in points)
+            )
+            buf.write("\n")
+        stmts = (STMT,)
+        branches = (THEN, ELSE, BODY, EXIT)
+        buf.write(
+            "statements: {}/{} branches: {}/{}\n".format(
+                self.num_covered(stmts),
+                self.num_points(stmts),
+                self.num_covered(branches),
+                self.num_points(branches),
+            )
+        )
+        return buf.getvalue()
+
+
+def _line_key(item):
+    line = item[0]
+    return -1 if line is None else line
+
+
+def _may_raise(exp, undefs):
+    """True if evaluating exp might raise
+
+    A division might divide by zero, and a read of a variable in undefs
+    might find it undefined.
+    """
+    if isinstance(exp, ast.IntVar):
+        return exp.name in undefs
+    if isinstance(exp, ast.AExp) and exp.op == "/":
+        return True
+    if isinstance(exp, ast.Exp):
+        return any(_may_raise(a, undefs) for a in exp.args)
+    return False
+
+
+def _may_stop(node, undefs):
+    """True if executing node might not run to completion"""
+    if isinstance(node, (ast.AssertStmt, ast.AssumeStmt)):
+        return True
+    if isinstance(node, ast.AsgnStmt):
+        return _may_raise(node.rhs, undefs)
+    if isinstance(node, ast.StmtList):
+        return any(_may_stop(s, undefs) for s in node.stmts)
+    if isinstance(node, ast.IfStmt):
+        return (
+            _may_raise(node.cond, undefs)
+            or _may_stop(node.then_stmt, undefs)
+            or (node.has_else() and _may_stop(node.else_stmt, undefs))
+        )
+    if isinstance(node, ast.WhileStmt):
+        return _may_raise(node.cond, undefs) or _may_stop(node.body, undefs)
+    return False
+
+
+class CoverageCompiler(int.Compiler):
+    """Compiles a program into closures that record coverage"""
+
+    def __init__(self, cov):
+        super(CoverageCompiler, self).__init__()
+        self._cov = cov
+        # names of the variables that might be read before they are set
+        uv = undef_visitor.UndefVisitor()
+        uv.check(cov.prg)
+        self._undefs = set(v.name for v in uv.get_undefs())
+
+    def compile(self, node):
+        return self._block(node, None)
+
+    def _block(self, node, trigger):
+        """Compiles a statement or a list of statements
+
+        The list is split into segments that end with a statement that
+        can stop execution: one that contains an assert or assume, a
+        division, or a read of a variable that might be undefined (see
+        _may_stop()). Reaching the start of a segment means that all of it
+        is executed, so only one bit is set for it: the branch outcome that
+        leads to the block (trigger) or, when there is none, the bit of the
+        first statement of the segment.
+        """
+        if isinstance(node, ast.StmtList):
+            stmts = node.stmts
+        else:
+            stmts = [node]
+
+        segments = []
+        seg = []
+        for s in stmts:
+            seg.append(s)
+            if _may_stop(s, self._undefs):
+                segments.append(seg)
+                seg = []
+        if len(seg) > 0:
+            segments.append(seg)
+
+        bits = self._cov.bits
+        compiled = []
+        for seg in segments:
+            lo = self._cov.stmt_id(seg[0])
+            hi = self._cov.stmt_id(seg[-1]) + 1
+            mark = None
+            if trigger is None:
+                mark = lo
+                trigger = lo
+            self._cov.add_segment(trigger, lo, hi)
+            compiled.append((mark, tuple(self.visit(s) for s in seg)))
+            trigger = None
+
+        if len(compiled) == 1 and compiled[0][0] is None:
+            code = compiled[0][1]
+            if len(code) == 1:
+                return code[0]
+
+            def _block(env):
+                for s in code:
+                    s(env)
+
+            return _block
+
+        def _segments(env):
+            for mark, code in compiled:
+                if mark is not None:
+                    bits[mark] = 1
+                for s in code:
+                    s(env)
+
+        return _segments
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        return self._block(node, None)
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        bits = self._cov.bits
+        t, e = self._cov.branch_ids(node)
+        cond = self.visit(node.cond)
+        then_stmt = self._block(node.then_stmt, t)
+        if node.has_else():
+            else_stmt = self._block(node.else_stmt, e)
+        else:
+            else_stmt = None
+
+        if else_stmt is None:
+
+            def _if(env):
+                if cond(env):
+                    bits[t] = 1
+                    then_stmt(env)
+                else:
+                    bits[e] = 1
+
+            return _if
+
+        def _if_else(env):
+            if cond(env):
+                bits[t] = 1
+                then_stmt(env)
+            else:
+                bits[e] = 1
+                else_stmt(env)
+
+        return _if_else
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        bits = self._cov.bits
+        b, e = self._cov.branch_ids(node)
+        cond = self.visit(node.cond)
+        body = self._block(node.body, b)
+
+        def _while(env):
+            while cond(env):
+                bits[b] = 1
+                body(env)
+            bits[e] = 1
+
+        return _while
+
+
+def _parse_args():
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="cov", description="WLang coverage")
+    ap.add_argument("in_file", metavar="FILE", help="WLang program to run")
+    ap.add_argument(
+        "--bitmap",
+        metavar="FILE",
+        help="Merge the coverage of this run into a bitmap file",
+    )
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    import os
+
+    args = _parse_args()
+    prg = ast.parse_file(args.in_file)
+    cov = Coverage(prg)
+    try:
+        cov.run(int.State())
+    except AssertionError as e:
+        print(e)
+    if args.bitmap is not None:
+        if os.path.exists(args.bitmap):
+            with open(args.bitmap, "rb") as f:
+                cov.merge(f.read())
+        with open(args.bitmap, "wb") as f:
+            f.write(cov.bits)
+    print(cov.report(), end="")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
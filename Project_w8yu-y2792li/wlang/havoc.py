@@ -0,0 +1,280 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Providers of values for havoc statements
+
+A provider hands out values with take(n). Values are produced in chunks
+and buffered, so the cost of generating them is paid once per chunk
+rather than once per havoc'd variable. All providers are deterministic:
+the same seed, file or log gives the same sequence of values.
+"""
+
+import array
+import sys
+
+from . import ast
+
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+
+class Provider(object):
+    """Base class of havoc value providers"""
+
+    # number of values generated at once
+    CHUNK = 4096
+
+    def __init__(self):
+        self._buf = []
+        self._pos = 0
+
+    def take(self, n):
+        """Returns a list of the next n values"""
+        pos = self._pos
+        if pos + n > len(self._buf):
+            self._buf = self._buf[pos:] + self._fill(max(self.CHUNK, n))
+            pos = 0
+            if n > len(self._buf):
+                raise EOFError("havoc provider ran out of values")
+        self._pos = pos + n
+        return self._buf[pos : pos + n]
+
+    def take_vars(self, names):
+        """Returns the values of one havoc of the variables names"""
+        return self.take(len(names))
+
+    def _fill(self, n):
+        """Generates up to n new values"""
+        raise NotImplementedError()
+
+    def close(self):
+        pass
+
+
+class ZeroProvider(Provider):
+    """Always 0, the default of the interpreter"""
+
+    def _fill(self, n):
+        return [0] * n
+
+
+class SequenceProvider(Provider):
+    """The values of a list in order, then 0"""
+
+    def __init__(self, values):
+        super(SequenceProvider, self).__init__()
+        self.values = list(values)
+        self._next = 0
+
+    def _fill(self, n):
+        res = self.values[self._next : self._next + n]
+        self._next += len(res)
+        return res + [0] * (n - len(res))
+
+
+class NamedProvider(Provider):
+    """Values by variable name, every havoc of a variable gets its value
+
+    Variables without a value get 0.
+    """
+
+    def __init__(self, values):
+        super(NamedProvider, self).__init__()
+        self.values = dict(values)
+
+    def take_vars(self, names):
+        return [self.values.get(n, 0) for n in names]
+
+    def _fill(self, n):
+        return [0] * n
+
+
+class RandomProvider(Provider):
+    """Uniformly distributed values in [lo, hi] from a seeded PRNG"""
+
+    def __init__(self, seed=0, lo=-(2**31), hi=2**31 - 1):
+        super(RandomProvider, self).__init__()
+        import numpy as np
+
+        self._rng = np.random.default_rng(seed)
+        self.lo = lo
+        self.hi = hi
+
+    def _fill(self, n):
+        return self._rng.integers(self.lo, self.hi, size=n, endpoint=True).tolist()
+
+
+class BoundaryProvider(Provider):
+    """Enumerates boundary values over and over again
+
+    The defaults are small values and the limits of 32 and 64 bit
+    integers. for_program() adds the neighbours of the program's constants.
+    """
+
+    DEFAULTS = [0, 1, -1, 2, -2, 2**31 - 1, -(2**31), 2**31, INT64_MAX, INT64_MIN]
+
+    def __init__(self, values=None):
+        super(BoundaryProvider, self).__init__()
+        if values is None:
+            values = self.DEFAULTS
+        self.values = list(values)
+        assert len(self.values) > 0
+        self._next = 0
+
+    @classmethod
+    def for_program(cls, prg):
+        values = list(cls.DEFAULTS)
+        for c in _int_consts(prg):
+            for v in (c, c - 1, c + 1):
+                if v not in values:
+                    values.append(v)
+        return cls(values)
+
+    def _fill(self, n):
+        k = len(self.values)
+        res = [self.values[(self._next + i) % k] for i in range(n)]
+        self._next = (self._next + n) % k
+        return res
+
+
+class FileProvider(Provider):
+    """Values from a NumPy .npy file or a raw file of int64 values
+
+    The file is memory-mapped and read one chunk at a time. When cycle is
+    True the values are repeated, otherwise EOFError is raised at the end.
+    """
+
+    def __init__(self, fname, cycle=False):
+        super(FileProvider, self).__init__()
+        import numpy as np
+
+        if fname.endswith(".npy"):
+            self._data = np.load(fname, mmap_mode="r")
+        else:
+            self._data = np.memmap(fname, dtype="<i8", mode="r")
+        self._data = self._data.reshape(-1)
+        self.cycle = cycle
+        self._next = 0
+
+    def _fill(self, n):
+        data = self._data
+        if len(data) == 0:
+            return []
+        res = []
+        while len(res) < n:
+            if self._next == len(data):
+                if not self.cycle:
+                    break
+                self._next = 0
+            end = min(len(data), self._next + n - len(res))
+            res.extend(data[self._next : end].tolist())
+            self._next = end
+        return res
+
+
+class ReplayProvider(FileProvider):
+    """Replays the values recorded by a RecordingProvider"""
+
+    def __init__(self, fname):
+        super(ReplayProvider, self).__init__(fname, cycle=False)
+
+
+class RecordingProvider(Provider):
+    """Records the values of another provider into a replay log"""
+
+    def __init__(self, inner, fname):
+        super(RecordingProvider, self).__init__()
+        self._inner = inner
+        self._out = open(fname, "wb")
+        self._log = array.array("q")
+
+    def take(self, n):
+        return self._record(self._inner.take(n))
+
+    def take_vars(self, names):
+        return self._record(self._inner.take_vars(names))
+
+    def _record(self, res):
+        self._log.extend(res)
+        if len(self._log) >= self.CHUNK:
+            self.flush()
+        return res
+
+    def flush(self):
+        log = self._log
+        if sys.byteorder != "little":
+            log = array.array("q", log)
+            log.byteswap()
+        log.tofile(self._out)
+        self._out.flush()
+        self._log = array.array("q")
+
+    def close(self):
+        self.flush()
+        self._out.close()
+        self._inner.close()
+
+
+def _int_consts(node):
+    """All integer constants of a program"""
+    res = []
+    if isinstance(node, ast.IntConst):
+        res.append(node.val)
+    elif isinstance(node, ast.Exp):
+        for a in node.args:
+            res.extend(_int_consts(a))
+    elif isinstance(node, ast.StmtList):
+        for s in node.stmts:
+            res.extend(_int_consts(s))
+    elif isinstance(node, ast.AsgnStmt):
+        res.extend(_int_consts(node.rhs))
+    elif isinstance(node, ast.IfStmt):
+        res.extend(_int_consts(node.cond))
+        res.extend(_int_consts(node.then_stmt))
+        if node.has_else():
+            res.extend(_int_consts(node.else_stmt))
+    elif isinstance(node, ast.WhileStmt):
+        res.extend(_int_consts(node.cond))
+        res.extend(_int_consts(node.body))
+    elif isinstance(node, (ast.AssertStmt, ast.AssumeStmt)):
+        res.extend(_int_consts(node.cond))
+    return res
+
+
+KINDS = ("zero", "random", "boundary", "file", "replay")
+
+
+def mk_provider(kind, prg=None, seed=0, fname=None):
+    """Creates a provider by name, as selected on a command line"""
+    if kind == "zero":
+        return ZeroProvider()
+    if kind == "random":
+        return RandomProvider(seed)
+    if kind == "boundary":
+        if prg is None:
+            return BoundaryProvider()
+        return BoundaryProvider.for_program(prg)
+    if kind == "file":
+        return FileProvider(fname)
+    if kind == "replay":
+        return ReplayProvider(fname)
+    raise ValueError("unknown havoc provider: " + str(kind))
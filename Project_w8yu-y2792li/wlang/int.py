@@ -20,9 +20,11 @@
 # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
 # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
 
+import operator
 import sys
 from functools import reduce
 from io import StringIO
+from time import perf_counter
 
 from . import ast
 
@@ -45,12 +47,90 @@ class State(object):
         return buf.getvalue()
 
 
+class BudgetExceeded(Exception):
+    """Raised when a run exhausts its fuel or passes its deadline"""
+
+    def __init__(self, reason, node, state=None):
+        super(BudgetExceeded, self).__init__(
+            "{} exhausted at line {}".format(reason, node.line)
+        )
+        # either "fuel" or "deadline"
+        self.reason = reason
+        # the loop whose back-edge was being taken
+        self.node = node
+        self.line = node.line
+        # the state reached so far
+        self.state = state
+
+
+class Budget(object):
+    """Limits on the number of loop iterations and on wall-clock time
+
+    Checked on every loop back-edge. The clock is only read every
+    CLOCK_PERIOD iterations to keep the check cheap.
+    """
+
+    CLOCK_PERIOD = 256
+
+    def __init__(self, fuel=None, timeout=None):
+        # maximal number of loop iterations
+        self.fuel = fuel
+        # maximal run time in seconds
+        self.timeout = timeout
+        self.steps = 0
+        self.deadline = None
+
+    def start(self):
+        self.steps = 0
+        if self.timeout is not None:
+            self.deadline = perf_counter() + self.timeout
+
+    def tick(self, node):
+        self.steps += 1
+        if self.fuel is not None and self.steps > self.fuel:
+            raise BudgetExceeded("fuel", node)
+        if (
+            self.deadline is not None
+            and self.steps % self.CLOCK_PERIOD == 0
+            and perf_counter() > self.deadline
+        ):
+            raise BudgetExceeded("deadline", node)
+
+
 class Interpreter(ast.AstVisitor):
-    def __init__(self):
-        pass
+    def __init__(self, fuel=None, timeout=None, havoc=None):
+        self._code = None
+        # provider of values for havoc, see wlang.havoc; None means 0
+        self.havoc = havoc
+        self.budget = None
+        if fuel is not None or timeout is not None:
+            self.budget = Budget(fuel, timeout)
 
     def run(self, ast, state):
-        return self.visit(ast, state=state)
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            return self.visit(ast, state=state)
+        except BudgetExceeded as e:
+            e.state = state
+            raise
+
+    def compile(self, ast):
+        """Compile a program into closures to be executed by run_compiled()"""
+        self._code = Compiler(self.budget, self.havoc).compile(ast)
+        return self._code
+
+    def run_compiled(self, state):
+        """Run the last compiled program on a given state"""
+        assert self._code is not None, "call compile() before run_compiled()"
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            self._code(state.env)
+        except BudgetExceeded as e:
+            e.state = state
+            raise
+        return state
 
     def visit_IntVar(self, node, *args, **kwargs):
         return kwargs["state"].env[node.name]
@@ -137,17 +217,17 @@ class Interpreter(ast.AstVisitor):
                 return kwargs["state"]
 
     def visit_WhileStmt(self, node, *args, **kwargs):
-        cond = self.visit(node.cond, *args, **kwargs)
-
-        if cond:
+        # iterate instead of re-visiting the loop so that long running
+        # loops execute in constant stack space
+        nkwargs = dict(kwargs)
+        budget = self.budget
+        while self.visit(node.cond, *args, **nkwargs):
+            if budget is not None:
+                budget.tick(node)
             # execute the body
-            st = self.visit(node.body, *args, **kwargs)
-            # execute the loop again
-            kwargs["state"] = st
-            return self.visit(node, *args, **kwargs)
-        else:
-            # loop condition is false, don't execute the body
-            return kwargs["state"]
+            nkwargs["state"] = self.visit(node.body, *args, **nkwargs)
+        # loop condition is false, don't execute the body
+        return nkwargs["state"]
 
     def visit_AssertStmt(self, node, *args, **kwargs):
         cond = self.visit(node.cond, *args, **kwargs)
@@ -159,39 +239,385 @@ class Interpreter(ast.AstVisitor):
         return self.visit_AssertStmt(node, *args, **kwargs)
 
     def visit_StmtList(self, node, *args, **kwargs):
-        st = kwargs["state"]
-
         nkwargs = dict(kwargs)
         for stmt in node.stmts:
-            nkwargs["state"] = st
-            st = self.visit(stmt, *args, **nkwargs)
-        return st
+            nkwargs["state"] = self.visit(stmt, *args, **nkwargs)
+        return nkwargs["state"]
 
     def visit_HavocStmt(self, node, *args, **kwargs):
         st = kwargs["state"]
-        for v in node.vars:
-            # assign 0 as the default value
-            st.env[v.name] = 0
+        if self.havoc is None:
+            for v in node.vars:
+                # assign 0 as the default value
+                st.env[v.name] = 0
+        else:
+            vals = self.havoc.take_vars([v.name for v in node.vars])
+            for v, val in zip(node.vars, vals):
+                st.env[v.name] = val
         return st
 
 
+_REL_OPS = {
+    "<=": operator.le,
+    "<": operator.lt,
+    "=": operator.eq,
+    ">=": operator.ge,
+    ">": operator.gt,
+}
+
+_ARITH_OPS = {
+    "+": operator.add,
+    "-": operator.sub,
+    "*": operator.mul,
+    "/": operator.truediv,
+}
+
+
+class Compiler(ast.AstVisitor):
+    """Compiles an AST into a tree of closures
+
+    Every node is turned into a Python function of the environment. All
+    dispatch on node types and operators happens once, at compile time.
+    Expressions return their value, statements update the environment in
+    place and return None.
+    """
+
+    def __init__(self, budget=None, havoc=None):
+        super(Compiler, self).__init__()
+        self._budget = budget
+        self._havoc = havoc
+
+    def compile(self, node):
+        return self.visit(node)
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        name = node.name
+
+        def _var(env):
+            return env[name]
+
+        return _var
+
+    def visit_Const(self, node, *args, **kwargs):
+        val = node.val
+
+        def _const(env):
+            return val
+
+        return _const
+
+    def visit_RelExp(self, node, *args, **kwargs):
+        lhs = self.visit(node.arg(0))
+        rhs = self.visit(node.arg(1))
+        fn = _REL_OPS[node.op]
+
+        if node.op == "<":
+
+            def _lt(env):
+                return lhs(env) < rhs(env)
+
+            return _lt
+        if node.op == "<=":
+
+            def _le(env):
+                return lhs(env) <= rhs(env)
+
+            return _le
+        if node.op == ">":
+
+            def _gt(env):
+                return lhs(env) > rhs(env)
+
+            return _gt
+
+        def _rel(env):
+            return fn(lhs(env), rhs(env))
+
+        return _rel
+
+    def visit_BExp(self, node, *args, **kwargs):
+        kids = [self.visit(a) for a in node.args]
+
+        if node.op == "not":
+            assert node.is_unary()
+            arg = kids[0]
+
+            def _not(env):
+                return not arg(env)
+
+            return _not
+
+        # all arguments are evaluated, as in Interpreter.visit_BExp
+        fn = all if node.op == "and" else any
+
+        if len(kids) == 2:
+            lhs, rhs = kids
+            if node.op == "and":
+
+                def _and(env):
+                    x = lhs(env)
+                    y = rhs(env)
+                    return x and y
+
+                return _and
+
+            def _or(env):
+                x = lhs(env)
+                y = rhs(env)
+                return x or y
+
+            return _or
+
+        def _nop(env):
+            return fn([k(env) for k in kids])
+
+        return _nop
+
+    def visit_AExp(self, node, *args, **kwargs):
+        kids = [self.visit(a) for a in node.args]
+        fn = _ARITH_OPS[node.op]
+
+        if len(kids) == 2:
+            lhs, rhs = kids
+            if node.op == "+":
+
+                def _add(env):
+                    return lhs(env) + rhs(env)
+
+                return _add
+            if node.op == "-":
+
+                def _sub(env):
+                    return lhs(env) - rhs(env)
+
+                return _sub
+            if node.op == "*":
+
+                def _mul(env):
+                    return lhs(env) * rhs(env)
+
+                return _mul
+
+            def _binop(env):
+                return fn(lhs(env), rhs(env))
+
+            return _binop
+
+        def _nop(env):
+            return reduce(fn, [k(env) for k in kids])
+
+        return _nop
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        def _skip(env):
+            pass
+
+        return _skip
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        def _print_state(env):
+            st = State()
+            st.env = env
+            print(st)
+
+        return _print_state
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        name = node.lhs.name
+        rhs = self.visit(node.rhs)
+
+        def _asgn(env):
+            env[name] = rhs(env)
+
+        return _asgn
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        cond = self.visit(node.cond)
+        then_stmt = self.visit(node.then_stmt)
+        if not node.has_else():
+
+            def _if(env):
+                if cond(env):
+                    then_stmt(env)
+
+            return _if
+
+        else_stmt = self.visit(node.else_stmt)
+
+        def _if_else(env):
+            if cond(env):
+                then_stmt(env)
+            else:
+                else_stmt(env)
+
+        return _if_else
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        cond = self.visit(node.cond)
+        body = self.visit(node.body)
+        budget = self._budget
+
+        if budget is not None:
+
+            def _bounded_while(env):
+                while cond(env):
+                    budget.tick(node)
+                    body(env)
+
+            return _bounded_while
+
+        def _while(env):
+            while cond(env):
+                body(env)
+
+        return _while
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        cond = self.visit(node.cond)
+        msg = "Assertion error: " + str(node)
+
+        def _assert(env):
+            if not cond(env):
+                assert False, msg
+
+        return _assert
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        return self.visit_AssertStmt(node, *args, **kwargs)
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        names = [v.name for v in node.vars]
+        provider = self._havoc
+
+        if provider is not None:
+            take_vars = provider.take_vars
+
+            def _havoc_provided(env):
+                for name, val in zip(names, take_vars(names)):
+                    env[name] = val
+
+            return _havoc_provided
+
+        def _havoc(env):
+            for name in names:
+                # assign 0 as the default value
+                env[name] = 0
+
+        return _havoc
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        stmts = tuple(self.visit(s) for s in node.stmts)
+
+        def _stmt_list(env):
+            for s in stmts:
+                s(env)
+
+        return _stmt_list
+
+
 def _parse_args():
     import argparse
 
+    from . import havoc
+
     ap = argparse.ArgumentParser(prog="int", description="WLang Interpreter")
     ap.add_argument("in_file", metavar="FILE", help="WLang program to run")
+    ap.add_argument(
+        "--engine",
+        choices=["tree", "compiled", "vm"],
+        default="tree",
+        help="Execution engine: AST walker, compiled closures, or bytecode VM",
+    )
+    ap.add_argument(
+        "--fuel", type=int, help="Maximal number of loop iterations"
+    )
+    ap.add_argument(
+        "--timeout", type=float, help="Maximal run time in seconds"
+    )
+    ap.add_argument(
+        "--havoc",
+        choices=havoc.KINDS,
+        default="zero",
+        help="Source of values for havoc",
+    )
+    ap.add_argument("--seed", type=int, default=0, help="Seed for --havoc random")
+    ap.add_argument(
+        "--havoc-file", metavar="FILE", help="Values for --havoc file or replay"
+    )
+    ap.add_argument(
+        "--record", metavar="FILE", help="Record havoc'd values into a replay log"
+    )
+    ap.add_argument(
+        "--trace", metavar="FILE", help="Record an execution trace into FILE"
+    )
+    ap.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a per-statement profile of the run",
+    )
+    ap.add_argument(
+        "--profile-stacks",
+        metavar="FILE",
+        help="Write a collapsed-stack profile for flamegraphs to FILE",
+    )
     args = ap.parse_args()
+    if args.havoc in ("file", "replay") and args.havoc_file is None:
+        ap.error("--havoc {} requires --havoc-file".format(args.havoc))
     return args
 
 
 def main():
+    from . import havoc
+
     args = _parse_args()
     prg = ast.parse_file(args.in_file)
     st = State()
-    interp = Interpreter()
-    interp.run(prg, st)
+
+    provider = None
+    if args.havoc != "zero" or args.record is not None:
+        provider = havoc.mk_provider(args.havoc, prg, args.seed, args.havoc_file)
+        if args.record is not None:
+            provider = havoc.RecordingProvider(provider, args.record)
+
+    interp = Interpreter(fuel=args.fuel, timeout=args.timeout, havoc=provider)
+    try:
+        if args.profile or args.profile_stacks is not None:
+            from . import profiler
+
+            prof = profiler.Profiler(havoc=provider, budget=interp.budget)
+            try:
+                prof.run(prg, st)
+            finally:
+                print(prof.report(), end="", file=sys.stderr)
+                if args.profile_stacks is not None:
+                    with open(args.profile_stacks, "w") as f:
+                        prof.write_collapsed(f)
+        elif args.trace is not None:
+            from . import trace
+
+            trace.record(prg, st, args.trace, interp.budget, provider)
+        elif args.engine == "vm":
+            from . import vm
+
+            vm.run(vm.compile(prg), st, havoc=provider, budget=interp.budget)
+        elif args.engine == "compiled":
+            interp.compile(prg)
+            interp.run_compiled(st)
+        else:
+            interp.run(prg, st)
+    except BudgetExceeded as e:
+        print("[int]:", e)
+        print(e.state)
+        return 1
+    finally:
+        if provider is not None:
+            provider.close()
     return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    # run the main() of wlang.int rather than of __main__, so that the
+    # engines in other modules raise the BudgetExceeded caught there
+    from wlang import int as _int
+
+    sys.exit(_int.main())
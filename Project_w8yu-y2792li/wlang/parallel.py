@@ -0,0 +1,202 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Parallel symbolic exploration with work stealing
+
+Every worker process owns its z3 context and runs a WorklistExec. Work
+is handed around as path prefixes, the branch-decision bitstrings and
+path lengths of pending states (see PendingState.prefix()), and a worker re-derives the
+state of a prefix by replaying it from the start of the program, which
+needs no solver calls. When some workers are idle, busy workers donate
+their oldest pending states, the roots of their largest unexplored
+subtrees. Final and error states are sent back to the parent as text.
+"""
+
+import multiprocessing as mp
+import queue
+import traceback
+
+from . import ast, sym, worklist
+
+
+class RemoteState(object):
+    """A final or error state found by a worker"""
+
+    def __init__(self, st):
+        self.error = st.is_error()
+        # s-expressions, z3 terms cannot leave the worker's context
+        self.env = {k: sym.lift(v).sexpr() for k, v in st.env.items()}
+        self.path = [c.sexpr() for c in st.path]
+        # values of the variables in some concrete state, for errors
+        self.model = None
+        if self.error:
+            model = st.pick_concerete()
+            if model is not None:
+                self.model = {k: str(v) for k, v in model.env.items()}
+
+    def is_error(self):
+        return self.error
+
+    def __str__(self):
+        lines = ["{}: {}".format(k, v) for k, v in self.env.items()]
+        lines.append("pc: [{}]".format(", ".join(self.path)))
+        if self.model is not None:
+            lines.append(
+                "model: " + ", ".join("{}={}".format(k, v) for k, v in self.model.items())
+            )
+        return "\n".join(lines) + "\n"
+
+
+class _Worker(worklist.WorklistExec):
+    """Explores one prefix, donating pending states to idle workers"""
+
+    def __init__(self, prefix, idle, results, search, loop_bound):
+        super(_Worker, self).__init__(search, loop_bound, prefix=prefix)
+        self._idle = idle
+        self._results = results
+        self.num_donated = 0
+
+    def poll(self):
+        idle = self._idle.value
+        pending = len(self.scheduler)
+        if idle == 0 or pending < 2:
+            return
+        # keep at least one state for this worker
+        donated = self.scheduler.steal(min(idle, pending - 1))
+        self.num_donated += len(donated)
+        self._results.put(("donate", [ps.prefix() for ps in donated]))
+
+
+def _work(text, search, loop_bound, solver_opts, tasks, results, idle):
+    try:
+        _work_loop(text, search, loop_bound, solver_opts, tasks, results, idle)
+    except Exception:
+        results.put(("fail", traceback.format_exc()))
+
+
+def _work_loop(text, search, loop_bound, solver_opts, tasks, results, idle):
+    prg = ast.parse_string(text)
+    # one solver per worker, its cache outlives the prefixes
+    solver = sym.PathSolver(**solver_opts)
+    while True:
+        with idle.get_lock():
+            idle.value += 1
+        prefix = tasks.get()
+        with idle.get_lock():
+            idle.value -= 1
+        if prefix is None:
+            break
+
+        engine = _Worker(prefix, idle, results, search, loop_bound)
+        engine.run(prg, sym.SymState(solver))
+        found = [RemoteState(s) for s in engine.states]
+        found.extend(RemoteState(s) for s in engine.errors)
+        results.put(("states", found))
+        results.put(("done", engine.steps))
+
+
+class ParallelExec(object):
+    """Explores a program with a pool of worker processes
+
+    cache and slicing are passed to the PathSolver of every worker.
+    """
+
+    def __init__(self, jobs, search="dfs", loop_bound=10, cache=False, slicing=False):
+        self.jobs = jobs
+        self.search = search
+        self.loop_bound = loop_bound
+        self.cache = cache
+        self.slicing = slicing
+        self.states = []
+        self.errors = []
+        # number of prefixes explored
+        self.num_tasks = 0
+        self.steps = 0
+
+    def stats(self):
+        return {"prefixes": self.num_tasks, "steps": self.steps}
+
+    def run(self, text):
+        """Explores the program in text, returns the final states"""
+        for s in self.explore(text):
+            if s.is_error():
+                self.errors.append(s)
+            else:
+                self.states.append(s)
+        return self.states
+
+    def explore(self, text):
+        """Yields final and error states as workers report them
+
+        Closing the generator stops the workers.
+        """
+        tasks = mp.Queue()
+        results = mp.Queue()
+        idle = mp.Value("i", 0)
+        workers = [
+            mp.Process(
+                target=_work,
+                args=(
+                    text,
+                    self.search,
+                    self.loop_bound,
+                    {"cache": self.cache, "slicing": self.slicing},
+                    tasks,
+                    results,
+                    idle,
+                ),
+            )
+            for _ in range(self.jobs)
+        ]
+        for w in workers:
+            w.start()
+
+        try:
+            tasks.put((0, 0, 0))
+            outstanding = 1
+            while outstanding > 0:
+                try:
+                    kind, data = results.get(timeout=1.0)
+                except queue.Empty:
+                    if not all(w.is_alive() for w in workers):
+                        raise RuntimeError("a symbolic execution worker died")
+                    continue
+                if kind == "fail":
+                    raise RuntimeError("symbolic execution worker failed:\n" + data)
+                if kind == "donate":
+                    for prefix in data:
+                        tasks.put(prefix)
+                    outstanding += len(data)
+                elif kind == "states":
+                    yield from data
+                else:
+                    outstanding -= 1
+                    self.num_tasks += 1
+                    self.steps += data
+        finally:
+            for _ in workers:
+                tasks.put(None)
+            for w in workers:
+                w.join(timeout=1.0)
+                if w.is_alive():
+                    w.terminate()
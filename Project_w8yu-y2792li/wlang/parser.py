@@ -139,10 +139,20 @@ class WhileLangParser(Parser):
     @tatsumasu()
     def _skip_stmt_(self):  # noqa
         self._token('skip')
+        self.name_last_node('op')
+        self.ast._define(
+            ['op'],
+            []
+        )
 
     @tatsumasu()
     def _print_state_stmt_(self):  # noqa
         self._token('print_state')
+        self.name_last_node('op')
+        self.ast._define(
+            ['op'],
+            []
+        )
 
     @tatsumasu()
     def _if_stmt_(self):  # noqa
@@ -171,11 +181,15 @@ class WhileLangParser(Parser):
             self._token('inv')
             self._bexp_()
             self.name_last_node('inv')
+        with self._optional():
+            self._token('bound')
+            self._number_()
+            self.name_last_node('bound')
         self._token('do')
         self._stmt_()
         self.name_last_node('body')
         self.ast._define(
-            ['body', 'cond', 'inv'],
+            ['body', 'bound', 'cond', 'inv'],
             []
         )
 
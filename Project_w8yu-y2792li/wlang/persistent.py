@@ -0,0 +1,316 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Persistent data structures for symbolic states
+
+A symbolic state is forked at every branch, so its environment and path
+condition are built from structures that are never modified in place: a
+copy is a new reference to the same structure, and an update only copies
+what it changes. Env and Path wrap them behind the mutable dict and list
+operations that the executors use.
+"""
+
+# bits of the hash consumed per level of a PMap
+_BITS = 5
+_MASK = (1 << _BITS) - 1
+_HASH_BITS = 64
+
+
+def _hash(key):
+    return hash(key) & ((1 << _HASH_BITS) - 1)
+
+
+def _popcount(x):
+    return bin(x).count("1")
+
+
+class _Bitmap(object):
+    """An inner node of a PMap
+
+    Bit i of the bitmap is set when the node has an entry for the hash
+    chunk i. Entries are ordered by chunk, and are either a leaf
+    (hash, key, value, insertion index) or a child node.
+    """
+
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap, entries):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def get(self, shift, h, key, default):
+        bit = 1 << ((h >> shift) & _MASK)
+        if not self.bitmap & bit:
+            return default
+        e = self.entries[_popcount(self.bitmap & (bit - 1))]
+        if isinstance(e, tuple):
+            return e[2] if e[1] == key else default
+        return e.get(shift + _BITS, h, key, default)
+
+    def set(self, shift, h, key, val, seq):
+        """Returns the updated node and whether key is new"""
+        bit = 1 << ((h >> shift) & _MASK)
+        idx = _popcount(self.bitmap & (bit - 1))
+        entries = self.entries
+        if not self.bitmap & bit:
+            entries = entries[:idx] + ((h, key, val, seq),) + entries[idx:]
+            return _Bitmap(self.bitmap | bit, entries), True
+        e = entries[idx]
+        if isinstance(e, tuple):
+            if e[1] == key:
+                if e[2] is val:
+                    return self, False
+                sub, added = (h, key, val, e[3]), False
+            else:
+                sub, added = _pair(shift + _BITS, e, (h, key, val, seq)), True
+        else:
+            sub, added = e.set(shift + _BITS, h, key, val, seq)
+            if sub is e:
+                return self, False
+        return _Bitmap(self.bitmap, entries[:idx] + (sub,) + entries[idx + 1 :]), added
+
+    def leaves(self):
+        for e in self.entries:
+            if isinstance(e, tuple):
+                yield e
+            else:
+                yield from e.leaves()
+
+
+class _Collision(object):
+    """Leaves whose keys have the same hash"""
+
+    __slots__ = ("entries",)
+
+    def __init__(self, entries):
+        self.entries = entries
+
+    def get(self, shift, h, key, default):
+        for e in self.entries:
+            if e[1] == key:
+                return e[2]
+        return default
+
+    def set(self, shift, h, key, val, seq):
+        for i, e in enumerate(self.entries):
+            if e[1] == key:
+                if e[2] is val:
+                    return self, False
+                entries = self.entries[:i] + ((h, key, val, e[3]),) + self.entries[i + 1 :]
+                return _Collision(entries), False
+        return _Collision(self.entries + ((h, key, val, seq),)), True
+
+    def leaves(self):
+        return iter(self.entries)
+
+
+def _pair(shift, a, b):
+    """A node holding two leaves with different keys"""
+    if shift >= _HASH_BITS or a[0] == b[0]:
+        return _Collision((a, b))
+    i = (a[0] >> shift) & _MASK
+    j = (b[0] >> shift) & _MASK
+    if i == j:
+        return _Bitmap(1 << i, (_pair(shift + _BITS, a, b),))
+    if j < i:
+        a, b = b, a
+        i, j = j, i
+    return _Bitmap((1 << i) | (1 << j), (a, b))
+
+
+_EMPTY = _Bitmap(0, ())
+
+
+class PMap(object):
+    """A persistent hash map (a hash array mapped trie)
+
+    set() returns a new map and leaves this one unchanged. The new map
+    shares all nodes but the O(log32 n) ones on the path to the key.
+    items() are in insertion order, as for a dict, rather than in the
+    order of the hashes, which changes from process to process.
+    """
+
+    __slots__ = ("_root", "_len")
+
+    def __init__(self, root=_EMPTY, length=0):
+        self._root = root
+        self._len = length
+
+    def get(self, key, default=None):
+        return self._root.get(0, _hash(key), key, default)
+
+    def set(self, key, val):
+        # keys are never removed, the length is a unique insertion index
+        root, added = self._root.set(0, _hash(key), key, val, self._len)
+        if root is self._root:
+            return self
+        return PMap(root, self._len + 1 if added else self._len)
+
+    def __len__(self):
+        return self._len
+
+    def items(self):
+        for _, k, v, _ in sorted(self._root.leaves(), key=lambda e: e[3]):
+            yield k, v
+
+
+_MISSING = object()
+
+
+class Env(object):
+    """A variable environment backed by a PMap
+
+    Supports the dict operations the executors use. copy() is O(1), the
+    copies share everything until one of them is assigned to.
+    """
+
+    __slots__ = ("_map",)
+
+    def __init__(self, items=None):
+        self._map = PMap()
+        if items is not None:
+            for k, v in items.items():
+                self[k] = v
+
+    def copy(self):
+        res = Env()
+        res._map = self._map
+        return res
+
+    def __getitem__(self, key):
+        res = self._map.get(key, _MISSING)
+        if res is _MISSING:
+            raise KeyError(key)
+        return res
+
+    def __setitem__(self, key, val):
+        self._map = self._map.set(key, val)
+
+    def get(self, key, default=None):
+        return self._map.get(key, default)
+
+    def __contains__(self, key):
+        return self._map.get(key, _MISSING) is not _MISSING
+
+    def __len__(self):
+        return len(self._map)
+
+    def __iter__(self):
+        return (k for k, _ in self._map.items())
+
+    def keys(self):
+        return list(self)
+
+    def values(self):
+        return [v for _, v in self._map.items()]
+
+    def items(self):
+        return list(self._map.items())
+
+    def __eq__(self, other):
+        if isinstance(other, Env):
+            if self._map is other._map:
+                return True
+            other = dict(other.items())
+        return dict(self.items()) == other
+
+    def __repr__(self):
+        return repr(dict(self.items()))
+
+
+class Link(object):
+    """A constraint of a path condition and the constraints before it"""
+
+    __slots__ = ("exp", "parent", "length")
+
+    def __init__(self, exp, parent):
+        self.exp = exp
+        self.parent = parent
+        self.length = 1 if parent is None else parent.length + 1
+
+    def ancestor(self, n):
+        """The link of the prefix of length n, None for 0"""
+        link = self
+        while link is not None and link.length > n:
+            link = link.parent
+        return link
+
+
+class Path(object):
+    """A path condition stored as a linked list from its last constraint
+
+    Paths forked from each other share their common prefix. copy() and
+    append() are O(1); iteration and indexing build a list.
+    """
+
+    __slots__ = ("tip",)
+
+    def __init__(self, exps=()):
+        # the link of the last constraint, None for the empty path
+        self.tip = None
+        self.extend(exps)
+
+    def copy(self):
+        res = Path()
+        res.tip = self.tip
+        return res
+
+    def append(self, exp):
+        self.tip = Link(exp, self.tip)
+
+    def extend(self, exps):
+        for exp in exps:
+            self.tip = Link(exp, self.tip)
+
+    def truncate(self, n):
+        """Drops all but the first n constraints"""
+        if n < len(self):
+            self.tip = self.tip.ancestor(n)
+
+    def __len__(self):
+        return 0 if self.tip is None else self.tip.length
+
+    def _list(self):
+        res = []
+        link = self.tip
+        while link is not None:
+            res.append(link.exp)
+            link = link.parent
+        res.reverse()
+        return res
+
+    def __iter__(self):
+        return iter(self._list())
+
+    def __getitem__(self, i):
+        return self._list()[i]
+
+    def __delitem__(self, i):
+        if not isinstance(i, slice) or i.stop is not None or i.step is not None:
+            raise TypeError("only a suffix of a path can be deleted")
+        start = i.start or 0
+        if start < 0:
+            start = max(0, len(self) + start)
+        self.truncate(start)
+
+    def __repr__(self):
+        return repr(self._list())
@@ -0,0 +1,174 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Per-statement execution profiler for WLang programs
+
+The program is compiled to closures with every statement wrapped in a
+timer. Uninstrumented runs use int.Compiler and pay nothing.
+"""
+
+from io import StringIO
+from time import perf_counter
+
+from . import ast, int
+
+
+class StmtProfile(object):
+    """Profile of a single statement"""
+
+    def __init__(self, node):
+        self.node = node
+        # number of times the statement was executed
+        self.hits = 0
+        # number of loop iterations, for while statements
+        self.iterations = 0
+        # wall time, including nested statements
+        self.cum_time = 0.0
+        # wall time, excluding nested statements
+        self.self_time = 0.0
+
+    def name(self):
+        """A short description of the statement"""
+        text = str(self.node).split("\n")[0]
+        if len(text) > 32:
+            text = text[:29] + "..."
+        return text
+
+    def frame(self):
+        """The name of the statement in a collapsed stack"""
+        return "{}:{}".format(self.node.__class__.__name__, self.node.line)
+
+
+class Profiler(object):
+    def __init__(self, havoc=None, budget=None):
+        # provider of values for havoc, see wlang.havoc
+        self.havoc = havoc
+        # limits of the run, see int.Budget
+        self.budget = budget
+        self.stmts = []
+        # map from stack of statement indices to self time
+        self.stacks = dict()
+
+    def compile(self, prg):
+        return ProfileCompiler(self, self.havoc, self.budget).compile(prg)
+
+    def run(self, prg, state):
+        code = self.compile(prg)
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            code(state.env)
+        except int.BudgetExceeded as e:
+            e.state = state
+            raise
+        return state
+
+    def add(self, node):
+        self.stmts.append(StmtProfile(node))
+        return len(self.stmts) - 1
+
+    def hot_spots(self):
+        """Statements that were executed, hottest first"""
+        return sorted(
+            (p for p in self.stmts if p.hits > 0),
+            key=lambda p: p.self_time,
+            reverse=True,
+        )
+
+    def report(self):
+        buf = StringIO()
+        buf.write(
+            "{:>5} {:<32} {:>10} {:>10} {:>10} {:>10}\n".format(
+                "line", "statement", "hits", "iters", "cum(s)", "self(s)"
+            )
+        )
+        for p in self.hot_spots():
+            buf.write(
+                "{:>5} {:<32} {:>10} {:>10} {:>10.6f} {:>10.6f}\n".format(
+                    "?" if p.node.line is None else p.node.line,
+                    p.name(),
+                    p.hits,
+                    p.iterations if isinstance(p.node, ast.WhileStmt) else "",
+                    p.cum_time,
+                    p.self_time,
+                )
+            )
+        return buf.getvalue()
+
+    def write_collapsed(self, out):
+        """Writes self time per stack in microseconds, for flamegraph.pl"""
+        for stack, t in self.stacks.items():
+            frames = ";".join(self.stmts[i].frame() for i in stack)
+            out.write("{} {}\n".format(frames, round(t * 1e6)))
+
+
+class ProfileCompiler(int.Compiler):
+    """Compiles a program into closures that time every statement"""
+
+    def __init__(self, profiler, havoc=None, budget=None):
+        super(ProfileCompiler, self).__init__(budget=budget, havoc=havoc)
+        self._prof = profiler
+        # stack of (statement index, time spent in nested statements)
+        self._stack = []
+
+    def visit(self, node, *args, **kwargs):
+        if not isinstance(node, ast.Stmt):
+            return super(ProfileCompiler, self).visit(node, *args, **kwargs)
+
+        stmt_idx = self._prof.add(node)
+        p = self._prof.stmts[stmt_idx]
+        code = super(ProfileCompiler, self).visit(node, *args, profile=p, **kwargs)
+        stack = self._stack
+        stacks = self._prof.stacks
+
+        def _timed(env):
+            stack.append([stmt_idx, 0.0])
+            start = perf_counter()
+            try:
+                code(env)
+            finally:
+                t = perf_counter() - start
+                key = tuple(f[0] for f in stack)
+                _, nested = stack.pop()
+                p.hits += 1
+                p.cum_time += t
+                p.self_time += t - nested
+                stacks[key] = stacks.get(key, 0.0) + t - nested
+                if len(stack) > 0:
+                    stack[-1][1] += t
+
+        return _timed
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        cond = self.visit(node.cond)
+        body = self.visit(node.body)
+        p = kwargs["profile"]
+        budget = self._budget
+
+        def _while(env):
+            while cond(env):
+                if budget is not None:
+                    budget.tick(node)
+                p.iterations += 1
+                body(env)
+
+        return _while
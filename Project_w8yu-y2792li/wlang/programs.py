@@ -0,0 +1,72 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Sample programs shared by the tests and the benchmarks
+
+In the templates, N is replaced by a number before parsing.
+"""
+
+# a bug next to a region with many paths; N is the number of iterations
+SEARCH_PRG = """
+havoc x, y;
+i := 0; s := 0;
+if y > 100 then {
+  while i < N do { if x > i then s := s + 1 else s := s - 1; i := i + 1 }
+} else skip;
+assert y < 50
+"""
+
+# a concrete loop of N iterations, only the last branch depends on the input
+CONCRETE_PRG = """
+havoc x;
+i := 0;
+s := 0;
+while i < N do {
+  if i * 3 > 7 then s := s + i else s := s - 1;
+  i := i + 1
+};
+if x > s then y := 1 else y := 2
+"""
+
+# fails after N/2 iterations of an input dependent loop
+DEEP_BUG_PRG = "havoc x; y := 0; while x > 0 do { x := x - 1; y := y + 2 }; assert y < N"
+
+# x saturates at N, after which the states at the loop head repeat
+SUBSUME_PRG = """
+havoc n, y;
+x := 0;
+while n > 0 do {
+  if y > x then x := x + 1 else skip;
+  if x > N then x := N else skip;
+  n := n - 1
+};
+assert x <= N
+"""
+
+
+def branch_prg(n):
+    """N independent branches, 2^N paths of depth N"""
+    lines = ["havoc " + ", ".join("x{}".format(i) for i in range(n)) + ";", "s := 0;"]
+    for i in range(n):
+        lines.append("if x{0} > {0} then s := s + x{0} else s := s - 1;".format(i))
+    lines.append("assert s > -{}".format(n))
+    return "\n".join(lines)
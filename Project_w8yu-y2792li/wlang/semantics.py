@@ -23,6 +23,15 @@
 from . import ast
 
 
+def _at(node, parsed):
+    """Records the source line of a parsed statement in its AST node"""
+    info = getattr(parsed, "parseinfo", None)
+    if info is not None:
+        # tatsu counts lines from 0
+        node.line = info.line + 1
+    return node
+
+
 class WlangSemantics(object):
     def __init__(self):
         pass
@@ -36,29 +45,39 @@ class WlangSemantics(object):
         return ast.StmtList(stmts)
 
     def asgn_stmt(self, stmt, *args, **kwargs):
-        return ast.AsgnStmt(stmt.lhs, stmt.rhs)
+        return _at(ast.AsgnStmt(stmt.lhs, stmt.rhs), stmt)
 
     def skip_stmt(self, stmt, *args, **kwargs):
-        return ast.SkipStmt()
+        return _at(ast.SkipStmt(), stmt)
 
     def print_state_stmt(self, stmt, *args, **kwargs):
-        return ast.PrintStateStmt()
+        return _at(ast.PrintStateStmt(), stmt)
 
     def if_stmt(self, if_stmt, *args, **kwargs):
-        return ast.IfStmt(if_stmt.cond, if_stmt.then_stmt, if_stmt.else_stmt)
+        return _at(
+            ast.IfStmt(if_stmt.cond, if_stmt.then_stmt, if_stmt.else_stmt), if_stmt
+        )
 
     def while_stmt(self, while_stmt, *args, **kwargs):
-        return ast.WhileStmt(while_stmt.cond, while_stmt.body, while_stmt.inv)
+        return _at(
+            ast.WhileStmt(
+                while_stmt.cond,
+                while_stmt.body,
+                while_stmt.inv,
+                None if while_stmt.bound is None else while_stmt.bound.val,
+            ),
+            while_stmt,
+        )
 
     def assert_stmt(self, assert_stmt, *args, **kwargs):
-        return ast.AssertStmt(assert_stmt.cond)
+        return _at(ast.AssertStmt(assert_stmt.cond), assert_stmt)
 
     def assume_stmt(self, assume_stmt, *args, **kwargs):
-        return ast.AssumeStmt(assume_stmt.cond)
+        return _at(ast.AssumeStmt(assume_stmt.cond), assume_stmt)
 
     def havoc_stmt(self, havoc_stmt, *args, **kwargs):
         assert len(havoc_stmt) >= 1
-        return ast.HavocStmt(havoc_stmt.vars)
+        return _at(ast.HavocStmt(havoc_stmt.vars), havoc_stmt)
 
     def bool_const(self, const, *args, **kwargs):
         if str(const) == "true":
@@ -25,18 +25,363 @@ import io
 import z3
 from functools import reduce
 
-from . import ast, int, undef_visitor
+from . import ast, int, persistent, undef_visitor
+
+
+# Values are hybrid: a value that is known concretely is a Python int or
+# bool and is only lifted to z3 when it is combined with a symbolic one.
+
+def is_concrete(v):
+    return not isinstance(v, z3.ExprRef)
+
+
+def lift(v):
+    """The z3 term of a hybrid value"""
+    if not is_concrete(v):
+        return v
+    if isinstance(v, bool):
+        return z3.BoolVal(v)
+    return z3.IntVal(v)
+
+
+def _not(c):
+    return (not c) if is_concrete(c) else z3.Not(c)
+
+
+def _div(x, y):
+    """Integer division of z3: the quotient is rounded towards -infinity
+    for a positive divisor and towards +infinity for a negative one"""
+    if y == 0:
+        # unspecified in z3, leave it to the solver
+        return z3.IntVal(x) / z3.IntVal(y)
+    if y > 0:
+        return x // y
+    return -(x // -y)
+
+
+class ExprIds(object):
+    """Memoized z3 ids of constraints
+
+    get_id() is a call into z3, a dictionary lookup on the Python id is
+    cheaper. Keeping the constraints alive makes sure that neither id is
+    reused.
+    """
+
+    def __init__(self):
+        # map from the Python id of a constraint to (constraint, z3 id)
+        self._ids = dict()
+
+    def get(self, exp):
+        entry = self._ids.get(id(exp))
+        if entry is None:
+            entry = (exp, exp.get_id())
+            self._ids[id(exp)] = entry
+        return entry[1]
+
+    def key(self, path):
+        """The set of ids of a list of constraints"""
+        return frozenset(self.get(exp) for exp in path)
+
+
+class QueryCache(object):
+    """A KLEE-style counterexample cache for feasibility queries
+
+    A query is a set of constraints. The cache answers it without a
+    solver call when
+      - the same set was seen before,
+      - it contains a set that is known to be unsat, or
+      - one of the recently found models satisfies all of it.
+    Models remember which constraints they were found to satisfy, so
+    along a path only the new constraints are evaluated.
+    """
+
+    # number of models kept for evaluation
+    MAX_MODELS = 16
+    # number of unsat sets kept for superset checks
+    MAX_UNSAT = 256
+
+    def __init__(self, ids=None):
+        self._ids = ids if ids is not None else ExprIds()
+        # map from a frozenset of constraint ids to (result, model)
+        self._results = dict()
+        # unsat sets of constraint ids, smallest first
+        self._unsat = []
+        # list of [model, ids of true constraints, ids of false constraints],
+        # most recently used first
+        self._models = []
+        self.stats = {"exact": 0, "unsat": 0, "model": 0, "miss": 0}
+
+    def key(self, path):
+        return self._ids.key(path)
+
+    def lookup(self, key, path):
+        """Returns (result, model) for a query, or None on a miss"""
+        res = self._results.get(key)
+        if res is not None:
+            self.stats["exact"] += 1
+            return res
+
+        for u in self._unsat:
+            if u <= key:
+                self.stats["unsat"] += 1
+                return (z3.unsat, None)
+
+        for i, entry in enumerate(self._models):
+            if self._satisfies(entry, path):
+                self.stats["model"] += 1
+                if i > 0:
+                    del self._models[i]
+                    self._models.insert(0, entry)
+                return (z3.sat, entry[0])
+
+        self.stats["miss"] += 1
+        return None
+
+    def _satisfies(self, entry, path):
+        model, true_ids, false_ids = entry
+        for exp in path:
+            i = self._ids.get(exp)
+            if i in true_ids:
+                continue
+            if i in false_ids:
+                return False
+            if z3.is_true(model.eval(exp, model_completion=True)):
+                true_ids.add(i)
+            else:
+                false_ids.add(i)
+                return False
+        return True
+
+    def insert(self, key, res, model=None):
+        """Records the result of a query, with its model if it is sat"""
+        self._results[key] = (res, model)
+        if res == z3.unsat:
+            self._unsat.append(key)
+            self._unsat.sort(key=len)
+            del self._unsat[self.MAX_UNSAT :]
+        elif model is not None:
+            self._models.insert(0, [model, set(key), set()])
+            del self._models[self.MAX_MODELS :]
+
+    def num_hits(self):
+        return self.stats["exact"] + self.stats["unsat"] + self.stats["model"]
+
+    def num_misses(self):
+        return self.stats["miss"]
+
+
+class PathSolver(object):
+    """An incremental solver shared by all states of an exploration
+
+    The solver holds the path condition of the last state that was
+    checked, one push() frame per constraint. To check another state, only
+    the frames past the common prefix of the two path conditions are
+    popped and the new constraints pushed. Sibling states differ in their
+    last constraint, so a query usually costs one pop and one push, and
+    nothing has to be re-asserted when a state is forked. For a
+    persistent.Path the common prefix is found from the shared links,
+    without walking the constraints that both paths have in common.
+
+    With slicing, the path condition is split into independent groups of
+    constraints that share no free constants. A conjunction of independent
+    groups is sat iff every group is, and the result of every group is
+    cached, so a query only solves the groups that changed, usually the
+    one that contains the new branch condition.
+    """
+
+    def __init__(self, solver=None, cache=False, slicing=False):
+        self._solver = solver
+        if self._solver is None:
+            self._solver = z3.Solver()
+        # the constraints currently asserted, one frame each
+        self._frames = []
+        # the persistent.Link of every frame, None if it is not known
+        self._links = []
+        self.num_queries = 0
+        # number of queries that reached z3
+        self.num_checks = 0
+        self._ids = ExprIds()
+        self.cache = QueryCache(self._ids) if cache else None
+        self.slicing = slicing
+        # map from z3 id of a term to the z3 ids of its free constants
+        self._consts = dict()
+        # map from a set of constraint ids of a group to its result
+        self._groups = dict()
+        self.num_group_hits = 0
+        # the last query and its model, if it is known
+        self._path = []
+        self._model = None
+
+    def _sync(self, path):
+        if isinstance(path, persistent.Path):
+            self._sync_links(path.tip)
+            return
+        frames = self._frames
+        n = min(len(frames), len(path))
+        i = 0
+        while i < n and frames[i] is path[i]:
+            i += 1
+        self._pop_to(i)
+        for exp in path[i:]:
+            self._push(exp, None)
+
+    def _sync_links(self, tip):
+        links = self._links
+        n = 0 if tip is None else tip.length
+        i = min(len(links), n)
+        link = None if tip is None else tip.ancestor(i)
+        while i > 0 and links[i - 1] is not link:
+            link = link.parent
+            i -= 1
+        self._pop_to(i)
+        suffix = []
+        link = tip
+        while link is not None and link.length > i:
+            suffix.append(link)
+            link = link.parent
+        for link in reversed(suffix):
+            self._push(link.exp, link)
+
+    def _pop_to(self, n):
+        frames = self._frames
+        if n < len(frames):
+            self._solver.pop(len(frames) - n)
+            del frames[n:]
+            del self._links[n:]
+
+    def _push(self, exp, link):
+        self._solver.push()
+        self._solver.add(exp)
+        self._frames.append(exp)
+        self._links.append(link)
+
+    def check(self, path):
+        self.num_queries += 1
+        # paths are extended in place, remember this one as it is now
+        self._path = path.copy()
+        self._model = None
+        if not self.slicing:
+            return self._check(path)
+
+        res = z3.sat
+        for group in self.slice(path):
+            key = self._ids.key(group)
+            group_res = self._groups.get(key)
+            if group_res is None:
+                group_res = self._check(group)
+                if group_res != z3.unknown:
+                    self._groups[key] = group_res
+            else:
+                self.num_group_hits += 1
+            if group_res == z3.unsat:
+                res = z3.unsat
+                break
+            if group_res == z3.unknown:
+                res = z3.unknown
+        # a model of one group is not a model of the path
+        self._model = None
+        return res
+
+    def _check(self, path):
+        """Checks a conjunction of constraints"""
+        if self.cache is None:
+            self._sync(path)
+            self.num_checks += 1
+            return self._solver.check()
+
+        key = self.cache.key(path)
+        hit = self.cache.lookup(key, path)
+        if hit is not None:
+            res, self._model = hit
+            return res
+
+        self._sync(path)
+        self.num_checks += 1
+        res = self._solver.check()
+        self._model = self._solver.model() if res == z3.sat else None
+        if res != z3.unknown:
+            self.cache.insert(key, res, self._model)
+        return res
+
+    def _free_consts(self, exp, exp_id):
+        res = self._consts.get(exp_id)
+        if res is None:
+            if z3.is_const(exp):
+                if exp.decl().kind() == z3.Z3_OP_UNINTERPRETED:
+                    res = frozenset([exp_id])
+                else:
+                    res = frozenset()
+            else:
+                res = frozenset().union(
+                    *(self._free_consts(c, c.get_id()) for c in exp.children())
+                )
+            self._consts[exp_id] = res
+        return res
+
+    def slice(self, path):
+        """Splits constraints into groups that share no free constants
+
+        Constraints keep their relative order in a group. Constraints
+        without free constants form a group of their own.
+        """
+        parent = dict()
+
+        def find(c):
+            root = c
+            while parent[root] != root:
+                root = parent[root]
+            while parent[c] != root:
+                parent[c], c = root, parent[c]
+            return root
+
+        consts = []
+        for exp in path:
+            cs = self._free_consts(exp, self._ids.get(exp))
+            consts.append(cs)
+            root = None
+            for c in cs:
+                if c not in parent:
+                    parent[c] = c
+                r = find(c)
+                if root is None:
+                    root = r
+                elif r != root:
+                    parent[r] = root
+
+        groups = dict()
+        for exp, cs in zip(path, consts):
+            root = find(next(iter(cs))) if len(cs) > 0 else None
+            groups.setdefault(root, []).append(exp)
+        return list(groups.values())
+
+    def stats(self):
+        res = {"queries": self.num_queries, "solver checks": self.num_checks}
+        if self.slicing:
+            res["group hits"] = self.num_group_hits
+        if self.cache is not None:
+            for k, v in self.cache.stats.items():
+                res["cache " + k] = v
+        return res
+
+    def model(self):
+        """A model of the last query, which must have been sat"""
+        if self._model is None:
+            self._sync(self._path)
+            self._solver.check()
+            self._model = self._solver.model()
+        return self._model
 
 
 class SymState(object):
     def __init__(self, solver=None):
         # environment mapping variables to symbolic constants
-        self.env = dict()
+        self.env = persistent.Env()
         # path condition
-        self.path = list()
-        self._solver = solver
-        if self._solver is None:
-            self._solver = z3.Solver()
+        self.path = persistent.Path()
+        if isinstance(solver, PathSolver):
+            self._solver = solver
+        else:
+            self._solver = PathSolver(solver)
 
         # true if this is an error state
         self._is_error = False
@@ -45,8 +390,12 @@ class SymState(object):
 
     def add_pc(self, *exp):
         """Add constraints to the path condition"""
-        self.path.extend(exp)
-        self._solver.append(exp)
+        for e in exp:
+            if is_concrete(e):
+                if e:
+                    continue
+                e = z3.BoolVal(False)
+            self.path.append(e)
 
     def is_error(self):
         return self._is_error
@@ -56,46 +405,62 @@ class SymState(object):
 
     def is_empty(self):
         """Check whether the current symbolic state has any concrete states"""
-        res = self._solver.check()
+        res = self._path_solver().check(self.path)
         return res == z3.unsat
 
     def pick_concerete(self):
         """Pick a concrete state consistent with the symbolic state.
            Return None if no such state exists"""
-        res = self._solver.check()
+        solver = self._path_solver()
+        res = solver.check(self.path)
         if res != z3.sat:
             return None
-        model = self._solver.model()
+        model = solver.model()
         st = int.State()
         for (k, v) in self.env.items():
-            st.env[k] = model.eval(v)
+            st.env[k] = model.eval(lift(v))
         return st
 
+    def _path_solver(self):
+        if self._solver is None:
+            self._solver = PathSolver()
+        return self._solver
+
+    def release(self):
+        """Drops the solver shared with the states it was forked from
+
+        A released state keeps its env and path condition, a solver of
+        its own is created if it is queried again.
+        """
+        self._solver = None
+        self._saved_states = []
+
     def fork(self):
-        """Fork the current state into two identical states that can evolve separately"""
-        child = SymState()
-        child.env = dict(self.env)
-        child.add_pc(*self.path)
+        """Fork the current state into two identical states that can evolve separately
+
+        The child shares the solver of the parent, and the environment and
+        the path condition are persistent, so forking takes constant time.
+        """
+        child = SymState(self._solver)
+        child.env = self.env.copy()
+        child.path = self.path.copy()
 
         return (self, child)
     
     def push(self):
-        self._saved_states.append((dict(self.env), list(self.path)))
-        self._solver.push()
+        self._saved_states.append((self.env.copy(), self.path.copy()))
 
     def pop(self):
-        # if self._saved_states:
         self.env, self.path = self._saved_states.pop()
-        # else:
-        #     print("Error: No saved states to pop")
-        self._solver.pop()
                          
     def __repr__(self):
         return str(self)
 
     def to_smt2(self):
         """Returns the current state as an SMT-LIB2 benchmark"""
-        return self._solver.to_smt2()
+        solver = z3.Solver()
+        solver.add(list(self.path))
+        return solver.to_smt2()
 
     def __str__(self):
         buf = io.StringIO()
@@ -111,17 +476,100 @@ class SymState(object):
         return buf.getvalue()
 
 
+def term_size(exp, limit=None):
+    """Number of distinct nodes of exp, counting stops past limit"""
+    seen = set()
+    todo = [exp]
+    while len(todo) > 0:
+        e = todo.pop()
+        i = e.get_id()
+        if i in seen:
+            continue
+        seen.add(i)
+        if limit is not None and len(seen) > limit:
+            break
+        todo.extend(e.children())
+    return len(seen)
+
+
 class SymExec(ast.AstVisitor):
-    def __init__(self):
+    """Symbolic execution of a program
+
+    Assigned terms can be kept small: with simplify they are passed
+    through z3.simplify(), and a term with more than max_term_size nodes
+    is replaced by a fresh constant whose defining equality is added to
+    the path condition, so that terms do not grow with the number of
+    unrolled iterations.
+
+    Loops without an invariant are unrolled loop_bound times. The bound
+    of a single loop is taken from loop_bounds, a map from line to bound,
+    or else from the bound annotation of the loop. With max_loop_bound, a
+    path that reaches the bound keeps iterating, up to max_loop_bound
+    iterations, as long as it can still leave the loop: loops whose exit
+    condition has become infeasible are not unrolled further. A loop
+    with a concrete condition does not fork and is extended up to
+    max_loop_bound regardless. Without max_loop_bound, every loop,
+    concrete or not, is cut at its bound. The paths cut at a bound are
+    counted in bound_hits.
+    """
+
+    # number of simplified terms kept
+    MAX_SIMPLIFIED = 4096
+
+    def __init__(
+        self,
+        max_term_size=None,
+        simplify=False,
+        loop_bound=10,
+        loop_bounds=None,
+        max_loop_bound=None,
+    ):
         self.uv = undef_visitor.UndefVisitor()
         self.states = []
+        self.errors = []
+        self.max_term_size = max_term_size
+        self.simplify = simplify
+        # map from z3 id of a term to the term and its simplified form
+        self._simplified = dict()
+        # number of fresh constants introduced for large terms
+        self.num_defs = 0
+        # map from id of a loop to the variables its body modifies
+        self._loop_defs = dict()
+        self.loop_bound = loop_bound
+        self.loop_bounds = dict(loop_bounds) if loop_bounds is not None else dict()
+        self.max_loop_bound = max_loop_bound
+        # map from line of a loop to the number of paths cut at its bound
+        self.bound_hits = dict()
 
     def run(self, ast, state):
-        # set things up and
-        # call self.visit (ast, state=state)
-        self.visit(ast, state=state, statement_list=[])
+        """Explores ast to completion, returns the final states
+
+        States that violate an assertion or an invariant are collected
+        in self.errors.
+        """
+        for st in self.explore(ast, state):
+            if st.is_error():
+                self.errors.append(st)
+            else:
+                self.states.append(st)
         return self.states
 
+    def explore(self, ast, state, release=False):
+        """Yields final and error states as soon as they are found
+
+        The search is depth-first and only advances while the caller asks
+        for the next state, so breaking out of the loop stops it. With
+        release, yielded states no longer hold on to the solver of the
+        search, see SymState.release().
+        """
+        for st in self._explore(ast, state):
+            if release:
+                st.release()
+            yield st
+
+    def _explore(self, ast, state):
+        return self.visit(ast, state=state, statement_list=[])
+
     def visit_Next(self, *args, **kwargs):
         idx = kwargs["idx"] + 1
         level = kwargs["level"]
@@ -134,24 +582,82 @@ class SymExec(ast.AstVisitor):
             if idx < len(statement_list):
                 kwargs["idx"] = idx
                 statement = statement_list[idx]
-                self.visit(statement, *args, **kwargs)
+                yield from self.visit(statement, *args, **kwargs)
             else:
                 if level > 0:
                     nkwargs = kwargs["prev"]
-                    self.visit_Next(*args, **nkwargs)
+                    yield from self.visit_Next(*args, **nkwargs)
                 else: # if level == 0 and not state.is_empty():
                     _, new_state = state.fork()
-                    self.states.append(new_state)
+                    yield new_state
                     # print(f"New state added: {new_state}")ç
 
+    def _assign(self, state, name, val):
+        """Binds name to val in state, keeping the term small"""
+        if not is_concrete(val):
+            if self.simplify:
+                val = self._simplify(val)
+            if (self.max_term_size is not None
+                    and term_size(val, self.max_term_size) > self.max_term_size):
+                const = z3.FreshInt(name)
+                state.add_pc(const == val)
+                self.num_defs += 1
+                val = const
+            elif z3.is_int_value(val):
+                val = val.as_long()
+        state.env[name] = val
+
+    def _defs(self, node):
+        """Names of the variables modified by the body of a loop"""
+        defs = self._loop_defs.get(id(node))
+        if defs is None:
+            self.uv.check(node.body)
+            defs = sorted(v.name for v in self.uv.get_defs())
+            self._loop_defs[id(node)] = defs
+        return defs
+
+    def bound_of(self, node):
+        """Number of iterations loop node is unrolled to"""
+        bound = self.loop_bounds.get(node.line)
+        if bound is None:
+            bound = node.bound if node.bound is not None else self.loop_bound
+        return bound
+
+    def _extends(self, iters, exits):
+        """True if a path at the bound of a loop keeps iterating
+
+        exits tells whether the exit condition of the loop is feasible on
+        the path.
+        """
+        return (
+            self.max_loop_bound is not None
+            and exits
+            and iters < self.max_loop_bound
+        )
+
+    def _cut(self, node):
+        """Records a path cut at the bound of loop node"""
+        self.bound_hits[node.line] = self.bound_hits.get(node.line, 0) + 1
+
+    def _simplify(self, exp):
+        key = exp.get_id()
+        entry = self._simplified.get(key)
+        if entry is None:
+            if len(self._simplified) >= self.MAX_SIMPLIFIED:
+                self._simplified.clear()
+            # keeping exp alive makes sure its id is not reused
+            entry = (exp, z3.simplify(exp))
+            self._simplified[key] = entry
+        return entry[1]
+
     def visit_IntVar(self, node, *args, **kwargs):
         return kwargs['state'].env[node.name]
 
     def visit_BoolConst(self, node, *args, **kwargs):
-        return z3.BoolVal(node.val)
+        return node.val
 
     def visit_IntConst(self, node, *args, **kwargs):
-        return z3.IntVal(node.val)
+        return node.val
 
     def visit_RelExp(self, node, *args, **kwargs):
         lhs = self.visit(node.arg(0), *args, **kwargs)
@@ -173,7 +679,21 @@ class SymExec(ast.AstVisitor):
         if node.op == "not":
             assert node.is_unary()
             assert len(kids) == 1
-            return z3.Not(kids[0])
+            return _not(kids[0])
+
+        # decide what the concrete arguments decide
+        unit = node.op == "and"
+        syms = []
+        for k in kids:
+            if not is_concrete(k):
+                syms.append(k)
+            elif k != unit:
+                return k
+        if len(syms) == 0:
+            return unit
+        if len(syms) == 1:
+            return syms[0]
+        kids = syms
 
         fn = None
         base = None
@@ -205,41 +725,51 @@ class SymExec(ast.AstVisitor):
             fn = lambda x, y: x / y
 
         assert fn is not None
+        if node.op == "/" and all(is_concrete(k) for k in kids):
+            fn = _div
         return reduce(fn, kids)
 
     def visit_SkipStmt(self, node, *args, **kwargs):
-        self.visit_Next(*args, **kwargs)
+        yield from self.visit_Next(*args, **kwargs)
 
     def visit_PrintStateStmt(self, node, *args, **kwargs):
         print(kwargs["state"])
-        self.visit_Next(*args, **kwargs)
+        yield from self.visit_Next(*args, **kwargs)
 
     def visit_AsgnStmt(self, node, *args, **kwargs):
         state = kwargs['state']
-        state.env[node.lhs.name] = self.visit(node.rhs, *args, **kwargs)
-        self.visit_Next(*args, **kwargs)
+        self._assign(state, node.lhs.name, self.visit(node.rhs, *args, **kwargs))
+        yield from self.visit_Next(*args, **kwargs)
 
     def visit_IfStmt(self, node, *args, **kwargs):
         state = kwargs["state"]
         cond = self.visit(node.cond, *args, **kwargs)
         # print(kwargs["state"])
+        if is_concrete(cond):
+            if cond:
+                yield from self.visit(node.then_stmt, *args, **kwargs)
+            elif node.has_else():
+                yield from self.visit(node.else_stmt, *args, **kwargs)
+            else:
+                yield from self.visit_Next(*args, **kwargs)
+            return
 
         state.push()
         state.add_pc(cond)
         # print(kwargs["state"])
         if not state.is_empty():
             # kwargs["state"] = state
-            self.visit(node.then_stmt, *args, **kwargs)
+            yield from self.visit(node.then_stmt, *args, **kwargs)
         state.pop()
         # print(kwargs["state"])
 
-        state.add_pc(z3.Not(cond))
+        state.add_pc(_not(cond))
         if not state.is_empty():
             # kwargs["state"] = state
             if node.has_else():
-                self.visit(node.else_stmt, *args, **kwargs)
+                yield from self.visit(node.else_stmt, *args, **kwargs)
             else:
-                self.visit_Next(*args, **kwargs)
+                yield from self.visit_Next(*args, **kwargs)
 
     def visit_WhileStmt(self, node, *args, **kwargs):
         state = kwargs["state"]
@@ -247,22 +777,21 @@ class SymExec(ast.AstVisitor):
             inv1 = self.visit(node.inv, *args, **kwargs)
             # print(kwargs["state"])
             state.push()
-            state.add_pc(z3.Not(inv1))
+            state.add_pc(_not(inv1))
             # assert inv
             if not state.is_empty():
-                state.mk_error()
-                state.is_error()
                 print("inv fails initiation")
+                _, bad = state.fork()
+                bad.mk_error()
+                yield bad
             # print(kwargs["state"])
             state.pop()
             # print(kwargs["state"])
             state.add_pc(inv1)
             if not state.is_empty():
                 # havoc V
-                self.uv.check(node.body)
-                vars = self.uv.get_defs()
-                for v in vars:
-                    state.env[v.name] = z3.FreshInt(v.name)
+                for name in self._defs(node):
+                    state.env[name] = z3.FreshInt(name)
                     # print(v.name)
                 # assume inv
                 # kwargs["state"] = state
@@ -277,75 +806,106 @@ class SymExec(ast.AstVisitor):
                 if not state.is_empty():
                     # kwargs["state"] = state
                     kwargs['cont'] = False
-                    self.visit(node.body, *args, **kwargs)
+                    yield from self.visit(node.body, *args, **kwargs)
                     kwargs['cont'] = True
                     # assert inv
                     inv3 = self.visit(node.inv, *args, **kwargs)
                     state.push()
-                    state.add_pc(z3.Not(inv3))
+                    state.add_pc(_not(inv3))
                     if not state.is_empty():
-                        state.mk_error()
-                        state.is_error()
                         print("inv fails initiation")
+                        _, bad = state.fork()
+                        bad.mk_error()
+                        yield bad
                     state.pop()
                     # state.add_pc(inv3)
                 state.pop()
                 # not b
-                state.add_pc(z3.Not(cond))
+                state.add_pc(_not(cond))
                 if not state.is_empty():
                     # kwargs["state"] = state
                     # print(kwargs["state"])
-                    self.visit_Next(*args, **kwargs)
+                    yield from self.visit_Next(*args, **kwargs)
         else:
             key = f"loop-{kwargs['idx']}"
             if key not in kwargs["loop"]:
                 kwargs["loop"][key] = 0
             loop = kwargs["loop"][key]
+            bound = self.bound_of(node)
             cond = self.visit(node.cond, *args, **kwargs)
+            if is_concrete(cond):
+                if not cond:
+                    yield from self.visit_Next(*args, **kwargs)
+                    kwargs["loop"][key] = 0
+                elif loop < bound or self._extends(loop, True):
+                    kwargs["loop"][key] += 1
+                    kwargs["idx"] -= 1
+                    yield from self.visit(node.body, *args, **kwargs)
+                else:
+                    self._cut(node)
+                    kwargs["loop"][key] = 0
+                return
             state.push()
-            state.add_pc(z3.Not(cond))
+            state.add_pc(_not(cond))
             # print(state._solver.assertions())
-            if not state.is_empty():
-                self.visit_Next(*args, **kwargs)
+            exits = not state.is_empty()
+            if exits:
+                yield from self.visit_Next(*args, **kwargs)
             state.pop()
             state.add_pc(cond)
             # print(state._solver.assertions())
-            if loop < 10:
+            if loop < bound or self._extends(loop, exits):
                 kwargs["loop"][key] += 1
                 if not state.is_empty():
                     kwargs["idx"] -= 1
                     # print(state)
-                    self.visit(node.body, *args, **kwargs)
+                    yield from self.visit(node.body, *args, **kwargs)
                     # print(state)
                 else:
                     kwargs["loop"][key] = 0
             else:
+                if not state.is_empty():
+                    self._cut(node)
                 kwargs["loop"][key] = 0
 
     def visit_AssertStmt(self, node, *args, **kwargs):
         # Don't forget to print an error message if an assertion might be violated
         state = kwargs["state"]
         cond = self.visit(node.cond, *args, **kwargs)
+        if is_concrete(cond):
+            if cond:
+                yield from self.visit_Next(*args, **kwargs)
+            else:
+                print("Assertion might be violated")
+                _, bad = state.fork()
+                bad.mk_error()
+                yield bad
+            return
         state.push()
-        state.add_pc(z3.Not(cond))
+        state.add_pc(_not(cond))
         if not state.is_empty():
-            state.mk_error()
-            state.is_error()
             print("Assertion might be violated")
+            _, bad = state.fork()
+            bad.mk_error()
+            yield bad
         state.pop()
 
         state.add_pc(cond)
         if not state.is_empty():
             # kwargs["state"] = state
-            self.visit_Next(*args, **kwargs)
+            yield from self.visit_Next(*args, **kwargs)
 
     def visit_AssumeStmt(self, node, *args, **kwargs):
         state = kwargs["state"]
         cond = self.visit(node.cond, *args, **kwargs)
+        if is_concrete(cond):
+            if cond:
+                yield from self.visit_Next(*args, **kwargs)
+            return
         state.add_pc(cond)
         if not state.is_empty():
             # kwargs["state"] = state
-            self.visit_Next(*args, **kwargs)
+            yield from self.visit_Next(*args, **kwargs)
         else:
             state.pick_concerete()
 
@@ -355,7 +915,7 @@ class SymExec(ast.AstVisitor):
             # assign 0 as the default value
             state.env[v.name] = z3.FreshInt(v.name)
         # kwargs["state"] = state
-        self.visit_Next(*args, **kwargs)
+        yield from self.visit_Next(*args, **kwargs)
 
     def visit_StmtList(self, node, *args, **kwargs):
         statement_list = kwargs["statement_list"]
@@ -370,37 +930,116 @@ class SymExec(ast.AstVisitor):
         kwargs["statement_list"] = node.stmts
         kwargs['loop'] = {}
         kwargs["cont"] = True
-        self.visit_Next(*args, **kwargs)
+        yield from self.visit_Next(*args, **kwargs)
 
 
 
 
 def _parse_args():
     import argparse
+    import builtins
     ap = argparse.ArgumentParser(prog='sym',
                                  description='WLang Interpreter')
     ap.add_argument('in_file', metavar='FILE',
                     help='WLang program to interpret')
+    ap.add_argument('--cache', action='store_true',
+                    help='Answer feasibility queries from a counterexample cache')
+    ap.add_argument('--slice', action='store_true',
+                    help='Only solve the independent part of a path condition')
+    ap.add_argument('--search', default=None,
+                    choices=['dfs', 'bfs', 'random-path', 'coverage', 'distance'],
+                    help='Explore with a worklist in this order')
+    ap.add_argument('--simplify', action='store_true',
+                    help='Simplify terms when they are assigned')
+    ap.add_argument('--max-term-size', type=builtins.int, default=None,
+                    metavar='N',
+                    help='Name terms larger than N nodes by fresh constants')
+    ap.add_argument('--loop-bound', type=builtins.int, default=10,
+                    metavar='N', help='Unroll loops at most N times')
+    ap.add_argument('--unroll', type=_line_bound, action='append',
+                    default=[], metavar='LINE=N',
+                    help='Unroll the loop at LINE at most N times')
+    ap.add_argument('--max-loop-bound', type=builtins.int, default=None,
+                    metavar='N',
+                    help='Unroll loops past their bound, up to N times, '
+                    'while their exit is feasible')
+    ap.add_argument('--subsume', action='store_true',
+                    help='Drop states subsumed by an earlier state at loop '
+                    'heads and join points')
+    ap.add_argument('--merge', action='store_true',
+                    help='Merge the states of both sides of an if at its end')
+    ap.add_argument('--jobs', '-j', type=builtins.int, default=None,
+                    help='Explore in parallel with this many worker processes')
+    ap.add_argument('--stats', action='store_true',
+                    help='Print solver statistics')
     args = ap.parse_args()
+    if args.jobs is not None:
+        if args.merge or args.subsume:
+            ap.error('--merge and --subsume cannot be combined with --jobs')
+        if args.simplify or args.max_term_size is not None:
+            ap.error('--simplify and --max-term-size cannot be combined with --jobs')
+        if len(args.unroll) > 0 or args.max_loop_bound is not None:
+            ap.error('--unroll and --max-loop-bound cannot be combined with --jobs')
     return args
 
 
+def _line_bound(arg):
+    """Parses LINE=N of --unroll"""
+    import argparse
+    import builtins
+    line, _, bound = arg.partition('=')
+    try:
+        return builtins.int(line), builtins.int(bound)
+    except ValueError:
+        raise argparse.ArgumentTypeError('expected LINE=N, got ' + arg)
+
+
 def main():
     args = _parse_args()
     prg = ast.parse_file(args.in_file)
-    st = SymState()
-    sym = SymExec()
-
-    states = sym.run(prg, st)
-    if states is None:
-        print('[symexec]: no output states')
+    solver = PathSolver(cache=args.cache, slicing=args.slice)
+    st = SymState(solver)
+    if args.jobs is not None:
+        from . import parallel
+        sym = parallel.ParallelExec(args.jobs, args.search or 'dfs',
+                                    args.loop_bound, args.cache, args.slice)
+        with open(args.in_file) as f:
+            found = sym.explore(f.read())
     else:
-        count = 0
-        for out in states:
+        bounds = dict(args.unroll)
+        if args.search is None and not args.merge and not args.subsume:
+            sym = SymExec(args.max_term_size, args.simplify, args.loop_bound,
+                          bounds, args.max_loop_bound)
+        else:
+            from . import worklist
+            sym = worklist.WorklistExec(args.search or 'dfs', args.loop_bound,
+                                        merge=args.merge,
+                                        max_term_size=args.max_term_size,
+                                        simplify=args.simplify,
+                                        loop_bounds=bounds,
+                                        max_loop_bound=args.max_loop_bound,
+                                        subsume=args.subsume)
+        found = sym.explore(prg, st, release=True)
+    count = 0
+    for out in found:
+        if out.is_error():
+            print('[symexec]: error state reached')
+        else:
             count = count + 1
             print('[symexec]: symbolic state reached')
-            print(out)
-        print('[symexec]: found', count, 'symbolic states')
+        print(out, flush=True)
+    print('[symexec]: found', count, 'symbolic states')
+    if args.subsume:
+        print('[symexec]: {} states subsumed, {} solver calls'
+              .format(sym.num_subsumed, sym.num_subsume_queries))
+    if args.jobs is None:
+        for line, n in sorted(sym.bound_hits.items()):
+            print('[symexec]: loop at line {} cut {} paths at its bound'
+                  .format(line, n))
+    if args.stats:
+        stats = sym.stats() if args.jobs is not None else solver.stats()
+        for k, v in stats.items():
+            print('[symexec]: {}: {}'.format(k, v))
     return 0
 
 
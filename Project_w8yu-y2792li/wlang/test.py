@@ -23,7 +23,23 @@
 import unittest
 
 if __name__ == '__main__':
-    test_names = ['test_int', 'test_util',
-                  'test_stats_visitor', 'test_undef_visitor', 'test_sym']
+    test_names = ['test_int',
+                  'test_vm',
+                  'test_vec_int',
+                  'test_batch',
+                  'test_cov',
+                  'test_profiler',
+                  'test_havoc',
+                  'test_trace',
+                  'test_worklist',
+                  'test_parallel',
+                  'test_persistent',
+                  'test_vc',
+                  'test_bmc',
+                  'test_concolic',
+                  'test_util',
+                  'test_stats_visitor',
+                  'test_undef_visitor',
+                  'test_sym']
     suite = unittest.defaultTestLoader.loadTestsFromNames (['wlang.' + t for t in test_names])
     result = unittest.TextTestRunner().run(suite)
@@ -0,0 +1,106 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from . import batch
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self._write("a.prg", "havoc x; y := x + 1; assert y > 1")
+        self._write("b.prg", "x := 0; while true do x := x + 1")
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def _write(self, name, text):
+        fname = os.path.join(self.dir, name)
+        with open(fname, "w") as f:
+            f.write(text)
+        return fname
+
+    def test_run_job(self):
+        job = batch.Job(0, os.path.join(self.dir, "a.prg"))
+        res = batch.run_job(job)
+        self.assertEqual(res["status"], "assert")
+        self.assertEqual(res["env"], {"x": 0, "y": 1})
+
+    def test_timeout(self):
+        job = batch.Job(0, os.path.join(self.dir, "b.prg"))
+        res = batch.run_job(job, timeout=0.2)
+        self.assertEqual(res["status"], "budget")
+        self.assertEqual(res["reason"], "deadline")
+
+    def test_fuel(self):
+        job = batch.Job(0, os.path.join(self.dir, "b.prg"))
+        res = batch.run_job(job, fuel=50)
+        self.assertEqual(res["status"], "budget")
+        self.assertEqual(res["env"], {"x": 50})
+        self.assertEqual(res["line"], 1)
+
+    def test_sym_job(self):
+        job = batch.Job(0, os.path.join(self.dir, "a.prg"), mode="sym")
+        res = batch.run_job(job)
+        self.assertEqual(res["status"], "ok")
+        self.assertEqual(len(res["states"]), 1)
+        res = batch.run_job(job, timeout=5)
+        self.assertEqual(res["status"], "ok")
+        self.assertEqual(len(res["states"]), 1)
+
+    def test_manifest(self):
+        manifest = self._write(
+            "jobs.jsonl",
+            json.dumps({"file": "a.prg", "inputs": {"x": 5}})
+            + "\n"
+            + json.dumps({"file": "a.prg", "mode": "sym"})
+            + "\n",
+        )
+        jobs = batch.load_jobs(manifest)
+        self.assertEqual([j.mode for j in jobs], ["int", "sym"])
+
+        # the havoc of x takes the value of the input vector
+        res = list(batch.run_jobs(jobs[:1], workers=1))
+        self.assertEqual(res[0]["status"], "ok")
+        self.assertEqual(res[0]["env"], {"x": 5, "y": 6})
+
+    def test_inputs(self):
+        fname = self._write("c.prg", "havoc x, y; havoc z; assert x + y + z < 10")
+        inputs = self._write("inputs.jsonl", "[1, 2, 3]\n[4, 5]\n{\"z\": 12}\n")
+        jobs = batch.load_jobs(self.dir, inputs_file=inputs)
+        jobs = [j for j in jobs if j.file == fname]
+        res = [batch.run_job(j) for j in jobs]
+        self.assertEqual([r["status"] for r in res], ["ok", "ok", "assert"])
+        self.assertEqual(res[1]["env"], {"x": 4, "y": 5, "z": 0})
+        self.assertEqual(res[2]["env"], {"x": 0, "y": 0, "z": 12})
+
+    def test_pool(self):
+        jobs = batch.load_jobs(self.dir)
+        self.assertEqual(len(jobs), 2)
+        res = sorted(batch.run_jobs(jobs, workers=2, timeout=0.5), key=lambda r: r["id"])
+        self.assertEqual([r["status"] for r in res], ["assert", "budget"])
+        json.dumps(res)
@@ -0,0 +1,102 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from . import ast, bmc, int, programs, sym, worklist
+
+PRGS = [
+    "havoc x; if x > 3 then assert x > 5; assume x < 0",
+    "havoc x, y; assume y >= 0; c := 0; r := x; while c < y inv r = x + 1 do { r := r + 1; c := c + 1}",
+    "havoc x, y; assume y >= 0; c := 0; r := x; while c < y inv c <= y and r = x + c do { r := r + 1; c := c + 1}; assert r = x + y",
+    "havoc x; y := 0; while x > 0 do { x := x - 1; y := y + 2 }; assert y < 14",
+    "x := 3; havoc y; while x > 0 do { if y > x then y := y - x else assert y < 5; x := x - 1 }",
+    programs.SEARCH_PRG.replace("N", "6"),
+]
+
+
+class TestBmc(unittest.TestCase):
+    def _holds(self, check):
+        """Evaluates the checked condition in the witness"""
+        st = int.State()
+        st.env.update({k: v.as_long() for k, v in check.witness.env.items()})
+        return int.Interpreter().visit(check.node.inv if check.kind == bmc.INV else check.node.cond, state=st)
+
+    def test_same_as_paths(self):
+        for prg in PRGS:
+            node = ast.parse_string(prg)
+            engine = worklist.WorklistExec()
+            engine.run(node, sym.SymState())
+            for single in (False, True):
+                checker = bmc.Bmc(single=single)
+                failed = checker.check(node)
+                self.assertEqual(len(failed) > 0, len(engine.errors) > 0, prg)
+                self.assertLessEqual(len(failed), len(engine.errors))
+                for c in failed:
+                    self.assertFalse(self._holds(c), prg)
+
+    def test_witness(self):
+        checker = bmc.Bmc()
+        failed = checker.check(ast.parse_string(PRGS[0]))
+        self.assertEqual(len(failed), 1)
+        self.assertIn(failed[0].witness.env["x"].as_long(), (4, 5))
+
+        # the loop is unrolled up to the bound only
+        failed = bmc.Bmc(loop_bound=6).check(ast.parse_string(PRGS[3]))
+        self.assertEqual(len(failed), 0)
+        failed = bmc.Bmc(loop_bound=7).check(ast.parse_string(PRGS[3]))
+        self.assertEqual(failed[0].witness.env["y"].as_long(), 14)
+        prg = ast.parse_string(PRGS[3].replace("do", "bound 7 do"))
+        self.assertEqual(len(bmc.Bmc(loop_bound=6).check(prg)), 1)
+
+    def test_bound_hits(self):
+        checker = bmc.Bmc(loop_bound=6)
+        self.assertEqual(len(checker.check(ast.parse_string(PRGS[3]))), 0)
+        self.assertEqual(list(checker.bound_hits), [1])
+        checker = bmc.Bmc(loop_bound=3)
+        self.assertEqual(len(checker.check(ast.parse_string(PRGS[4]))), 0)
+        self.assertEqual(checker.bound_hits, dict())
+        # an invariant replaces the loop, nothing is cut
+        checker = bmc.Bmc(loop_bound=1)
+        checker.check(ast.parse_string(PRGS[2]))
+        self.assertEqual(checker.bound_hits, dict())
+
+    def test_deep(self):
+        prg = ast.parse_string("havoc x; y := 0; while x > 0 do { x := x - 1; y := y + 2 }; assert y < 500")
+        checker = bmc.Bmc(loop_bound=400)
+        failed = checker.check(prg)
+        self.assertGreaterEqual(failed[0].witness.env["y"].as_long(), 500)
+        defs = len(checker.defs)
+        # a second check encodes the program afresh
+        self.assertEqual(len(checker.check(prg)), 1)
+        self.assertEqual(len(checker.defs), defs)
+        self.assertEqual(len(checker.checks), 1)
+
+    def test_one_query(self):
+        prg = ast.parse_string(programs.branch_prg(12))
+        checker = bmc.Bmc(single=True)
+        failed = checker.check(prg)
+        self.assertEqual(len(failed), 1)
+        self.assertEqual(checker.num_checks, 1)
+        x = [failed[0].witness.env["x{}".format(i)].as_long() for i in range(12)]
+        self.assertTrue(all(v <= i for i, v in enumerate(x)))
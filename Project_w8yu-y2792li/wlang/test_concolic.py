@@ -0,0 +1,68 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from . import ast, concolic, programs, sym, worklist
+
+
+class TestConcolic(unittest.TestCase):
+    def _run(self, prg, **kwargs):
+        engine = concolic.Concolic(**kwargs)
+        errors = engine.run(ast.parse_string(prg))
+        return engine, errors
+
+    def test_errors(self):
+        engine, errors = self._run("havoc x; if x > 3 then assert x > 5; assume x < 0")
+        self.assertEqual(len(errors), 1)
+        self.assertIn(errors[0].inputs, ([4], [5]))
+        self.assertEqual(len(engine.runs), 3)
+
+        # every run reaches the assertion with a different number of steps
+        prg = programs.SEARCH_PRG.replace("N", "6")
+        engine, errors = self._run(prg)
+        paths = worklist.WorklistExec(loop_bound=7)
+        paths.run(ast.parse_string(prg), sym.SymState())
+        self.assertEqual(len(errors), len(paths.errors))
+        self.assertEqual(engine.num_divergences, 0)
+
+    def test_concrete(self):
+        # only the branch after the loop depends on the input
+        engine, errors = self._run(programs.CONCRETE_PRG.replace("N", "500"))
+        self.assertEqual((len(engine.runs), engine.num_solver_calls), (2, 1))
+        self.assertEqual(len(errors), 0)
+
+    def test_deep(self):
+        prg = programs.DEEP_BUG_PRG.replace("N", "40")
+        paths = worklist.WorklistExec()
+        paths.run(ast.parse_string(prg), sym.SymState())
+        self.assertEqual(len(paths.errors), 0)
+        engine, errors = self._run(prg, max_runs=25)
+        self.assertEqual(errors[0].inputs, [20])
+
+    def test_div(self):
+        # the first run divides by 0
+        engine, errors = self._run("havoc x, y; if x / y = 3 then assert x < 100")
+        self.assertEqual(len(errors), 1)
+        x, y = errors[0].inputs
+        self.assertTrue(x >= 100 and sym._div(x, y) == 3)
@@ -0,0 +1,111 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from . import ast, cov, int
+
+
+class TestCov(unittest.TestCase):
+    def test_one(self):
+        prg1 = "x := 0;\nwhile x < 3 do\n  x := x + 1;\nif x > 5 then\n  y := 1\nelse\n  y := 2"
+        ast1 = ast.parse_string(prg1)
+        c = cov.Coverage(ast1)
+        st = c.run(int.State())
+        self.assertEqual(st.env, {"x": 3, "y": 2})
+
+        lines = c.by_line()
+        self.assertEqual(lines[1], [(cov.STMT, True)])
+        self.assertEqual(
+            lines[2], [(cov.STMT, True), (cov.BODY, True), (cov.EXIT, True)]
+        )
+        self.assertEqual(
+            lines[4], [(cov.STMT, True), (cov.THEN, False), (cov.ELSE, True)]
+        )
+        self.assertEqual(lines[5], [(cov.STMT, False)])
+        self.assertEqual(c.num_covered(), 8)
+        self.assertEqual(c.num_points(), 10)
+        self.assertIn("statements: 5/6 branches: 3/4", c.report())
+
+    def test_merge(self):
+        ast1 = ast.parse_string("havoc x; if x > 0 then y := 1 else y := 2")
+        c = cov.Coverage(ast1)
+        code = c.compile()
+        c.run(int.State(), code)
+        self.assertEqual(c.num_covered(), 4)
+        other = bytearray(c.bits)
+
+        c.reset()
+        self.assertEqual(c.num_covered(), 0)
+        st = int.State()
+        c.run(st, code)
+        # same run, the else branch again
+        self.assertEqual(c.num_covered(), 4)
+        self.assertEqual(bytes(c.bits), bytes(other))
+
+        # a run that took the then branch
+        then_bits = bytearray(len(c.bits))
+        then_bits[c.branch_ids(ast1.stmts[1])[0]] = 1
+        c.merge(then_bits)
+        # the then branch implies its statement
+        self.assertEqual(c.num_covered(), 6)
+
+    def test_single_stmt(self):
+        c = cov.Coverage(ast.parse_string("x := 1"))
+        c.run(int.State())
+        self.assertEqual(c.num_covered(), 1)
+
+    def test_assert(self):
+        prg1 = "havoc x;\nif x = 0 then { y := 2; assert y = 3; y := 4 };\ny := 5"
+        c = cov.Coverage(ast.parse_string(prg1))
+        with self.assertRaises(AssertionError):
+            c.run(int.State())
+        lines = c.by_line()
+        self.assertEqual(
+            lines[2],
+            [
+                (cov.STMT, True),
+                (cov.THEN, True),
+                (cov.ELSE, False),
+                (cov.STMT, True),
+                (cov.STMT, True),
+                (cov.STMT, False),
+            ],
+        )
+        self.assertEqual(lines[3], [(cov.STMT, False)])
+
+    def test_raise(self):
+        for prg1, exc in (
+            ("x := 1;\ny := x / 0;\nz := 2", ZeroDivisionError),
+            ("x := 1;\ny := w + 1;\nz := 2", KeyError),
+        ):
+            c = cov.Coverage(ast.parse_string(prg1))
+            with self.assertRaises(exc):
+                c.run(int.State())
+            lines = c.by_line()
+            self.assertEqual(lines[2], [(cov.STMT, True)])
+            self.assertEqual(lines[3], [(cov.STMT, False)])
+
+        # reads of variables that are set are not split off
+        c = cov.Coverage(ast.parse_string("havoc x;\ny := x + 1;\nz := y"))
+        c.compile()
+        self.assertEqual(len(c._segments), 1)
@@ -0,0 +1,93 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import os
+import tempfile
+import unittest
+
+from . import ast, havoc, int, vm
+
+
+class TestHavoc(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.tmp):
+            os.remove(os.path.join(self.tmp, name))
+        os.rmdir(self.tmp)
+
+    def test_random(self):
+        a = havoc.RandomProvider(seed=7)
+        b = havoc.RandomProvider(seed=7)
+        va = a.take(3) + a.take(5000)
+        vb = b.take(5003)
+        self.assertEqual(va, vb)
+        self.assertTrue(all(-(2**31) <= v < 2**31 for v in va))
+        self.assertNotEqual(va, havoc.RandomProvider(seed=8).take(5003))
+
+    def test_boundary(self):
+        p = havoc.BoundaryProvider([1, 2, 3])
+        self.assertEqual(p.take(2), [1, 2])
+        self.assertEqual(p.take(4), [3, 1, 2, 3])
+
+        prg = ast.parse_string("havoc x; if x > 100 then x := 1")
+        values = havoc.BoundaryProvider.for_program(prg).values
+        for v in (99, 100, 101, 2**63 - 1):
+            self.assertIn(v, values)
+
+    def test_file(self):
+        import numpy as np
+
+        fname = os.path.join(self.tmp, "vals.npy")
+        np.save(fname, np.arange(5, dtype=np.int64))
+        p = havoc.FileProvider(fname)
+        self.assertEqual(p.take(3), [0, 1, 2])
+        with self.assertRaises(EOFError):
+            p.take(3)
+
+        fname = os.path.join(self.tmp, "vals.bin")
+        np.array([7, -8], dtype="<i8").tofile(fname)
+        p = havoc.FileProvider(fname, cycle=True)
+        self.assertEqual(p.take(5), [7, -8, 7, -8, 7])
+
+    def test_replay(self):
+        prg = ast.parse_string("havoc x, y; while x > y do { havoc y }; z := x - y")
+        fname = os.path.join(self.tmp, "log")
+
+        rec = havoc.RecordingProvider(havoc.RandomProvider(seed=1), fname)
+        st1 = int.Interpreter(havoc=rec).run(prg, int.State())
+        rec.close()
+
+        interp = int.Interpreter(havoc=havoc.ReplayProvider(fname))
+        interp.compile(prg)
+        st2 = interp.run_compiled(int.State())
+        self.assertEqual(st1.env, st2.env)
+
+        st3 = vm.run(vm.compile(prg), havoc=havoc.ReplayProvider(fname))
+        self.assertEqual(st1.env, st3.env)
+
+    def test_mk_provider(self):
+        self.assertEqual(havoc.mk_provider("zero").take(2), [0, 0])
+        with self.assertRaises(ValueError):
+            havoc.mk_provider("bogus")
@@ -1,42 +1,97 @@
-# # The MIT License (MIT)
-# # Copyright (c) 2016 Arie Gurfinkel
-
-# # Permission is hereby granted, free of charge, to any person obtaining
-# # a copy of this software and associated documentation files (the
-# # "Software"), to deal in the Software without restriction, including
-# # without limitation the rights to use, copy, modify, merge, publish,
-# # distribute, sublicense, and/or sell copies of the Software, and to
-# # permit persons to whom the Software is furnished to do so, subject to
-# # the following conditions:
-
-# # The above copyright notice and this permission notice shall be
-# # included in all copies or substantial portions of the Software.
-
-# # THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
-# # EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
-# # MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
-# # NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
-# # LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
-# # OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
-# # WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
-
-# import unittest
-
-# from . import ast, int
-
-
-# class TestInt(unittest.TestCase):
-#     def test_one(self):
-#         prg1 = "x := 10; print_state"
-#         # test parser
-#         ast1 = ast.parse_string(prg1)
-#         interp = int.Interpreter()
-#         st = int.State()
-#         st = interp.run(ast1, st)
-#         self.assertIsNotNone(st)
-#         # x is defined
-#         self.assertIn("x", st.env)
-#         # x is 10
-#         self.assertEquals(st.env["x"], 10)
-#         # no other variables in the state
-#         self.assertEquals(len(st.env), 1)
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from . import ast, int
+
+
+class TestInt(unittest.TestCase):
+    def test_one(self):
+        prg1 = "x := 10; print_state"
+        # test parser
+        ast1 = ast.parse_string(prg1)
+        interp = int.Interpreter()
+        st = int.State()
+        st = interp.run(ast1, st)
+        self.assertIsNotNone(st)
+        # x is defined
+        self.assertIn("x", st.env)
+        # x is 10
+        self.assertEquals(st.env["x"], 10)
+        # no other variables in the state
+        self.assertEquals(len(st.env), 1)
+
+    def test_compile(self):
+        prg1 = "havoc y; x := 0; s := 0; while x < 10 do { if x > 4 and not x = 7 then s := s + x * 2 else s := s - 1; x := x + 1 }; assert s >= 0"
+        ast1 = ast.parse_string(prg1)
+        interp = int.Interpreter()
+        st1 = interp.run(ast1, int.State())
+
+        interp.compile(ast1)
+        st2 = interp.run_compiled(int.State())
+        self.assertEqual(st1.env, st2.env)
+        self.assertEqual(st2.env["s"], 50)
+
+    def test_compile_assert(self):
+        ast1 = ast.parse_string("x := 1; assert x > 1 or x < 0")
+        interp = int.Interpreter()
+        interp.compile(ast1)
+        with self.assertRaises(AssertionError):
+            interp.run_compiled(int.State())
+
+    def test_long_loop(self):
+        # a3/q4b.prg with a concrete y far beyond the recursion limit
+        prg1 = "x := 3; y := 20000; assume y >= 0; c := 0; r := x; while c < y inv c <= y and r = x + c do { r := r + 1; c := c + 1 }; assert r = x + y"
+        ast1 = ast.parse_string(prg1)
+        interp = int.Interpreter()
+        st = interp.run(ast1, int.State())
+        self.assertEqual(st.env["r"], 20003)
+        self.assertEqual(st.env["c"], 20000)
+
+    def test_fuel(self):
+        prg1 = "x := 0;\nwhile true do\n  x := x + 1"
+        ast1 = ast.parse_string(prg1)
+        interp = int.Interpreter(fuel=100)
+        with self.assertRaises(int.BudgetExceeded) as cm:
+            interp.run(ast1, int.State())
+        self.assertEqual(cm.exception.reason, "fuel")
+        self.assertEqual(cm.exception.line, 2)
+        self.assertEqual(cm.exception.state.env["x"], 100)
+
+        interp.compile(ast1)
+        with self.assertRaises(int.BudgetExceeded) as cm:
+            interp.run_compiled(int.State())
+        self.assertEqual(cm.exception.state.env["x"], 100)
+
+        # the budget is reset for every run
+        st = int.Interpreter(fuel=10).run(ast.parse_string("x := 0; while x < 10 do x := x + 1"), int.State())
+        self.assertEqual(st.env["x"], 10)
+
+    def test_deadline(self):
+        ast1 = ast.parse_string("x := 0; while true do x := x + 1")
+        interp = int.Interpreter(timeout=0.05)
+        interp.compile(ast1)
+        with self.assertRaises(int.BudgetExceeded) as cm:
+            interp.run_compiled(int.State())
+        self.assertEqual(cm.exception.reason, "deadline")
+        self.assertGreater(cm.exception.state.env["x"], 0)
@@ -0,0 +1,79 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from . import ast, parallel, programs, sym, worklist
+
+
+class TestParallel(unittest.TestCase):
+    def _split(self, prg, search="dfs"):
+        """Final and error states of an exploration split after a few steps"""
+        part = worklist.WorklistExec(search)
+        part.POLL_PERIOD = 5
+        stolen = []
+        part.poll = lambda: stolen.extend(part.scheduler.steal(len(part.scheduler)))
+        part.run(ast.parse_string(prg), sym.SymState())
+        states, errors = len(part.states), len(part.errors)
+        self.assertGreater(len(stolen), 0)
+        for ps in stolen:
+            e = worklist.WorklistExec(search, prefix=ps.prefix())
+            e.run(ast.parse_string(prg), sym.SymState())
+            states += len(e.states)
+            errors += len(e.errors)
+        return states, errors
+
+    def test_prefix(self):
+        prg = programs.SEARCH_PRG.replace("N", "4")
+        engine = worklist.WorklistExec()
+        engine.run(ast.parse_string(prg), sym.SymState())
+        self.assertEqual(self._split(prg), (len(engine.states), len(engine.errors)))
+
+        # the assertion after the last branch is replayed, not checked again
+        prg = (
+            "havoc x, y; if x > 0 then y := 1 else y := 2; assert y = 1 or x > -5;"
+            " z := 1; z := 2; z := 3; if y > x then skip else skip"
+        )
+        for search in worklist.SCHEDULERS:
+            engine = worklist.WorklistExec(search)
+            engine.run(ast.parse_string(prg), sym.SymState())
+            self.assertEqual((len(engine.states), len(engine.errors)), (2, 1))
+            self.assertEqual(self._split(prg, search), (2, 1), search)
+
+    def test_jobs(self):
+        prg = programs.SEARCH_PRG.replace("N", "6")
+        engine = worklist.WorklistExec()
+        engine.run(ast.parse_string(prg), sym.SymState())
+
+        p = parallel.ParallelExec(2)
+        p.run(prg)
+        self.assertEqual(len(p.states), len(engine.states))
+        self.assertEqual(len(p.errors), len(engine.errors))
+        self.assertGreaterEqual(p.num_tasks, 1)
+        for s in p.errors:
+            self.assertIsNotNone(s.model)
+
+        # with the solver options of the sequential engine
+        p = parallel.ParallelExec(2, cache=True, slicing=True)
+        p.run(prg)
+        self.assertEqual((len(p.states), len(p.errors)), (len(engine.states), len(engine.errors)))
@@ -0,0 +1,107 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import random
+import unittest
+
+import z3
+
+from . import persistent, sym
+
+
+class _Key(object):
+    # every key has the same hash
+    def __init__(self, x):
+        self.x = x
+
+    def __hash__(self):
+        return 7
+
+    def __eq__(self, other):
+        return self.x == other.x
+
+
+class TestPersistent(unittest.TestCase):
+    def test_pmap(self):
+        rnd = random.Random(0)
+        m = persistent.PMap()
+        d = dict()
+        history = []
+        for _ in range(2000):
+            k, v = rnd.randrange(300), rnd.random()
+            history.append((m, dict(d)))
+            m = m.set(k, v)
+            d[k] = v
+        history.append((m, d))
+        for m, d in history[::37]:
+            self.assertEqual(len(m), len(d))
+            self.assertEqual(dict(m.items()), d)
+            # in insertion order, as a dict
+            self.assertEqual(list(m.items()), list(d.items()))
+
+        m = persistent.PMap()
+        for i in range(4):
+            m = m.set(_Key(i), i)
+        self.assertEqual(len(m.set(_Key(2), 5)), 4)
+        self.assertEqual(m.get(_Key(3)), 3)
+        self.assertIsNone(m.get(_Key(4)))
+
+    def test_env(self):
+        env = persistent.Env({"x": 1, "y": 2})
+        other = env.copy()
+        other["x"] = 3
+        other["z"] = 4
+        self.assertEqual(env, {"x": 1, "y": 2})
+        self.assertEqual(other, {"x": 3, "y": 2, "z": 4})
+        self.assertIn("z", other)
+        self.assertNotIn("z", env)
+        with self.assertRaises(KeyError):
+            env["z"]
+
+    def test_path(self):
+        p = persistent.Path([1, 2, 3])
+        q = p.copy()
+        q.append(4)
+        self.assertEqual((list(p), list(q)), ([1, 2, 3], [1, 2, 3, 4]))
+        self.assertIs(q.tip.parent, p.tip)
+        self.assertEqual(q[1:], [2, 3, 4])
+        del q[1:]
+        self.assertEqual((list(q), len(q)), ([1], 1))
+
+    def test_solver(self):
+        x = z3.Int("x")
+        solver = sym.PathSolver()
+        st = sym.SymState(solver)
+        st.env["x"] = x
+        st.add_pc(x > 0, x < 10)
+        _, a = st.fork()
+        _, b = st.fork()
+        a.add_pc(x > 5)
+        b.add_pc(x < 5)
+        self.assertFalse(a.is_empty())
+        self.assertFalse(b.is_empty())
+        # the shared prefix stays asserted, only the last frame changes
+        self.assertEqual(solver._links[:2], [st.path.tip.parent, st.path.tip])
+        b.add_pc(x > 7)
+        self.assertTrue(b.is_empty())
+        self.assertGreater(a.pick_concerete().env["x"].as_long(), 5)
@@ -0,0 +1,63 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import io
+import unittest
+
+from . import ast, int, profiler
+
+
+class TestProfiler(unittest.TestCase):
+    def test_one(self):
+        prg1 = "x := 0;\nwhile x < 5 do {\n  y := 0;\n  while y < 3 do y := y + 1;\n  x := x + 1\n}"
+        ast1 = ast.parse_string(prg1)
+        prof = profiler.Profiler()
+        st = prof.run(ast1, int.State())
+        self.assertEqual(st.env, {"x": 5, "y": 3})
+
+        by_line = dict()
+        for p in prof.stmts:
+            by_line.setdefault(p.node.line, []).append(p)
+        outer = by_line[2][0]
+        self.assertEqual((outer.hits, outer.iterations), (1, 5))
+        inner = [p for p in by_line[4] if isinstance(p.node, ast.WhileStmt)][0]
+        self.assertEqual((inner.hits, inner.iterations), (5, 15))
+        self.assertGreaterEqual(outer.cum_time, inner.cum_time)
+        self.assertEqual(len(prof.hot_spots()), 6)
+        self.assertIn("while x < 5 do", prof.report())
+
+        out = io.StringIO()
+        prof.write_collapsed(out)
+        self.assertIn("WhileStmt:2;WhileStmt:4;AsgnStmt:4 ", out.getvalue())
+
+    def test_assert(self):
+        prof = profiler.Profiler()
+        with self.assertRaises(AssertionError):
+            prof.run(ast.parse_string("x := 1; assert x > 1"), int.State())
+        self.assertEqual([p.hits for p in prof.stmts], [1, 1])
+
+    def test_budget(self):
+        prof = profiler.Profiler(budget=int.Budget(fuel=100))
+        with self.assertRaises(int.BudgetExceeded) as cm:
+            prof.run(ast.parse_string("x := 0; while true do x := x + 1"), int.State())
+        self.assertEqual(cm.exception.reason, "fuel")
+        self.assertEqual(cm.exception.state.env, {"x": 100})
@@ -23,7 +23,7 @@
 import unittest
 import z3
 
-from . import ast, sym
+from . import ast, programs, sym
 
 
 class TestSym (unittest.TestCase):
@@ -199,3 +199,119 @@ class TestSym (unittest.TestCase):
         st = sym.SymState()
         out = [s for s in engine.run(ast1, st)]
         self.assertEquals(len(out), 363)
+
+    def test_query_cache(self):
+        x, y = z3.Ints("x y")
+        solver = sym.PathSolver(cache=True)
+        self.assertEqual(solver.check([x > 0]), z3.sat)
+        # satisfied by the model of the first query
+        self.assertEqual(solver.check([x > 0, x > -5]), z3.sat)
+        self.assertEqual(solver.check([x > 0, x < 0]), z3.unsat)
+        # superset of an unsat set
+        self.assertEqual(solver.check([y > 3, x > 0, x < 0]), z3.unsat)
+        self.assertEqual(solver.check([x > 0]), z3.sat)
+        self.assertEqual(solver.cache.stats, {"exact": 1, "unsat": 1, "model": 1, "miss": 2})
+        self.assertEqual(solver.num_checks, 2)
+
+    def test_query_cache_engine(self):
+        prg1 = "havoc x, y; while x > 0 and x < 5 do { x := x - 1; if y > x then y := y - 1 }; assert y < 100"
+        ast1 = ast.parse_string(prg1)
+        solver = sym.PathSolver(cache=True)
+        out = [s for s in sym.SymExec().run(ast1, sym.SymState(solver))]
+        self.assertEqual(len(out), 15)
+        self.assertGreater(solver.cache.num_hits(), 0)
+        self.assertLess(solver.num_checks, solver.num_queries)
+        for s in out:
+            self.assertIsNotNone(s.pick_concerete())
+
+    def test_slice(self):
+        x, y, z = z3.Ints("x y z")
+        solver = sym.PathSolver(slicing=True)
+        groups = solver.slice([x > 0, y > 0, z3.BoolVal(True), z > y, x < 5])
+        self.assertEqual([len(g) for g in groups], [2, 2, 1])
+        self.assertEqual(solver.check([x > 0, y > 0, x < 0]), z3.unsat)
+        self.assertEqual(solver.check([x > 0, y > 0, y < 3]), z3.sat)
+        self.assertEqual(solver.num_checks, 3)
+        # the group of y is not solved again
+        self.assertEqual(solver.check([x > 0, y > 0, y < 3, x < 5]), z3.sat)
+        self.assertEqual(solver.num_checks, 4)
+        m = solver.model()
+        self.assertTrue(z3.is_true(m.eval(z3.And(x > 0, y > 0, y < 3, x < 5))))
+
+    def test_slice_engine(self):
+        prg1 = "havoc x, y; if x * x > 4 then x := x + 1; if y * y > 9 then y := y - 1; if x > y then skip"
+        ast1 = ast.parse_string(prg1)
+        solver = sym.PathSolver(slicing=True)
+        out = [s for s in sym.SymExec().run(ast1, sym.SymState(solver))]
+        self.assertEqual(len(out), 8)
+        self.assertGreater(solver.num_group_hits, 0)
+
+    def test_explore(self):
+        prg1 = "havoc x; if x > 3 then assert x > 5; assume x < 0"
+        ast1 = ast.parse_string(prg1)
+        engine = sym.SymExec()
+        out = list(engine.explore(ast1, sym.SymState()))
+        self.assertEqual([s.is_error() for s in out], [True, False])
+        self.assertEqual(engine.states, [])
+        out = sym.SymExec().run(ast1, sym.SymState())
+        self.assertEqual(len(out), 1)
+
+        # the search stops when the caller does
+        ast1 = ast.parse_string(programs.branch_prg(8))
+        solver = sym.PathSolver()
+        found = sym.SymExec().explore(ast1, sym.SymState(solver), release=True)
+        first = next(found)
+        queries = solver.num_queries
+        found.close()
+        self.assertLess(queries, 20)
+        self.assertEqual(solver.num_queries, queries)
+        self.assertIsNone(first._solver)
+        self.assertIsNotNone(first.pick_concerete())
+        self.assertIsNot(first._solver, solver)
+
+    def test_concrete(self):
+        prg1 = "c := 0; while c < 5 do c := c + 1; if c = 5 then y := 7 / -2 else y := 0; assert y = -3"
+        ast1 = ast.parse_string(prg1)
+        solver = sym.PathSolver()
+        engine = sym.SymExec()
+        out = engine.run(ast1, sym.SymState(solver))
+        self.assertEqual(len(out), 1)
+        self.assertEqual(len(engine.errors), 0)
+        self.assertEqual(out[0].env["y"], -3)
+        self.assertEqual(solver.num_queries, 0)
+        self.assertEqual(out[0].pick_concerete().env["c"].as_long(), 5)
+
+        # concrete division agrees with z3
+        for x in (-7, -6, 0, 6, 7):
+            for y in (-3, -2, 2, 3):
+                expected = z3.simplify(z3.IntVal(x) / z3.IntVal(y)).as_long()
+                self.assertEqual(sym._div(x, y), expected)
+
+        # mixed values are lifted
+        prg1 = "havoc x; y := 2 * 3; z := x + y; if z > 6 and true then skip else assert false"
+        engine = sym.SymExec()
+        out = engine.run(ast.parse_string(prg1), sym.SymState())
+        self.assertEqual((len(out), len(engine.errors)), (1, 1))
+        self.assertEqual(out[0].env["y"], 6)
+        self.assertTrue(z3.is_expr(out[0].env["z"]))
+
+    def test_term_size(self):
+        prg1 = "havoc x, y; r := x; c := 0; while c < 8 do { r := 3 * r + y; c := c + 1 }; assert not (r = x)"
+        ast1 = ast.parse_string(prg1)
+        sizes = []
+        for opts in ((None, False), (None, True), (6, False)):
+            engine = sym.SymExec(*opts)
+            out = engine.run(ast1, sym.SymState())
+            self.assertEqual((len(out), len(engine.errors)), (1, 1))
+            # the counterexample is the same: 6561 x + 3280 y = x
+            model = engine.errors[0].pick_concerete().env
+            x, y = model["x"].as_long(), model["y"].as_long()
+            self.assertEqual(6560 * x + 3280 * y, 0)
+            sizes.append(sym.term_size(out[0].env["r"]))
+        self.assertGreater(sizes[0], sizes[1])
+        self.assertLessEqual(sizes[2], 6)
+        self.assertGreater(engine.num_defs, 0)
+
+        engine = sym.SymExec(simplify=True)
+        out = engine.run(ast.parse_string("havoc x; y := (x + 2) - x; z := y"), sym.SymState())
+        self.assertEqual(out[0].env["z"], 2)
@@ -0,0 +1,98 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import os
+import tempfile
+import unittest
+
+from . import ast, int, trace
+
+
+class TestTrace(unittest.TestCase):
+    def setUp(self):
+        fd, self.fname = tempfile.mkstemp(suffix=".trace")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.fname)
+
+    def test_one(self):
+        prg = ast.parse_string(
+            "x := 10; y := 0;\n"
+            "while x > 0 do { x := x - 1; y := y + 3 };\n"
+            "if y > 20 then skip else z := 1;\n"
+            "assert y < 25;\n"
+            "y := 0"
+        )
+        with self.assertRaises(AssertionError):
+            trace.record(prg, int.State(), self.fname)
+
+        with trace.Trace(self.fname) as t:
+            # 2 + 10 * 3 + 1 + 1 + 1 + 1
+            self.assertEqual(len(t), 36)
+            fail = t.failure()
+            self.assertEqual(fail, len(t) - 1)
+            p, v = t[fail]
+            self.assertEqual((p.kind, p.line, v), (trace.ASSERT, 4, 0))
+            self.assertEqual(t.last_value("y", fail), 30)
+            self.assertEqual(t.last_value("y", 5), 3)
+            self.assertIsNone(t.last_value("z"))
+            self.assertEqual(t.env_at(fail), {"x": 0, "y": 30})
+
+            loop = [v for p, v in t.records() if p.kind == trace.WHILE]
+            self.assertEqual(loop, [1] * 10 + [0])
+            branch = [v for p, v in t.records(30) if p.kind == trace.IF]
+            self.assertEqual(branch, [1])
+
+    def test_blocks(self):
+        prg = ast.parse_string("havoc x; while x < 1000 do x := x + 1")
+        rec = trace.Recorder(prg)
+        rec.CHUNK = 64
+        rec.run(int.State(), self.fname)
+
+        with trace.Trace(self.fname) as t:
+            self.assertEqual(len(t), 1 + 1000 * 2 + 1)
+            self.assertEqual(t.last_value("x", 500), 249)
+            self.assertEqual(t[len(t) - 2][1], 1000)
+            self.assertEqual(sum(t.counts()), len(t))
+            self.assertEqual(len(list(t.records(100, 200))), 100)
+
+    def test_truncated(self):
+        prg = ast.parse_string("x := 4294967296 * 4294967296; x := 1")
+        rec = trace.Recorder(prg)
+        rec.CHUNK = 1
+        rec.run(int.State(), self.fname)
+        with open(self.fname, "r+b") as f:
+            f.truncate(os.path.getsize(self.fname) - 1)
+
+        with trace.Trace(self.fname) as t:
+            self.assertEqual(len(t), 1)
+            self.assertEqual(t.last_value("x"), trace.INT64_MAX)
+
+    def test_division(self):
+        # / gives a float in the interpreter, its integer part is recorded
+        prg = ast.parse_string("x := 7; y := x / 2; z := 0 - x / 2")
+        st = trace.record(prg, int.State(), self.fname)
+        self.assertEqual(st.env["y"], 3.5)
+        with trace.Trace(self.fname) as t:
+            self.assertEqual([t.last_value(v) for v in "xyz"], [7, 3, -3])
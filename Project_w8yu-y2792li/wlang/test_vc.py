@@ -0,0 +1,102 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from . import ast, programs, sym, vc
+
+Q4B = """
+havoc x, y;
+assume y >= 0;
+c := 0;
+r := x;
+while c < y
+inv c <= y and r = x + c
+do
+{
+    r := r + 1;
+    c := c + 1
+};
+assert r = x + y
+"""
+
+
+class TestVc(unittest.TestCase):
+    def _check(self, prg):
+        checker = vc.VcChecker(ast.parse_string(prg))
+        return checker, checker.check()
+
+    def test_verified(self):
+        checker, ok = self._check(Q4B)
+        self.assertTrue(ok)
+        self.assertEqual([o.kind for o in checker.obligations], [vc.INIT, vc.PRES, vc.ASSERT])
+        self.assertEqual(checker.num_checks, 3)
+
+        # the path engine needs more queries for the same program
+        solver = sym.PathSolver()
+        sym.SymExec().run(ast.parse_string(Q4B), sym.SymState(solver))
+        self.assertGreater(solver.num_queries, checker.num_checks)
+
+    def test_failed(self):
+        checker, ok = self._check(Q4B.replace("r = x + c", "r = x + c + 1"))
+        self.assertFalse(ok)
+        status = [o.status for o in checker.obligations]
+        self.assertEqual(status, [vc.FAILED, vc.VALID, vc.FAILED])
+        self.assertEqual(str(checker.obligations[0]), "inv initiation at line 6")
+
+        checker, ok = self._check(Q4B.replace("assert r = x + y", "assert r > x"))
+        self.assertEqual(checker.obligations[2].status, vc.FAILED)
+        model = checker.obligations[2].model
+        y = [v for k, v in model.items() if k.startswith("y!")][0]
+        self.assertEqual(y.as_long(), 0)
+
+    def test_one_line(self):
+        prg = "havoc x; assume x >= 0; while x > 0 inv x >= 0 do x := x - 1; assert x = 0; while x < 2 inv x <= 2 do x := x + 1; assert x = 2"
+        checker, ok = self._check(prg)
+        self.assertTrue(ok)
+        stmts = checker.prg.stmts
+        self.assertEqual(
+            [(o.kind, o.node) for o in checker.obligations],
+            [
+                (vc.INIT, stmts[2]),
+                (vc.PRES, stmts[2]),
+                (vc.ASSERT, stmts[3]),
+                (vc.INIT, stmts[4]),
+                (vc.PRES, stmts[4]),
+                (vc.ASSERT, stmts[5]),
+            ],
+        )
+
+    def test_no_paths(self):
+        # 2^10 paths, one query
+        checker, ok = self._check(programs.branch_prg(10))
+        self.assertFalse(ok)
+        self.assertEqual(checker.num_checks, 1)
+        model = checker.obligations[0].model
+        for i in range(10):
+            x = [v for k, v in model.items() if k.startswith("x{}!".format(i))][0]
+            self.assertLessEqual(x.as_long(), i)
+
+    def test_no_inv(self):
+        with self.assertRaises(vc.VcError):
+            vc.VcGen().vc(ast.parse_string("x := 1; while x > 0 do x := x - 1"))
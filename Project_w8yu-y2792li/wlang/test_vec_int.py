@@ -0,0 +1,94 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+import numpy as np
+
+from . import ast, int, vec_int
+
+
+class TestVecInt(unittest.TestCase):
+    def test_loop(self):
+        prg1 = "havoc x; y := 0; while x > 0 do { x := x - 1; y := y + 2 }; if y > 10 then z := 1 else z := 2"
+        ast1 = ast.parse_string(prg1)
+        xs = [-3, 0, 1, 5, 6, 20]
+        st = vec_int.VecState(len(xs), {"x": xs})
+        st = vec_int.VecInterpreter().run(ast1, st)
+        self.assertEqual(list(st.env["y"]), [0, 0, 2, 10, 12, 40])
+        self.assertEqual(list(st.env["z"]), [2, 2, 2, 2, 1, 1])
+        self.assertEqual(st.lane(3).env, {"x": 0, "y": 10, "z": 2})
+
+    def test_agrees_with_int(self):
+        prg1 = "havoc x, y; s := 0; while x < y do { if x > 4 and not x = 7 then s := s + x * 2 else s := s - 1; x := x + 1 }"
+        ast1 = ast.parse_string(prg1)
+        rng = np.random.default_rng(1)
+        xs = rng.integers(-10, 10, size=50)
+        ys = rng.integers(-10, 10, size=50)
+        st = vec_int.VecState(50, {"x": xs, "y": ys})
+        st = vec_int.VecInterpreter().run(ast1, st)
+
+        # the same program with the havoc'd values assigned concretely
+        body = ast.StmtList(ast1.stmts[1:])
+        for i in range(50):
+            ist = int.State()
+            ist.env["x"] = xs[i].item()
+            ist.env["y"] = ys[i].item()
+            ist = int.Interpreter().run(body, ist)
+            self.assertEqual(st.lane(i).env, ist.env)
+
+    def test_assert(self):
+        prg1 = "havoc x; assume x > -5; y := x * 2; assert y < 10; y := y + 1"
+        ast1 = ast.parse_string(prg1)
+        st = vec_int.VecState(5, {"x": [-10, 0, 4, 5, 9]})
+        st = vec_int.VecInterpreter().run(ast1, st)
+        self.assertEqual(list(st.failed_lanes()), [3, 4])
+        self.assertEqual(list(st.blocked_lanes()), [0])
+        self.assertEqual(list(st.active), [False, True, True, False, False])
+        # failed lanes stop executing
+        self.assertEqual(list(st.env["y"]), [0, 1, 9, 10, 18])
+
+    def test_const_operand(self):
+        ast1 = ast.parse_string("havoc x; if x > 0 and true then y := 1 else y := 2; if false or x < -1 then y := 3")
+        st = vec_int.VecState(4, {"x": [-2, -1, 0, 3]})
+        st = vec_int.VecInterpreter().run(ast1, st)
+        self.assertEqual(list(st.env["y"]), [3, 2, 2, 1])
+
+    def test_undefined(self):
+        ast1 = ast.parse_string("havoc x; if x > 0 then y := 1")
+        st = vec_int.VecState(2, {"x": [-1, 1]})
+        st = vec_int.VecInterpreter().run(ast1, st)
+        # as in int.Interpreter, y is not set in the first lane
+        self.assertEqual(st.lane(0).env, {"x": -1})
+        self.assertEqual(st.lane(1).env, {"x": 1, "y": 1})
+
+        # reading y is an error in the lanes that did not set it only
+        ast1 = ast.parse_string("havoc x; if x > 0 then y := 1; if x > 0 then z := y")
+        st = vec_int.VecInterpreter().run(ast1, vec_int.VecState(2, {"x": [-1, 1]}))
+        self.assertEqual(st.lane(1).env, {"x": 1, "y": 1, "z": 1})
+        ast1 = ast.parse_string("havoc x; if x > 0 then y := 1; z := y")
+        with self.assertRaises(KeyError):
+            vec_int.VecInterpreter().run(ast1, vec_int.VecState(2, {"x": [-1, 1]}))
+
+    def test_havoc_vars(self):
+        ast1 = ast.parse_string("havoc x; if x > 0 then havoc y, x else havoc z")
+        self.assertEqual(vec_int.havoc_vars(ast1), ["x", "y", "z"])
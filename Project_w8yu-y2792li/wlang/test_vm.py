@@ -0,0 +1,90 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+import unittest
+
+from . import ast, havoc, int, vm
+
+
+class TestVm(unittest.TestCase):
+    def _agree(self, prg):
+        ast1 = ast.parse_string(prg)
+        st1 = int.Interpreter().run(ast1, int.State())
+        st2 = vm.run(vm.compile(ast1))
+        self.assertEqual(st1.env, st2.env)
+        return st2
+
+    def test_one(self):
+        st = self._agree("x := 10; print_state")
+        self.assertEqual(st.env, {"x": 10})
+        self.assertEqual(st.regs[0], 10)
+
+    def test_loop(self):
+        st = self._agree(
+            "havoc y; x := 0; s := 0; while x < 10 do { if x > 4 and not x = 7 then s := s + x * 2 else s := s - 1; x := x + 1 }; assert s >= 0"
+        )
+        self.assertEqual(st.env["s"], 50)
+
+    def test_exp(self):
+        self._agree(
+            "x := 7; y := x - 2 * x; z := x / 2; b := 1; if x <= 7 or false or y >= 0 then b := 2 else b := 3; if (x = 7 and x > 1) and true then c := x else c := 0"
+        )
+
+    def test_slots(self):
+        prg = vm.compile(ast.parse_string("x := 1; y := x + 1; x := y * x"))
+        self.assertEqual(prg.names, ["x", "y"])
+        st = vm.run(prg)
+        self.assertEqual(st.regs[prg.slot("x")], 2)
+
+    def test_assert(self):
+        prg = vm.compile(ast.parse_string("x := 1; assert x > 1"))
+        with self.assertRaises(AssertionError):
+            vm.run(prg)
+
+    def test_initial_state(self):
+        st = int.State()
+        st.env["y"] = 5
+        out = vm.run(vm.compile(ast.parse_string("x := y + 1")), st)
+        self.assertEqual(out.env, {"x": 6, "y": 5})
+
+    def test_budget(self):
+        prg = vm.compile(ast.parse_string("x := 0;\nwhile true do x := x + 1"))
+        with self.assertRaises(int.BudgetExceeded) as cm:
+            vm.run(prg, budget=int.Budget(fuel=100))
+        self.assertEqual(cm.exception.line, 2)
+        # checked on the back jump, after the body
+        self.assertEqual(cm.exception.state.env, {"x": 101})
+
+    def test_havoc(self):
+        class _Counting(havoc.SequenceProvider):
+            calls = 0
+
+            def take(self, n):
+                self.calls += 1
+                return super(_Counting, self).take(n)
+
+        prg = vm.compile(ast.parse_string("havoc x, y, z; havoc y"))
+        self.assertEqual([op for op, a, b, c in prg.code].count(vm.HAVOC), 2)
+        provider = _Counting([1, 2, 3, 4])
+        st = vm.run(prg, havoc=provider)
+        self.assertEqual(st.env, {"x": 1, "y": 4, "z": 3})
+        self.assertEqual(provider.calls, 2)
@@ -0,0 +1,168 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+import unittest
+
+from . import ast, cfg, programs, sym, worklist
+
+
+class TestWorklist(unittest.TestCase):
+    def _run(self, prg, search="dfs", **kwargs):
+        engine = worklist.WorklistExec(search, **kwargs)
+        out = engine.run(ast.parse_string(prg), sym.SymState())
+        return engine, out
+
+    def test_cfg(self):
+        prg = ast.parse_string("havoc x; if x > 0 then x := 1; while x > 0 do x := x - 1; assert x = 0")
+        g = cfg.Cfg(prg)
+        self.assertEqual(len(g), 8)
+        branch = g.node(g.find(lambda n: n.kind == cfg.IF)[0])
+        loop = g.find(lambda n: n.kind == cfg.LOOP)[0]
+        self.assertEqual(branch.join, loop)
+        self.assertEqual(branch.succs[1], loop)
+        dist = g.distances(g.find(cfg.is_assert))
+        self.assertEqual(dist[g.entry], 3)
+        self.assertNotIn(g.exit, dist)
+
+    def test_same_as_sym(self):
+        prgs = [
+            ("havoc x; while x > 0 do x := x - 1", 11),
+            ("x := 30; while x > 0 do x := x - 1", 0),
+            ("havoc x; assume x > 0; if x > 0 then if x > 5 then y := 2 else y := 3 else y := 4", 2),
+            ("x := 2; havoc y; while x > 0 do {if y < x then y := y + 1 else y := y - 1; x := x - 1}", 3),
+            ("havoc x, y; assume y >= 0; c := 0; r := x; while c < y inv c <= y and r = x + c do { r := r + 1; c := c + 1}; assert r = x + y", 1),
+        ]
+        for prg, n in prgs:
+            for search in worklist.SCHEDULERS:
+                engine, out = self._run(prg, search)
+                self.assertEqual(len(out), n)
+                self.assertEqual(len(engine.errors), 0)
+
+    def test_errors(self):
+        engine, out = self._run("havoc x; if x > 3 then assert x > 5; assume x < 0")
+        self.assertEqual(len(out), 1)
+        self.assertEqual(len(engine.errors), 1)
+        self.assertTrue(engine.errors[0].is_error())
+        self.assertIn(engine.errors[0].pick_concerete().env["x"].as_long(), (4, 5))
+
+        prg = "havoc x, y; assume y >= 0; c := 0; r := x; while c < y inv r = x + 1 do { r := r + 1; c := c + 1}"
+        engine, out = self._run(prg)
+        # initiation and preservation both fail
+        self.assertEqual(len(engine.errors), 2)
+
+    def test_first_error(self):
+        prg = programs.SEARCH_PRG.replace("N", "6")
+        first = dict()
+        for search in worklist.SCHEDULERS:
+            engine, out = self._run(prg, search)
+            self.assertEqual((len(out), len(engine.errors)), (1, 8))
+            first[search] = engine.first_error_step
+        self.assertLess(first["distance"], first["dfs"])
+        self.assertLess(first["coverage"], first["dfs"])
+
+    def test_deep(self):
+        # deeper than the Python stack
+        engine, out = self._run("x := 0; while x < 1200 do x := x + 1", loop_bound=1500)
+        self.assertEqual(len(out), 1)
+
+    def test_merge(self):
+        prg = programs.branch_prg(6)
+        engine, out = self._run(prg, merge=True)
+        self.assertEqual(len(out), 1)
+        self.assertEqual(engine.num_merges, 6)
+        # the all-else path still violates the assertion
+        self.assertEqual(len(engine.errors), 1)
+        model = engine.errors[0].pick_concerete().env
+        self.assertTrue(all(model["x{}".format(i)].as_long() <= i for i in range(6)))
+
+        # y is read by the branch after the join, so it is not merged
+        prg = "havoc x; if x > 0 then y := 1 else y := 2; if y = 1 then z := 1 else z := 2; assert z = y"
+        engine, out = self._run(prg, merge=True)
+        self.assertEqual((engine.num_merges, engine.num_merges_refused), (0, 1))
+        self.assertEqual(len(out), 2)
+        self.assertEqual(len(engine.errors), 0)
+        engine, out = self._run(prg, merge=True, merge_alpha=1.0)
+        self.assertEqual((engine.num_merges, len(out), len(engine.errors)), (2, 1, 0))
+
+    def test_explore(self):
+        prg = ast.parse_string(programs.SEARCH_PRG.replace("N", "6"))
+        engine = worklist.WorklistExec("distance")
+        for s in engine.explore(prg, sym.SymState()):
+            break
+        self.assertTrue(s.is_error())
+        self.assertEqual(engine.steps, engine.first_error_step)
+
+    def test_bounds(self):
+        prgs = [
+            ("i := 0; while i < 50 do i := i + 1", {}, 0, 1),
+            ("i := 0; while i < 50 bound 50 do i := i + 1", {}, 1, 0),
+            # the bound of the command line wins over the annotation
+            ("i := 0; while i < 50 bound 20 do i := i + 1", {1: 50}, 1, 0),
+            ("havoc x; while x > 0 do x := x - 1", {1: 3}, 4, 1),
+        ]
+        for prg, bounds, n, cut in prgs:
+            # the annotation survives printing
+            node = ast.parse_string(prg)
+            self.assertEqual(ast.parse_string(str(node)), node)
+            for engine in (sym.SymExec(loop_bounds=bounds), worklist.WorklistExec(loop_bounds=bounds)):
+                out = engine.run(ast.parse_string(prg), sym.SymState())
+                self.assertEqual(len(out), n, prg)
+                self.assertEqual(engine.bound_hits, {1: cut} if cut > 0 else {}, prg)
+
+    def test_adaptive_bound(self):
+        # the exit stays feasible, the loop is unrolled up to the maximum
+        prg = ast.parse_string("havoc x; while x > 0 do x := x - 1")
+        for engine in (sym.SymExec(max_loop_bound=20), worklist.WorklistExec(max_loop_bound=20)):
+            out = engine.run(prg, sym.SymState())
+            self.assertEqual((len(out), engine.bound_hits), (21, {1: 1}))
+        # the exit becomes infeasible, the loop is cut at the bound
+        prg = ast.parse_string("havoc x; while x > 0 do x := x + 1")
+        for engine in (sym.SymExec(max_loop_bound=20), worklist.WorklistExec(max_loop_bound=20)):
+            out = engine.run(prg, sym.SymState())
+            self.assertEqual((len(out), engine.bound_hits), (1, {1: 1}))
+
+    def test_subsume(self):
+        prg = "havoc n, y; x := 0; while n > 0 do { if y > 0 then x := 1 else x := 2; n := n - 1 }; assert x < 2"
+        for search in worklist.SCHEDULERS:
+            engine, out = self._run(prg, search, loop_bound=20, subsume=True)
+            # only the first iteration is explored
+            self.assertEqual((len(out), len(engine.errors)), (2, 1))
+            self.assertEqual(engine.num_subsumed, 2)
+            self.assertEqual(engine.bound_hits, {})
+
+        # every iteration has a new value of c, nothing is subsumed
+        prg = "havoc x, y; assume y >= 0; c := 0; r := x; while c < y do { r := r + 1; c := c + 1}; assert r = x + y"
+        engine, out = self._run(prg, subsume=True)
+        self.assertEqual((len(out), engine.num_subsumed, engine.num_subsume_queries), (11, 0, 0))
+
+        prgs = [
+            "havoc x; if x > 3 then assert x > 5; assume x < 0",
+            "havoc x; y := 0; while x > 0 do { x := x - 1; y := y + 2 }; assert y < 14",
+            "x := 3; havoc y; while x > 0 do { if y > x then y := y - x else assert y < 5; x := x - 1 }",
+            programs.SUBSUME_PRG.replace("N", "3"),
+        ]
+        for prg in prgs:
+            engine, out = self._run(prg)
+            pruned, out = self._run(prg, subsume=True)
+            self.assertEqual(len(pruned.errors) > 0, len(engine.errors) > 0, prg)
+            self.assertLessEqual(len(out), len(engine.states), prg)
@@ -0,0 +1,491 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Compact binary execution traces of WLang programs
+
+Every statement, branch condition and assigned variable of a program is
+a trace point with a dense integer id. A traced run appends one record
+per event: the point id and a value (the assigned value, or 1/0 for the
+outcome of a condition). The file is
+
+    header:  magic, version, length of the point table, point table (JSON)
+    blocks:  n, n point ids (uint32), n values (int64)
+
+all little-endian. Records are buffered in arrays and written one block
+at a time, so recording costs two appends per event. The Trace reader
+memory-maps the file and answers queries with NumPy over one block at a
+time without loading the whole trace.
+"""
+
+import array
+import builtins
+import json
+import mmap
+import struct
+import sys
+
+from . import ast, int
+
+MAGIC = b"WTRC"
+VERSION = 1
+
+_HEADER = struct.Struct("<4sII")
+_BLOCK = struct.Struct("<I")
+
+INT64_MIN = -(2**63)
+INT64_MAX = 2**63 - 1
+
+# kinds of trace points
+STMT = "stmt"
+ASGN = "asgn"
+IF = "if"
+WHILE = "while"
+ASSERT = "assert"
+ASSUME = "assume"
+
+
+class Point(object):
+    """A place in a program that produces trace records"""
+
+    def __init__(self, id, kind, line, name=None):
+        self.id = id
+        self.kind = kind
+        self.line = line
+        # the variable, for ASGN points
+        self.name = name
+
+    def to_json(self):
+        return [self.kind, self.line, self.name]
+
+    def __str__(self):
+        if self.name is not None:
+            return "{}:{}:{}".format(self.kind, self.line, self.name)
+        return "{}:{}".format(self.kind, self.line)
+
+
+def _clamp(v):
+    return max(INT64_MIN, min(INT64_MAX, v))
+
+
+def _encode(v):
+    """The int64 value recorded for v"""
+    if isinstance(v, float):
+        if v != v:
+            # NaN
+            return 0
+        if v in (float("inf"), float("-inf")):
+            return INT64_MAX if v > 0 else INT64_MIN
+        # the interpreter divides with /, keep the integer part
+        v = builtins.int(v)
+    return _clamp(v)
+
+
+class Recorder(object):
+    """Records the trace of runs of a program into a file
+
+    Values that do not fit into 64 bits are saturated, and the float
+    results of division are truncated towards 0.
+    """
+
+    # number of records per block
+    CHUNK = 65536
+
+    def __init__(self, prg, budget=None, havoc=None):
+        self.prg = prg
+        self.budget = budget
+        self.havoc = havoc
+        self.points = []
+        self._ids = array.array("I")
+        self._vals = array.array("q")
+        assert self._ids.itemsize == 4
+        self._out = None
+        self._code = None
+
+    def add_point(self, kind, node, name=None):
+        p = Point(len(self.points), kind, node.line, name)
+        self.points.append(p)
+        return p.id
+
+    def mk_emit(self):
+        """Returns a function that appends a record to the trace"""
+        ids = self._ids
+        ids_append = ids.append
+        vals_append = self._vals.append
+        chunk = self.CHUNK
+        flush = self.flush
+
+        def _emit(pid, val):
+            ids_append(pid)
+            try:
+                vals_append(val)
+            except (OverflowError, TypeError):
+                vals_append(_encode(val))
+            if len(ids) >= chunk:
+                flush()
+
+        return _emit
+
+    def compile(self):
+        if self._code is None:
+            self._code = TraceCompiler(self).compile(self.prg)
+        return self._code
+
+    def open(self, fname):
+        self._out = open(fname, "wb")
+        table = json.dumps([p.to_json() for p in self.points]).encode()
+        self._out.write(_HEADER.pack(MAGIC, VERSION, len(table)))
+        self._out.write(table)
+
+    def flush(self):
+        n = len(self._ids)
+        if n == 0 or self._out is None:
+            return
+        ids = self._ids
+        vals = self._vals
+        if sys.byteorder != "little":
+            ids = array.array("I", ids)
+            ids.byteswap()
+            vals = array.array("q", vals)
+            vals.byteswap()
+        self._out.write(_BLOCK.pack(n))
+        ids.tofile(self._out)
+        vals.tofile(self._out)
+        # clear in place, compiled programs hold on to the buffers
+        del self._ids[:]
+        del self._vals[:]
+
+    def close(self):
+        if self._out is not None:
+            self.flush()
+            self._out.close()
+            self._out = None
+
+    def run(self, state, fname):
+        """Runs the program on a state, writing its trace to fname"""
+        code = self.compile()
+        self.open(fname)
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            code(state.env)
+        except int.BudgetExceeded as e:
+            e.state = state
+            raise
+        finally:
+            self.close()
+        return state
+
+
+def record(prg, state, fname, budget=None, havoc=None):
+    """Runs prg on state and writes its trace to fname"""
+    return Recorder(prg, budget, havoc).run(state, fname)
+
+
+class TraceCompiler(int.Compiler):
+    """Compiles a program into closures that append to a trace"""
+
+    def __init__(self, recorder):
+        super(TraceCompiler, self).__init__(recorder.budget, recorder.havoc)
+        self._rec = recorder
+        self._emit = recorder.mk_emit()
+
+    def _stmt(self, node, code):
+        pid = self._rec.add_point(STMT, node)
+        emit = self._emit
+
+        def _traced(env):
+            code(env)
+            emit(pid, 0)
+
+        return _traced
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        code = super(TraceCompiler, self).visit_SkipStmt(node, *args, **kwargs)
+        return self._stmt(node, code)
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        code = super(TraceCompiler, self).visit_PrintStateStmt(node, *args, **kwargs)
+        return self._stmt(node, code)
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        name = node.lhs.name
+        rhs = self.visit(node.rhs)
+        pid = self._rec.add_point(ASGN, node, name)
+        emit = self._emit
+
+        def _asgn(env):
+            v = rhs(env)
+            env[name] = v
+            emit(pid, v)
+
+        return _asgn
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        code = super(TraceCompiler, self).visit_HavocStmt(node, *args, **kwargs)
+        pids = [
+            (self._rec.add_point(ASGN, node, v.name), v.name) for v in node.vars
+        ]
+        emit = self._emit
+
+        def _havoc(env):
+            code(env)
+            for pid, name in pids:
+                emit(pid, env[name])
+
+        return _havoc
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        pid = self._rec.add_point(IF, node)
+        cond = self.visit(node.cond)
+        then_stmt = self.visit(node.then_stmt)
+        if node.has_else():
+            else_stmt = self.visit(node.else_stmt)
+        else:
+            else_stmt = None
+        emit = self._emit
+
+        def _if(env):
+            if cond(env):
+                emit(pid, 1)
+                then_stmt(env)
+            else:
+                emit(pid, 0)
+                if else_stmt is not None:
+                    else_stmt(env)
+
+        return _if
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        pid = self._rec.add_point(WHILE, node)
+        cond = self.visit(node.cond)
+        body = self.visit(node.body)
+        budget = self._budget
+        emit = self._emit
+
+        def _while(env):
+            while cond(env):
+                emit(pid, 1)
+                if budget is not None:
+                    budget.tick(node)
+                body(env)
+            emit(pid, 0)
+
+        return _while
+
+    def _check(self, node, kind):
+        pid = self._rec.add_point(kind, node)
+        cond = self.visit(node.cond)
+        msg = "Assertion error: " + str(node)
+        emit = self._emit
+
+        def _check(env):
+            if cond(env):
+                emit(pid, 1)
+            else:
+                emit(pid, 0)
+                assert False, msg
+
+        return _check
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        return self._check(node, ASSERT)
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        return self._check(node, ASSUME)
+
+
+class Trace(object):
+    """A memory-mapped trace file
+
+    Records are numbered from 0 in the order in which they were written.
+    """
+
+    def __init__(self, fname):
+        import numpy as np
+
+        self._np = np
+        self._file = open(fname, "rb")
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a WLang trace: " + fname)
+        pos = _HEADER.size
+        table = json.loads(self._mm[pos : pos + n].decode())
+        self.points = [Point(i, *p) for i, p in enumerate(table)]
+        pos += n
+
+        # (index of first record, number of records, offset of the ids)
+        self._blocks = []
+        self._len = 0
+        size = len(self._mm)
+        while pos + _BLOCK.size <= size:
+            (k,) = _BLOCK.unpack_from(self._mm, pos)
+            pos += _BLOCK.size
+            if pos + 12 * k > size:
+                # a block cut short by a crash, ignore it
+                break
+            self._blocks.append((self._len, k, pos))
+            self._len += k
+            pos += 12 * k
+
+    def __len__(self):
+        return self._len
+
+    def close(self):
+        self._blocks = []
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _block(self, b):
+        """Point ids and values of a block, as views into the file"""
+        np = self._np
+        _, k, pos = self._blocks[b]
+        ids = np.frombuffer(self._mm, dtype="<u4", count=k, offset=pos)
+        vals = np.frombuffer(self._mm, dtype="<i8", count=k, offset=pos + 4 * k)
+        return ids, vals
+
+    def __getitem__(self, i):
+        """The (point, value) of record i"""
+        if i < 0 or i >= self._len:
+            raise IndexError(i)
+        for b, (first, k, _) in enumerate(self._blocks):
+            if i < first + k:
+                ids, vals = self._block(b)
+                return self.points[ids[i - first]], builtins.int(vals[i - first])
+
+    def records(self, start=0, end=None):
+        """Yields (point, value) for records in [start, end)"""
+        if end is None or end > self._len:
+            end = self._len
+        for b, (first, k, _) in enumerate(self._blocks):
+            if first + k <= start:
+                continue
+            if first >= end:
+                break
+            ids, vals = self._block(b)
+            lo = max(start - first, 0)
+            hi = min(end - first, k)
+            for pid, v in zip(ids[lo:hi].tolist(), vals[lo:hi].tolist()):
+                yield self.points[pid], v
+
+    def _last(self, pids, end, vals_mask=None):
+        """Index and value of the last record of a point in pids before end"""
+        np = self._np
+        if end is None or end > self._len:
+            end = self._len
+        pids = np.asarray(sorted(pids), dtype="<u4")
+        for b in range(len(self._blocks) - 1, -1, -1):
+            first, k, _ = self._blocks[b]
+            if first >= end:
+                continue
+            ids, vals = self._block(b)
+            hi = min(end - first, k)
+            mask = np.isin(ids[:hi], pids)
+            if vals_mask is not None:
+                mask &= vals[:hi] == vals_mask
+            idx = np.flatnonzero(mask)
+            if len(idx) > 0:
+                i = builtins.int(idx[-1])
+                return first + i, builtins.int(vals[i])
+        return None
+
+    def failure(self):
+        """Index of the record of the assert that failed, or None"""
+        pids = [p.id for p in self.points if p.kind == ASSERT]
+        if len(pids) == 0:
+            return None
+        res = self._last(pids, None, vals_mask=0)
+        return None if res is None else res[0]
+
+    def last_value(self, name, end=None):
+        """Last value assigned to name by a record before end, or None"""
+        pids = [p.id for p in self.points if p.kind == ASGN and p.name == name]
+        if len(pids) == 0:
+            return None
+        res = self._last(pids, end)
+        return None if res is None else res[1]
+
+    def env_at(self, end=None):
+        """Values of all variables just before record end"""
+        names = sorted(set(p.name for p in self.points if p.kind == ASGN))
+        env = dict()
+        for name in names:
+            v = self.last_value(name, end)
+            if v is not None:
+                env[name] = v
+        return env
+
+    def counts(self):
+        """Number of records of every point"""
+        np = self._np
+        res = np.zeros(len(self.points), dtype=np.int64)
+        for b in range(len(self._blocks)):
+            ids, _ = self._block(b)
+            res += np.bincount(ids, minlength=len(self.points))
+        return res.tolist()
+
+
+def _parse_args():
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="trace", description="Query a WLang trace")
+    ap.add_argument("in_file", metavar="FILE", help="Trace file")
+    ap.add_argument(
+        "--dump", action="store_true", help="Print all records of the trace"
+    )
+    ap.add_argument(
+        "--last",
+        metavar="VAR",
+        action="append",
+        default=[],
+        help="Print the last value of VAR before the failed assert",
+    )
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    with Trace(args.in_file) as t:
+        if args.dump:
+            for i, (p, v) in enumerate(t.records()):
+                print(i, p, v)
+        fail = t.failure()
+        print("records:", len(t))
+        if fail is not None:
+            print("failed:", t[fail][0])
+        for name in args.last:
+            print("{}: {}".format(name, t.last_value(name, fail)))
+        if len(args.last) == 0:
+            for k, v in t.env_at(fail).items():
+                print("{}: {}".format(k, v))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,280 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""Verification conditions for programs with loop invariants
+
+Instead of exploring paths, the program is turned into a single formula,
+its weakest precondition, and every proof obligation is checked with one
+solver call:
+  - every assert must hold,
+  - every loop invariant must hold on entry to the loop (initiation), and
+  - must be preserved by an iteration of the loop body (preservation).
+
+Every obligation is guarded by a selector literal. To check one
+obligation, the negation of the formula is solved with its selector true
+and all others false, so the formula is built and asserted once. A check
+is assumed to hold after it, so an obligation is proved under the
+assumption that the obligations before it hold.
+
+Every loop must have an invariant.
+"""
+
+import sys
+
+import z3
+
+from . import ast, sym, undef_visitor
+
+INIT = "inv initiation"
+PRES = "inv preservation"
+ASSERT = "assert"
+
+VALID = "valid"
+FAILED = "failed"
+UNKNOWN = "unknown"
+
+
+class VcError(Exception):
+    """Raised for programs that are outside of the VC fragment"""
+
+    pass
+
+
+class Obligation(object):
+    """A proof obligation of a program"""
+
+    def __init__(self, kind, node, sel):
+        self.kind = kind
+        # the assert or while statement
+        self.node = node
+        # the selector literal that turns the obligation on
+        self.sel = sel
+        self.status = None
+        # values of the variables in a counterexample, for FAILED
+        self.model = None
+
+    def __str__(self):
+        line = "?" if self.node.line is None else self.node.line
+        return "{} at line {}".format(self.kind, line)
+
+
+def _program_order(node, res):
+    """Appends the statements of node to res in program order"""
+    res.append(node)
+    if isinstance(node, ast.StmtList):
+        for s in node.stmts:
+            _program_order(s, res)
+    elif isinstance(node, ast.IfStmt):
+        _program_order(node.then_stmt, res)
+        if node.has_else():
+            _program_order(node.else_stmt, res)
+    elif isinstance(node, ast.WhileStmt):
+        _program_order(node.body, res)
+    return res
+
+
+class _Vars(object):
+    """A state whose env maps every variable to its z3 constant"""
+
+    class _Env(dict):
+        def __missing__(self, name):
+            v = z3.Int(name)
+            self[name] = v
+            return v
+
+    def __init__(self):
+        self.env = self._Env()
+
+
+class VcGen(sym.SymExec):
+    """Computes the weakest precondition of a program
+
+    Statement visitors take the postcondition as post and return the
+    weakest precondition. Havoc'd variables, and those modified by a loop,
+    become fresh constants: they only occur under implications, so the
+    formula is valid iff it is valid for all their values. Expressions are
+    evaluated by the visitors of SymExec.
+    """
+
+    def __init__(self):
+        super(VcGen, self).__init__()
+        self.obligations = []
+        self._vars = _Vars()
+
+    def vc(self, prg):
+        """The formula of prg, the obligations are in self.obligations"""
+        res = self.visit(prg, post=z3.BoolVal(True))
+        # obligations are found backwards, report them in program order,
+        # which lines do not give for statements that share one
+        pos = {id(n): i for i, n in enumerate(_program_order(prg, []))}
+        kinds = (INIT, PRES, ASSERT)
+        self.obligations.sort(key=lambda o: (pos[id(o.node)], kinds.index(o.kind)))
+        return res
+
+    def _exp(self, exp):
+        return sym.lift(self.visit(exp, state=self._vars))
+
+    def _var(self, name):
+        return self._vars.env[name]
+
+    def _obligation(self, kind, node):
+        sel = z3.Bool("vc!{}".format(len(self.obligations)))
+        self.obligations.append(Obligation(kind, node, sel))
+        return sel
+
+    def _check(self, kind, node, cond, post):
+        """Checks cond, then assumes it"""
+        sel = self._obligation(kind, node)
+        return z3.And(z3.Implies(sel, cond), z3.Implies(cond, post))
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        post = kwargs["post"]
+        for s in reversed(node.stmts):
+            post = self.visit(s, post=post)
+        return post
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        return kwargs["post"]
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        return kwargs["post"]
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        rhs = self._exp(node.rhs)
+        return z3.substitute(kwargs["post"], (self._var(node.lhs.name), rhs))
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        subst = [(self._var(v.name), z3.FreshInt(v.name)) for v in node.vars]
+        return z3.substitute(kwargs["post"], *subst)
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        return z3.Implies(self._exp(node.cond), kwargs["post"])
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        return self._check(ASSERT, node, self._exp(node.cond), kwargs["post"])
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        post = kwargs["post"]
+        cond = self._exp(node.cond)
+        then_wp = self.visit(node.then_stmt, post=post)
+        if node.has_else():
+            else_wp = self.visit(node.else_stmt, post=post)
+        else:
+            else_wp = post
+        return z3.And(z3.Implies(cond, then_wp), z3.Implies(z3.Not(cond), else_wp))
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        if node.inv is None:
+            raise VcError("loop at line {} has no invariant".format(node.line))
+        post = kwargs["post"]
+        inv = self._exp(node.inv)
+        cond = self._exp(node.cond)
+
+        init_sel = self._obligation(INIT, node)
+        pres_sel = self._obligation(PRES, node)
+        body_wp = self.visit(node.body, post=z3.Implies(pres_sel, inv))
+        # an arbitrary iteration, and the exit, from a state that
+        # satisfies the invariant
+        step = z3.And(
+            z3.Implies(z3.And(inv, cond), body_wp),
+            z3.Implies(z3.And(inv, z3.Not(cond)), post),
+        )
+        subst = [(self._var(v), z3.FreshInt(v)) for v in self._defs(node)]
+        if len(subst) > 0:
+            step = z3.substitute(step, *subst)
+        return z3.And(z3.Implies(init_sel, inv), step)
+
+
+class VcChecker(object):
+    """Checks the obligations of a program, one solver call each"""
+
+    def __init__(self, prg):
+        self.prg = prg
+        self.gen = VcGen()
+        self.formula = self.gen.vc(prg)
+        self.obligations = self.gen.obligations
+        self.solver = z3.Solver()
+        self.solver.add(z3.Not(self.formula))
+        self.num_checks = 0
+
+    def check(self):
+        """Checks all obligations, returns True if they are all valid"""
+        sels = [o.sel for o in self.obligations]
+        for o in self.obligations:
+            assumptions = [s if s is o.sel else z3.Not(s) for s in sels]
+            self.num_checks += 1
+            res = self.solver.check(*assumptions)
+            if res == z3.unsat:
+                o.status = VALID
+            elif res == z3.sat:
+                o.status = FAILED
+                o.model = self._model(self.solver.model(), sels)
+            else:
+                o.status = UNKNOWN
+        return all(o.status == VALID for o in self.obligations)
+
+    def _model(self, model, sels):
+        names = set(str(s) for s in sels)
+        res = dict()
+        for d in model.decls():
+            if d.name() not in names and d.arity() == 0:
+                res[d.name()] = model[d]
+        return res
+
+
+def _parse_args():
+    import argparse
+
+    ap = argparse.ArgumentParser(
+        prog="vc", description="Verify a WLang program with loop invariants"
+    )
+    ap.add_argument("in_file", metavar="FILE", help="WLang program to verify")
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    prg = ast.parse_file(args.in_file)
+    try:
+        checker = VcChecker(prg)
+    except VcError as e:
+        print("[vc]: error:", e)
+        return 1
+    ok = checker.check()
+    for o in checker.obligations:
+        print("[vc]: {}: {}".format(o, o.status))
+        if o.model is not None:
+            for k, v in sorted(o.model.items()):
+                print("[vc]:   {} = {}".format(k, v))
+    print(
+        "[vc]: {} obligations, {} solver calls: {}".format(
+            len(checker.obligations),
+            checker.num_checks,
+            "verified" if ok else "not verified",
+        )
+    )
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,311 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""A vectorized interpreter that runs one program over many inputs
+
+Every variable holds a NumPy array with one lane per input. Expressions
+are evaluated as array operations over all lanes, and control flow is
+handled with per-lane masks: a statement only updates the lanes that
+reach it. A variable also has a mask of the lanes that set it, and
+reading it in a lane that did not raises KeyError as in int.Interpreter.
+Values are int64, so arithmetic wraps around instead of
+growing like Python integers, and division by zero yields inf/nan
+instead of raising.
+"""
+
+import builtins
+import sys
+from io import StringIO
+
+import numpy as np
+
+from . import ast, int
+
+
+class VecState(object):
+    def __init__(self, n, inputs=None):
+        # number of lanes
+        self.n = n
+        # map from variable names to arrays of values
+        self.env = dict()
+        # map from variable names to the lanes that set them
+        self.defined = dict()
+        # values used by havoc, map from variable names to arrays
+        self.inputs = dict()
+        if inputs is not None:
+            for k, v in inputs.items():
+                self.inputs[k] = np.asarray(v, dtype=np.int64)
+        # lanes that are still executing
+        self.active = np.ones(n, dtype=bool)
+        # lanes that violated an assertion
+        self.failed = np.zeros(n, dtype=bool)
+        # lanes whose assumption did not hold
+        self.blocked = np.zeros(n, dtype=bool)
+
+    def failed_lanes(self):
+        """Indices of the lanes that violated an assertion"""
+        return np.flatnonzero(self.failed)
+
+    def blocked_lanes(self):
+        """Indices of the lanes that violated an assumption"""
+        return np.flatnonzero(self.blocked)
+
+    def lane(self, i):
+        """The concrete state of a single lane"""
+        st = int.State()
+        for k, v in self.env.items():
+            if self.defined[k][i]:
+                st.env[k] = v[i].item()
+        return st
+
+    def __repr__(self):
+        return repr(self.env)
+
+    def __str__(self):
+        buf = StringIO()
+        for k, v in self.env.items():
+            buf.write(str(k))
+            buf.write(": ")
+            buf.write(str(v))
+            buf.write("\n")
+        buf.write("failed: ")
+        buf.write(str(self.failed_lanes()))
+        buf.write("\n")
+
+        return buf.getvalue()
+
+
+class VecInterpreter(ast.AstVisitor):
+    def __init__(self):
+        super(VecInterpreter, self).__init__()
+
+    def run(self, ast, state):
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            self.visit(ast, state=state, mask=state.active.copy())
+        return state
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        val = st.env.get(node.name)
+        if val is None or (kwargs["mask"] & ~st.defined[node.name]).any():
+            # some lane reads the variable before setting it
+            raise KeyError(node.name)
+        return val
+
+    def visit_IntConst(self, node, *args, **kwargs):
+        return np.int64(node.val)
+
+    def visit_BoolConst(self, node, *args, **kwargs):
+        return np.bool_(node.val)
+
+    def visit_RelExp(self, node, *args, **kwargs):
+        lhs = self.visit(node.arg(0), *args, **kwargs)
+        rhs = self.visit(node.arg(1), *args, **kwargs)
+        if node.op == "<=":
+            return lhs <= rhs
+        if node.op == "<":
+            return lhs < rhs
+        if node.op == "=":
+            return lhs == rhs
+        if node.op == ">=":
+            return lhs >= rhs
+        if node.op == ">":
+            return lhs > rhs
+
+        assert False
+
+    def visit_BExp(self, node, *args, **kwargs):
+        kids = [self.visit(a, *args, **kwargs) for a in node.args]
+
+        if node.op == "not":
+            assert node.is_unary()
+            assert len(kids) == 1
+            return np.logical_not(kids[0])
+
+        # pairwise, as constants are scalars and the rest arrays
+        res = kids[0]
+        for k in kids[1:]:
+            if node.op == "and":
+                res = np.logical_and(res, k)
+            elif node.op == "or":
+                res = np.logical_or(res, k)
+            else:
+                assert False
+        return res
+
+        assert False
+
+    def visit_AExp(self, node, *args, **kwargs):
+        kids = [self.visit(a, *args, **kwargs) for a in node.args]
+
+        res = kids[0]
+        for k in kids[1:]:
+            if node.op == "+":
+                res = res + k
+            elif node.op == "-":
+                res = res - k
+            elif node.op == "*":
+                res = res * k
+            elif node.op == "/":
+                res = np.true_divide(res, k)
+            else:
+                assert False
+        return res
+
+    def _live(self, **kwargs):
+        """Lanes that execute the current statement"""
+        return kwargs["mask"] & kwargs["state"].active
+
+    def _assign(self, st, name, val, mask):
+        old = st.env.get(name)
+        if old is None:
+            old = np.zeros(st.n, dtype=np.int64)
+            st.defined[name] = np.zeros(st.n, dtype=bool)
+        st.env[name] = np.where(mask, val, old)
+        st.defined[name] = st.defined[name] | mask
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        pass
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        print(kwargs["state"])
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        mask = self._live(**kwargs)
+        val = self.visit(node.rhs, state=st, mask=mask)
+        self._assign(st, node.lhs.name, val, mask)
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        mask = self._live(**kwargs)
+        if not mask.any():
+            return
+        cond = self.visit(node.cond, state=st, mask=mask)
+        then_mask = mask & cond
+        else_mask = mask & ~then_mask
+        if then_mask.any():
+            self.visit(node.then_stmt, state=st, mask=then_mask)
+        if node.has_else() and else_mask.any():
+            self.visit(node.else_stmt, state=st, mask=else_mask)
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        mask = self._live(**kwargs)
+        # iterate until every lane has left the loop
+        while mask.any():
+            mask = mask & st.active
+            mask = mask & self.visit(node.cond, state=st, mask=mask)
+            if not mask.any():
+                break
+            self.visit(node.body, state=st, mask=mask)
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        mask = self._live(**kwargs)
+        cond = self.visit(node.cond, state=st, mask=mask)
+        bad = mask & ~cond
+        st.failed |= bad
+        st.active &= ~bad
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        mask = self._live(**kwargs)
+        cond = self.visit(node.cond, state=st, mask=mask)
+        bad = mask & ~cond
+        st.blocked |= bad
+        st.active &= ~bad
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        for stmt in node.stmts:
+            self.visit(stmt, *args, **kwargs)
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        mask = self._live(**kwargs)
+        for v in node.vars:
+            # lanes without an input get 0, as in int.Interpreter
+            val = st.inputs.get(v.name, np.int64(0))
+            self._assign(st, v.name, val, mask)
+
+
+def havoc_vars(node):
+    """Names of all variables havoc'd in a program, in program order"""
+    res = []
+    if isinstance(node, ast.StmtList):
+        for s in node.stmts:
+            res.extend(n for n in havoc_vars(s) if n not in res)
+    elif isinstance(node, ast.HavocStmt):
+        res.extend(v.name for v in node.vars)
+    elif isinstance(node, ast.IfStmt):
+        res.extend(havoc_vars(node.then_stmt))
+        if node.has_else():
+            res.extend(n for n in havoc_vars(node.else_stmt) if n not in res)
+    elif isinstance(node, ast.WhileStmt):
+        res.extend(havoc_vars(node.body))
+    return res
+
+
+def _parse_args():
+    import argparse
+
+    ap = argparse.ArgumentParser(
+        prog="vec_int", description="Vectorized WLang Interpreter"
+    )
+    ap.add_argument("in_file", metavar="FILE", help="WLang program to run")
+    ap.add_argument(
+        "-n", type=builtins.int, default=1000, help="Number of random inputs"
+    )
+    ap.add_argument("--seed", type=builtins.int, default=0, help="Random seed")
+    ap.add_argument(
+        "--range",
+        type=builtins.int,
+        default=100,
+        help="Havoc'd values are drawn from [-RANGE, RANGE]",
+    )
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    prg = ast.parse_file(args.in_file)
+
+    # draw an input for every havoc'd variable
+    rng = np.random.default_rng(args.seed)
+    inputs = {
+        name: rng.integers(-args.range, args.range + 1, size=args.n)
+        for name in havoc_vars(prg)
+    }
+
+    st = VecInterpreter().run(prg, VecState(args.n, inputs))
+    failed = st.failed_lanes()
+    print("[vec_int]: ran", args.n, "inputs,", len(failed), "failed")
+    for i in failed[:10]:
+        print("[vec_int]: lane", i, "failed with inputs", {
+            k: v[i].item() for k, v in st.inputs.items()
+        })
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,531 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+"""A register-based bytecode virtual machine for WLang
+
+A program is compiled into a flat list of instructions over a register
+file. Every variable is resolved to a fixed register (slot) at compile
+time, followed by registers holding constants and registers for
+temporaries. An instruction is a tuple (opcode, a, b, c) where a is
+usually the destination register.
+"""
+
+import sys
+from io import StringIO
+
+from . import ast
+
+# opcodes
+(
+    HALT,
+    MOV,
+    ADD,
+    SUB,
+    MUL,
+    DIV,
+    LT,
+    LE,
+    EQ,
+    GE,
+    GT,
+    NOT,
+    AND,
+    OR,
+    JMP,
+    JMPF,
+    BNLT,
+    BNLE,
+    BNEQ,
+    BNGE,
+    BNGT,
+    ASSERT,
+    HAVOC,
+    PRINT,
+) = range(24)
+
+OP_NAMES = [
+    "HALT",
+    "MOV",
+    "ADD",
+    "SUB",
+    "MUL",
+    "DIV",
+    "LT",
+    "LE",
+    "EQ",
+    "GE",
+    "GT",
+    "NOT",
+    "AND",
+    "OR",
+    "JMP",
+    "JMPF",
+    "BNLT",
+    "BNLE",
+    "BNEQ",
+    "BNGE",
+    "BNGT",
+    "ASSERT",
+    "HAVOC",
+    "PRINT",
+]
+
+_ARITH = {"+": ADD, "-": SUB, "*": MUL, "/": DIV}
+_REL = {"<": LT, "<=": LE, "=": EQ, ">=": GE, ">": GT}
+# compare-and-branch: jump to c unless a op b
+_BRANCH = {"<": BNLT, "<=": BNLE, "=": BNEQ, ">=": BNGE, ">": BNGT}
+
+
+class Program(object):
+    """A compiled WLang program"""
+
+    def __init__(self, code, names, consts, num_regs, msgs, loops=None):
+        # list of instructions
+        self.code = code
+        # variable names, indexed by slot
+        self.names = names
+        # map from register to the constant it holds
+        self.consts = consts
+        # total number of registers
+        self.num_regs = num_regs
+        # assertion messages
+        self.msgs = msgs
+        # while statements, indexed by the b operand of their back jumps
+        self.loops = loops if loops is not None else []
+
+    def slot(self, name):
+        return self.names.index(name)
+
+    def mk_regs(self, env=None):
+        """Allocate a register file, optionally initialized from env"""
+        regs = [None] * self.num_regs
+        for r, v in self.consts.items():
+            regs[r] = v
+        if env is not None:
+            for i, name in enumerate(self.names):
+                if name in env:
+                    regs[i] = env[name]
+        return regs
+
+    def __str__(self):
+        buf = StringIO()
+        for pc, (op, a, b, c) in enumerate(self.code):
+            buf.write("{:4d}: {:<7} {} {} {}\n".format(pc, OP_NAMES[op], a, b, c))
+        return buf.getvalue()
+
+
+class State(object):
+    """A view of the register file that maps slots back to variable names"""
+
+    def __init__(self, prg, regs):
+        self._prg = prg
+        self.regs = regs
+
+    @property
+    def env(self):
+        """Variables that have been assigned, as a dictionary"""
+        regs = self.regs
+        return {
+            name: regs[i]
+            for i, name in enumerate(self._prg.names)
+            if regs[i] is not None
+        }
+
+    def __repr__(self):
+        return repr(self.env)
+
+    def __str__(self):
+        buf = StringIO()
+        for k, v in self.env.items():
+            buf.write(str(k))
+            buf.write(": ")
+            buf.write(str(v))
+            buf.write("\n")
+
+        return buf.getvalue()
+
+
+class Compiler(ast.AstVisitor):
+    """Compiles an AST into a Program"""
+
+    def __init__(self):
+        super(Compiler, self).__init__()
+
+    def compile(self, node):
+        self._code = []
+        self._msgs = []
+        self._loops = []
+        # collect all variables first so that they occupy the lowest slots
+        self._names = []
+        self._slots = dict()
+        _VarCollector(self._alloc_var).visit(node)
+        self._consts = dict()
+        self._const_regs = dict()
+        self._next_reg = len(self._names)
+        self._const_base = self._next_reg
+        _ConstCollector(self._alloc_const).visit(node)
+        self._temp_base = self._next_reg
+        self._max_reg = self._next_reg
+
+        self.visit(node)
+        self._emit(HALT)
+        return Program(
+            self._code,
+            self._names,
+            self._consts,
+            self._max_reg,
+            self._msgs,
+            self._loops,
+        )
+
+    def _alloc_var(self, name):
+        if name not in self._slots:
+            self._slots[name] = len(self._names)
+            self._names.append(name)
+
+    def _alloc_const(self, val):
+        key = (type(val), val)
+        if key not in self._const_regs:
+            self._const_regs[key] = self._next_reg
+            self._consts[self._next_reg] = val
+            self._next_reg += 1
+
+    def _temp(self):
+        r = self._next_reg
+        self._next_reg += 1
+        self._max_reg = max(self._max_reg, self._next_reg)
+        return r
+
+    def _emit(self, op, a=None, b=None, c=None):
+        self._code.append((op, a, b, c))
+        return len(self._code) - 1
+
+    def _patch(self, pc, target):
+        op, a, b, c = self._code[pc]
+        if op == JMP:
+            self._code[pc] = (op, target, b, c)
+        elif op == JMPF:
+            self._code[pc] = (op, a, target, c)
+        else:
+            self._code[pc] = (op, a, b, target)
+
+    def _exp(self, node, dst=None):
+        """Compiles an expression, returns the register holding its value"""
+        return self.visit(node, dst=dst)
+
+    def _cond_jump(self, node):
+        """Emits a jump taken when node is false, returns its pc"""
+        if isinstance(node, ast.RelExp):
+            lhs = self._exp(node.arg(0))
+            rhs = self._exp(node.arg(1))
+            return self._emit(_BRANCH[node.op], lhs, rhs, None)
+        r = self._exp(node)
+        return self._emit(JMPF, r, None)
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        return self._slots[node.name]
+
+    def visit_Const(self, node, *args, **kwargs):
+        return self._const_regs[(type(node.val), node.val)]
+
+    def _dst(self, **kwargs):
+        dst = kwargs.get("dst")
+        if dst is None:
+            dst = self._temp()
+        return dst
+
+    def _nary(self, op, node, **kwargs):
+        kids = [self._exp(a) for a in node.args]
+        dst = self._dst(**kwargs)
+        if len(kids) == 2:
+            self._emit(op, dst, kids[0], kids[1])
+            return dst
+        # accumulate in a temporary, dst might be read by a later operand
+        acc = self._temp()
+        self._emit(op, acc, kids[0], kids[1])
+        for k in kids[2:]:
+            self._emit(op, acc, acc, k)
+        self._emit(MOV, dst, acc)
+        return dst
+
+    def visit_RelExp(self, node, *args, **kwargs):
+        return self._nary(_REL[node.op], node, **kwargs)
+
+    def visit_BExp(self, node, *args, **kwargs):
+        if node.op == "not":
+            assert node.is_unary()
+            r = self._exp(node.arg(0))
+            dst = self._dst(**kwargs)
+            self._emit(NOT, dst, r)
+            return dst
+        return self._nary(AND if node.op == "and" else OR, node, **kwargs)
+
+    def visit_AExp(self, node, *args, **kwargs):
+        return self._nary(_ARITH[node.op], node, **kwargs)
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        pass
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        self._emit(PRINT)
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        slot = self._slots[node.lhs.name]
+        if isinstance(node.rhs, ast.Exp):
+            # compute directly into the variable's slot; safe because all
+            # operands are read before the result is written
+            self._exp(node.rhs, dst=slot)
+        else:
+            self._emit(MOV, slot, self._exp(node.rhs))
+        self._next_reg = self._temp_base
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        jf = self._cond_jump(node.cond)
+        self._next_reg = self._temp_base
+        self.visit(node.then_stmt)
+        if node.has_else():
+            jend = self._emit(JMP, None)
+            self._patch(jf, len(self._code))
+            self.visit(node.else_stmt)
+            self._patch(jend, len(self._code))
+        else:
+            self._patch(jf, len(self._code))
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        head = len(self._code)
+        jf = self._cond_jump(node.cond)
+        self._next_reg = self._temp_base
+        self.visit(node.body)
+        # the back jump names its loop, for budget checks
+        self._loops.append(node)
+        self._emit(JMP, head, len(self._loops) - 1)
+        self._patch(jf, len(self._code))
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        r = self._exp(node.cond)
+        self._msgs.append("Assertion error: " + str(node))
+        self._emit(ASSERT, r, len(self._msgs) - 1)
+        self._next_reg = self._temp_base
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        return self.visit_AssertStmt(node, *args, **kwargs)
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        # one instruction for all variables, values are taken in bulk
+        names = tuple(v.name for v in node.vars)
+        self._emit(HAVOC, tuple(self._slots[n] for n in names), names)
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        for s in node.stmts:
+            self.visit(s)
+
+
+class _VarCollector(ast.AstVisitor):
+    """Calls fn on the name of every variable, in program order"""
+
+    def __init__(self, fn):
+        super(_VarCollector, self).__init__()
+        self._fn = fn
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        self._fn(node.name)
+
+    def visit_Const(self, node, *args, **kwargs):
+        pass
+
+    def visit_Exp(self, node, *args, **kwargs):
+        for a in node.args:
+            self.visit(a)
+
+    def visit_Stmt(self, node, *args, **kwargs):
+        pass
+
+    def visit_StmtList(self, node, *args, **kwargs):
+        for s in node.stmts:
+            self.visit(s)
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        self.visit(node.lhs)
+        self.visit(node.rhs)
+
+    def visit_IfStmt(self, node, *args, **kwargs):
+        self.visit(node.cond)
+        self.visit(node.then_stmt)
+        if node.has_else():
+            self.visit(node.else_stmt)
+
+    def visit_WhileStmt(self, node, *args, **kwargs):
+        self.visit(node.cond)
+        self.visit(node.body)
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        self.visit(node.cond)
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        self.visit(node.cond)
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        for v in node.vars:
+            self.visit(v)
+
+
+class _ConstCollector(_VarCollector):
+    """Calls fn on the value of every constant"""
+
+    def visit_IntVar(self, node, *args, **kwargs):
+        pass
+
+    def visit_Const(self, node, *args, **kwargs):
+        self._fn(node.val)
+
+
+def compile(node):
+    """Compiles an AST into a Program"""
+    return Compiler().compile(node)
+
+
+def execute(prg, regs, havoc=None, budget=None):
+    """Runs a compiled program on a register file
+
+    havoc is a provider of values for havoc statements (see wlang.havoc),
+    if None havoc assigns 0. budget (an int.Budget) is checked on every
+    back jump of a loop.
+    """
+    code = prg.code
+    msgs = prg.msgs
+    loops = prg.loops
+    pc = 0
+    while True:
+        op, a, b, c = code[pc]
+        pc += 1
+        if op == ADD:
+            regs[a] = regs[b] + regs[c]
+        elif op == BNLT:
+            if not regs[a] < regs[b]:
+                pc = c
+        elif op == JMP:
+            pc = a
+            if budget is not None and b is not None:
+                budget.tick(loops[b])
+        elif op == SUB:
+            regs[a] = regs[b] - regs[c]
+        elif op == MUL:
+            regs[a] = regs[b] * regs[c]
+        elif op == MOV:
+            regs[a] = regs[b]
+        elif op == BNLE:
+            if not regs[a] <= regs[b]:
+                pc = c
+        elif op == BNGT:
+            if not regs[a] > regs[b]:
+                pc = c
+        elif op == BNGE:
+            if not regs[a] >= regs[b]:
+                pc = c
+        elif op == BNEQ:
+            if not regs[a] == regs[b]:
+                pc = c
+        elif op == JMPF:
+            if not regs[a]:
+                pc = b
+        elif op == LT:
+            regs[a] = regs[b] < regs[c]
+        elif op == LE:
+            regs[a] = regs[b] <= regs[c]
+        elif op == EQ:
+            regs[a] = regs[b] == regs[c]
+        elif op == GE:
+            regs[a] = regs[b] >= regs[c]
+        elif op == GT:
+            regs[a] = regs[b] > regs[c]
+        elif op == AND:
+            regs[a] = regs[b] and regs[c]
+        elif op == OR:
+            regs[a] = regs[b] or regs[c]
+        elif op == NOT:
+            regs[a] = not regs[b]
+        elif op == DIV:
+            regs[a] = regs[b] / regs[c]
+        elif op == ASSERT:
+            if not regs[a]:
+                assert False, msgs[b]
+        elif op == HAVOC:
+            if havoc is None:
+                # assign 0 as the default value
+                for r in a:
+                    regs[r] = 0
+            else:
+                for r, v in zip(a, havoc.take_vars(b)):
+                    regs[r] = v
+        elif op == PRINT:
+            print(State(prg, regs))
+        elif op == HALT:
+            return regs
+        else:
+            assert False, "unknown opcode " + str(op)
+
+
+def run(prg, state=None, havoc=None, budget=None):
+    """Runs a compiled program, returns the final State
+
+    If state is given, variables are initialized from state.env. A run
+    that exhausts budget raises int.BudgetExceeded with the state reached.
+    """
+    from . import int
+
+    env = None
+    if state is not None:
+        env = state.env
+    regs = prg.mk_regs(env)
+    if budget is not None:
+        budget.start()
+    try:
+        execute(prg, regs, havoc, budget)
+    except int.BudgetExceeded as e:
+        e.state = State(prg, regs)
+        raise
+    return State(prg, regs)
+
+
+def _parse_args():
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="vm", description="WLang bytecode VM")
+    ap.add_argument("in_file", metavar="FILE", help="WLang program to run")
+    ap.add_argument(
+        "--dump", action="store_true", help="Print the compiled bytecode"
+    )
+    args = ap.parse_args()
+    return args
+
+
+def main():
+    args = _parse_args()
+    prg = compile(ast.parse_file(args.in_file))
+    if args.dump:
+        print(prg)
+    run(prg)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,822 @@
+# The MIT License (MIT)
+# Copyright (c) 2016 Arie Gurfinkel
+
+# Permission is hereby granted, free of charge, to any person obtaining
+# a copy of this software and associated documentation files (the
+# "Software"), to deal in the Software without restriction, including
+# without limitation the rights to use, copy, modify, merge, publish,
+# distribute, sublicense, and/or sell copies of the Software, and to
+# permit persons to whom the Software is furnished to do so, subject to
+# the following conditions:
+
+# The above copyright notice and this permission notice shall be
+# included in all copies or substantial portions of the Software.
+
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND,
+# EXPRESS OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF
+# MERCHANTABILITY, FITNESS FOR A PARTICULAR PURPOSE AND
+# NONINFRINGEMENT. IN NO EVENT SHALL THE AUTHORS OR COPYRIGHT HOLDERS BE
+# LIABLE FOR ANY CLAIM, DAMAGES OR OTHER LIABILITY, WHETHER IN AN ACTION
+# OF CONTRACT, TORT OR OTHERWISE, ARISING FROM, OUT OF OR IN CONNECTION
+# WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE SOFTWARE.
+
+
+"""Worklist-based symbolic execution with pluggable search strategies
+
+Every pending state is an explicit object: a program point (a node of
+the control flow graph), a symbolic state and the loop iteration
+counters. The engine repeatedly takes a state from a scheduler, executes
+one statement and hands the successors back to the scheduler, so the
+order of exploration is up to the scheduler and the depth of a path is
+not limited by the Python stack.
+"""
+
+import heapq
+import random
+from collections import deque
+
+import z3
+
+from . import ast, cfg, sym, undef_visitor
+
+
+class PendingState(object):
+    """A symbolic state at a program point
+
+    The trail records the side taken at every branch of the path as a
+    bitstring, so that the state can be re-derived from the program
+    alone (see prefix() and WorklistExec.prefix).
+    """
+
+    def __init__(self, pc, st, loops=None, depth=0, trail=(0, 0)):
+        # node of the control flow graph to execute next
+        self.pc = pc
+        # the symbolic state, holding the env and the path condition
+        self.st = st
+        # map from loop node to number of iterations of the current visit
+        self.loops = loops if loops is not None else dict()
+        # number of branches with two feasible sides on the path
+        self.depth = depth
+        # (number of branches, bits of the sides taken), last branch in
+        # the lowest bit
+        self.trail = trail
+        # order of creation, for tie breaking in schedulers
+        self.seq = 0
+        # number of steps on the path
+        self.length = 0
+
+    def fork(self, pc):
+        _, child = self.st.fork()
+        res = PendingState(pc, child, dict(self.loops), self.depth, self.trail)
+        res.length = self.length
+        return res
+
+    def take(self, bit):
+        n, bits = self.trail
+        self.trail = (n + 1, (bits << 1) | bit)
+
+    def prefix(self):
+        """The prefix that re-derives this state, see WorklistExec"""
+        return self.trail + (self.length,)
+
+
+class Scheduler(object):
+    """Decides which pending state is executed next"""
+
+    def __init__(self):
+        self._seq = 0
+
+    def add(self, ps):
+        self._seq += 1
+        ps.seq = self._seq
+        self._add(ps)
+
+    def add_all(self, states):
+        for ps in states:
+            self.add(ps)
+
+    def _add(self, ps):
+        raise NotImplementedError()
+
+    def pop(self):
+        raise NotImplementedError()
+
+    def __len__(self):
+        raise NotImplementedError()
+
+    def steal(self, n):
+        """Removes up to n states to be explored elsewhere"""
+        return [self.pop() for _ in range(min(n, len(self)))]
+
+    def visited(self, pc):
+        """Called by the engine for every executed program point"""
+        pass
+
+
+class DfsScheduler(Scheduler):
+    """Depth-first: the most recently added state first"""
+
+    def __init__(self):
+        super(DfsScheduler, self).__init__()
+        self._stack = []
+
+    def add_all(self, states):
+        # the first successor is explored first
+        for ps in reversed(states):
+            self.add(ps)
+
+    def _add(self, ps):
+        self._stack.append(ps)
+
+    def pop(self):
+        return self._stack.pop()
+
+    def steal(self, n):
+        # the oldest states are the roots of the largest subtrees
+        n = min(n, len(self._stack))
+        res = self._stack[:n]
+        del self._stack[:n]
+        return res
+
+    def __len__(self):
+        return len(self._stack)
+
+
+class BfsScheduler(Scheduler):
+    """Breadth-first: the least recently added state first"""
+
+    def __init__(self):
+        super(BfsScheduler, self).__init__()
+        self._queue = deque()
+
+    def _add(self, ps):
+        self._queue.append(ps)
+
+    def pop(self):
+        return self._queue.popleft()
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class RandomPathScheduler(Scheduler):
+    """Random path selection, as in KLEE
+
+    A random walk from the root of the tree of forks reaches a state at
+    depth d with probability 2^-d, so states are picked with that weight.
+    This favours states on short paths and is not starved by loops that
+    fork many deep states.
+    """
+
+    def __init__(self, seed=0):
+        super(RandomPathScheduler, self).__init__()
+        self._states = []
+        self._rng = random.Random(seed)
+
+    def _add(self, ps):
+        self._states.append(ps)
+
+    def pop(self):
+        states = self._states
+        min_depth = min(ps.depth for ps in states)
+        weights = [2.0 ** (min_depth - ps.depth) for ps in states]
+        i = self._rng.choices(range(len(states)), weights)[0]
+        states[i], states[-1] = states[-1], states[i]
+        return states.pop()
+
+    def __len__(self):
+        return len(self._states)
+
+
+class CoverageScheduler(Scheduler):
+    """Favours states that are closest to a statement not yet executed"""
+
+    def __init__(self, graph):
+        super(CoverageScheduler, self).__init__()
+        self._cfg = graph
+        self._states = []
+        self._uncovered = set(range(len(graph)))
+        self._dist = None
+
+    def _add(self, ps):
+        self._states.append(ps)
+
+    def visited(self, pc):
+        if pc in self._uncovered:
+            self._uncovered.discard(pc)
+            self._dist = None
+
+    def pop(self):
+        if self._dist is None:
+            self._dist = self._cfg.distances(self._uncovered)
+        dist = self._dist
+        inf = len(self._cfg)
+        # closest first, most recent on ties
+        best = min(
+            range(len(self._states)),
+            key=lambda i: (dist.get(self._states[i].pc, inf), -self._states[i].seq),
+        )
+        states = self._states
+        states[best], states[-1] = states[-1], states[best]
+        return states.pop()
+
+    def __len__(self):
+        return len(self._states)
+
+
+class DistanceScheduler(Scheduler):
+    """Favours states that are closest to an assert"""
+
+    def __init__(self, graph):
+        super(DistanceScheduler, self).__init__()
+        self._dist = graph.distances(graph.find(cfg.is_assert))
+        self._inf = len(graph)
+        self._heap = []
+
+    def _add(self, ps):
+        d = self._dist.get(ps.pc, self._inf)
+        heapq.heappush(self._heap, (d, -ps.seq, ps))
+
+    def pop(self):
+        return heapq.heappop(self._heap)[2]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+SCHEDULERS = ("dfs", "bfs", "random-path", "coverage", "distance")
+
+
+def mk_scheduler(name, graph, seed=0):
+    if name == "dfs":
+        return DfsScheduler()
+    if name == "bfs":
+        return BfsScheduler()
+    if name == "random-path":
+        return RandomPathScheduler(seed)
+    if name == "coverage":
+        return CoverageScheduler(graph)
+    if name == "distance":
+        return DistanceScheduler(graph)
+    raise ValueError("unknown search strategy: " + str(name))
+
+
+def _loop_free(stmt):
+    if isinstance(stmt, ast.WhileStmt):
+        return False
+    if isinstance(stmt, ast.StmtList):
+        return all(_loop_free(s) for s in stmt.stmts)
+    if isinstance(stmt, ast.IfStmt):
+        return _loop_free(stmt.then_stmt) and (
+            not stmt.has_else() or _loop_free(stmt.else_stmt)
+        )
+    return True
+
+
+def _same(a, b):
+    if a is b:
+        return True
+    if a is None or b is None:
+        return False
+    if sym.is_concrete(a) and sym.is_concrete(b):
+        return a == b
+    return sym.lift(a).eq(sym.lift(b))
+
+
+def _differing(states):
+    """Names of variables on which some of the states disagree"""
+    first = states[0].st.env
+    names = set(first.keys())
+    for s in states[1:]:
+        names.update(s.st.env.keys())
+    return sorted(
+        n
+        for n in names
+        if not all(_same(first.get(n), s.st.env.get(n)) for s in states[1:])
+    )
+
+
+def _conj(exps):
+    return exps[0] if len(exps) == 1 else z3.And(exps)
+
+
+def _consts(exps):
+    """Uninterpreted constants of z3 terms"""
+    res = dict()
+    seen = set()
+    todo = list(exps)
+    while len(todo) > 0:
+        e = todo.pop()
+        i = e.get_id()
+        if i in seen:
+            continue
+        seen.add(i)
+        if z3.is_const(e) and e.decl().kind() == z3.Z3_OP_UNINTERPRETED:
+            res[i] = e
+        else:
+            todo.extend(e.children())
+    return list(res.values())
+
+
+class _Summary(object):
+    """A state recorded at a loop head or a join point"""
+
+    def __init__(self, ps):
+        self.ps = ps
+        self._path_ids = None
+
+    def path_ids(self):
+        if self._path_ids is None:
+            self._path_ids = frozenset(c.get_id() for c in self.ps.st.path)
+        return self._path_ids
+
+
+def _covers(old, new):
+    """Cheap necessary conditions for old to subsume new, no solver calls
+
+    Returns False if old cannot subsume new, True if it does, and None
+    if a solver call has to decide. old must have a shorter path and no
+    more iterations of any loop, so that its exploration reaches at least
+    as far as that of new.
+    """
+    o, n = old.ps, new.ps
+    if o.length >= n.length:
+        return False
+    for k, v in o.loops.items():
+        if v > n.loops.get(k, 0):
+            return False
+    oenv, nenv = o.st.env, n.st.env
+    if len(oenv) != len(nenv):
+        return False
+    same = True
+    for name, val in oenv.items():
+        if name not in nenv:
+            return False
+        other = nenv[name]
+        if _same(val, other):
+            continue
+        # a concrete value only covers itself
+        if sym.is_concrete(val):
+            return False
+        same = False
+    if same and old.path_ids() <= new.path_ids():
+        return True
+    return None
+
+
+def _entails(old, new, timeout):
+    """True if every state of new is one of old, decided by z3
+
+    The constants of old are renamed apart, new is subsumed if for every
+    model of its path condition some values of the renamed constants
+    satisfy the path condition of old and give the same env.
+    """
+    ost, nst = old.ps.st, new.ps.st
+    vals = [sym.lift(v) for v in ost.env.values()]
+    path = list(ost.path)
+    consts = _consts(vals + path)
+    fresh = [z3.FreshConst(c.sort(), "s") for c in consts]
+    pairs = list(zip(consts, fresh))
+
+    def rename(e):
+        return z3.substitute(e, *pairs) if len(pairs) > 0 else e
+
+    body = [rename(c) for c in path]
+    for name, val in ost.env.items():
+        body.append(rename(sym.lift(val)) == sym.lift(nst.env[name]))
+    covered = z3.And(body) if len(body) > 0 else z3.BoolVal(True)
+    if len(fresh) > 0:
+        covered = z3.Exists(fresh, covered)
+
+    solver = z3.Solver()
+    solver.set("timeout", timeout)
+    solver.add(list(nst.path))
+    solver.add(z3.Not(covered))
+    # unknown counts as not subsumed
+    return solver.check() == z3.unsat
+
+
+def _merge(states, base, trail, depth, assign):
+    """Merges states whose paths extend a common prefix of length base
+
+    The path of the result is the prefix and the disjunction of the
+    suffixes, every variable on which the states disagree becomes an If
+    term over the suffixes. The terms are bound with assign(state, name,
+    value).
+    """
+    guards = [_conj(s.st.path[base:]) for s in states]
+    merged = []
+    for name in _differing(states):
+        # a variable that is undefined on some paths keeps its value from
+        # the others
+        vals = [(g, s.st.env[name]) for g, s in zip(guards, states) if name in s.st.env]
+        val = vals[-1][1]
+        for g, v in reversed(vals[:-1]):
+            val = z3.If(g, v, val)
+        merged.append((name, val))
+    res = states[0]
+    del res.st.path[base:]
+    res.st.add_pc(z3.Or(guards))
+    for name, val in merged:
+        assign(res.st, name, val)
+    res.trail = trail
+    res.depth = depth
+    return res
+
+
+class WorklistExec(sym.SymExec):
+    """Symbolic execution driven by a worklist of pending states
+
+    Loops without an invariant are unrolled at most loop_bound times per
+    visit, or up to their own bound, see SymExec; paths that want to
+    iterate more are dropped and counted in bound_hits. A loop with an
+    invariant is checked as in SymExec: the invariant must hold on
+    entry and be preserved by the body, and the loop is replaced by
+    havoc of the variables it modifies and an assumption of the invariant.
+    Expressions are evaluated by the visitors of SymExec.
+
+    With a prefix (see PendingState.prefix()) exploration starts with the
+    path of that state: branches on it take the recorded side without a
+    solver call, and errors on it, up to the step the state was taken
+    at, are not reported again.
+
+    With merge, both sides of an if without loops are explored up to the
+    join point and the states that reach it are merged into one, see
+    _merge_if(). merge_alpha is the share of the queries after the join
+    above which a variable is hot: states that disagree on a hot variable
+    are not merged.
+
+    With subsume, the states that reach a loop head or the join point of
+    an if are recorded there, and a state that is subsumed by a recorded
+    one is dropped: each of its concrete states is one of the recorded
+    state, which reached the point on a shorter path and with no more
+    loop iterations. Syntactic checks (see _covers()) rule out most pairs
+    before the entailment check of z3 (see _entails()).
+    """
+
+    # number of steps between calls of poll()
+    POLL_PERIOD = 64
+    # number of states recorded per program point for subsumption
+    MAX_SUMMARIES = 32
+    # time limit of a subsumption query, in milliseconds
+    SUBSUME_TIMEOUT = 1000
+
+    def __init__(
+        self,
+        search="dfs",
+        loop_bound=10,
+        seed=0,
+        prefix=(0, 0, 0),
+        merge=False,
+        merge_alpha=0.5,
+        max_term_size=None,
+        simplify=False,
+        loop_bounds=None,
+        max_loop_bound=None,
+        subsume=False,
+    ):
+        super(WorklistExec, self).__init__(
+            max_term_size, simplify, loop_bound, loop_bounds, max_loop_bound
+        )
+        self.search = search
+        self.seed = seed
+        self.merge = merge
+        self.merge_alpha = merge_alpha
+        self.cfg = None
+        self.scheduler = None
+        # final states, without errors
+        self.states = []
+        # states that violate an assertion or an invariant
+        self.errors = []
+        # number of executed statements
+        self.steps = 0
+        # steps executed when the first error was found
+        self.first_error_step = None
+        # largest number of pending states
+        self.max_pending = 0
+        # final and error states found by the last step
+        self._found = []
+        self.prefix = prefix
+        # number of merges done and refused by the heuristic
+        self.num_merges = 0
+        self.num_merges_refused = 0
+        # map from if node to True if its branches have no loops
+        self._loop_free = dict()
+        # map from join node to its query_counts()
+        self._query_counts = dict()
+        self.subsume = subsume
+        # number of states dropped as subsumed, and of solver calls for it
+        self.num_subsumed = 0
+        self.num_subsume_queries = 0
+        # map from loop head or join point to its recorded states
+        self._summaries = dict()
+
+    def _explore(self, prg, state):
+        self.cfg = cfg.Cfg(prg)
+        self.scheduler = mk_scheduler(self.search, self.cfg, self.seed)
+        self.scheduler.add(PendingState(self.cfg.entry, state))
+        if self.subsume:
+            self._summaries = {
+                n.join: [] for n in self.cfg.nodes if n.kind == cfg.IF
+            }
+            self._summaries.update(
+                (n.id, []) for n in self.cfg.nodes
+                if n.kind == cfg.LOOP and n.stmt.inv is None
+            )
+        while len(self.scheduler) > 0:
+            ps = self.scheduler.pop()
+            self.steps += 1
+            self.scheduler.visited(ps.pc)
+            if ps.pc in self._summaries and self._subsumed(ps):
+                continue
+            length = ps.length + 1
+            succs = self.step(ps)
+            for s in succs:
+                s.length = length
+            self.scheduler.add_all(succs)
+            self.max_pending = max(self.max_pending, len(self.scheduler))
+            if len(self._found) > 0:
+                found = self._found
+                self._found = []
+                yield from found
+            if self.steps % self.POLL_PERIOD == 0:
+                self.poll()
+
+    def poll(self):
+        """Called every POLL_PERIOD steps"""
+        pass
+
+    def _replaying(self, ps):
+        # the steps after the last branch of the prefix are replayed too
+        return ps.trail[0] < self.prefix[0] or ps.length < self.prefix[2]
+
+    def _subsumed(self, ps):
+        """True if ps is subsumed by a state recorded at its node
+
+        Otherwise a copy of ps is recorded.
+        """
+        if self._replaying(ps):
+            return False
+        new = _Summary(ps)
+        summaries = self._summaries[ps.pc]
+        # the latest states are the most likely to be alike
+        for old in reversed(summaries):
+            res = _covers(old, new)
+            if res is None:
+                self.num_subsume_queries += 1
+                res = _entails(old, new, self.SUBSUME_TIMEOUT)
+            if res:
+                self.num_subsumed += 1
+                return True
+        if len(summaries) >= self.MAX_SUMMARIES:
+            del summaries[0]
+        summaries.append(_Summary(ps.fork(ps.pc)))
+        return False
+
+    def step(self, ps):
+        """Executes the node at ps.pc, returns the successor states"""
+        node = self.cfg.node(ps.pc)
+        if node.kind == cfg.STMT:
+            return self.visit(node.stmt, state=ps.st, ps=ps, cfg_node=node)
+        if node.kind == cfg.IF:
+            if self.merge and self._is_loop_free(node):
+                return self._merge_if(ps, node)
+            return self._branch(ps, node)
+        if node.kind == cfg.LOOP:
+            if node.stmt.inv is not None:
+                return self._inv_loop(ps, node)
+            return self._loop(ps, node)
+        if node.kind == cfg.BACK:
+            return self._back(ps, node)
+        # cfg.EXIT
+        self._found.append(ps.st)
+        return []
+
+    def _error(self, ps):
+        if self._replaying(ps):
+            return
+        ps.st.mk_error()
+        self._found.append(ps.st)
+        if self.first_error_step is None:
+            self.first_error_step = self.steps
+
+    def _goto(self, ps, node):
+        ps.pc = node.succs[0]
+        return [ps]
+
+    def _split(self, ps, cond, pc_true, pc_false):
+        """Forks ps on cond into the feasible ones of both sides
+
+        A concrete cond decides the side without a solver call, and is not
+        recorded in the trail.
+        """
+        if sym.is_concrete(cond):
+            ps.pc = pc_true if cond else pc_false
+            return [ps]
+        if ps.trail[0] < self.prefix[0]:
+            n, bits, _ = self.prefix
+            bit = (bits >> (n - 1 - ps.trail[0])) & 1
+            ps.take(bit)
+            if bit:
+                ps.pc = pc_true
+                ps.st.add_pc(cond)
+            else:
+                ps.pc = pc_false
+                ps.st.add_pc(z3.Not(cond))
+            return [ps]
+
+        other = ps.fork(pc_false)
+        ps.pc = pc_true
+        ps.st.add_pc(cond)
+        ps.take(1)
+        other.st.add_pc(z3.Not(cond))
+        other.take(0)
+        res = [s for s in (ps, other) if not s.st.is_empty()]
+        if len(res) == 2:
+            ps.depth += 1
+            other.depth += 1
+        return res
+
+    def _branch(self, ps, node):
+        cond = self.visit(node.stmt.cond, state=ps.st)
+        return self._split(ps, cond, node.succs[0], node.succs[1])
+
+    def _is_loop_free(self, node):
+        res = self._loop_free.get(node.id)
+        if res is None:
+            res = _loop_free(node.stmt)
+            self._loop_free[node.id] = res
+        return res
+
+    def _merge_if(self, ps, node):
+        """Executes an if up to its join point, merging the states there
+
+        The region between the if and its join is explored depth-first to
+        completion, so all states that reach the join are known at once.
+        Errors found on the way are reported as usual.
+        """
+        base = len(ps.st.path)
+        trail = ps.trail
+        depth = ps.depth
+        todo = self._branch(ps, node)
+        if len(todo) < 2:
+            return todo
+        arrived = []
+        while len(todo) > 0:
+            s = todo.pop()
+            if s.pc == node.join:
+                arrived.append(s)
+                continue
+            self.steps += 1
+            self.scheduler.visited(s.pc)
+            todo.extend(self.step(s))
+        if len(arrived) < 2:
+            return arrived
+        if not self._should_merge(arrived, node.join):
+            self.num_merges_refused += 1
+            return arrived
+        self.num_merges += 1
+        return [_merge(arrived, base, trail, depth, self._assign)]
+
+    def _should_merge(self, states, join):
+        """Query count estimation: is none of the differing variables hot?
+
+        A merged variable is an If term, so a branch on it is harder to
+        solve and likely forks the merged state again. Merging pays off
+        when the variables on which the states disagree are read by few
+        of the branches ahead; asserts cost one query either way.
+        """
+        counts = self._query_counts.get(join)
+        if counts is None:
+            counts = self.cfg.query_counts(join, self.loop_bound)
+            self._query_counts[join] = counts
+        total, per_var = counts
+        limit = self.merge_alpha * total
+        for name in _differing(states):
+            if per_var.get(name, 0) > limit:
+                return False
+        return True
+
+    def _loop(self, ps, node):
+        body, exit = node.succs
+        cond = self.visit(node.stmt.cond, state=ps.st)
+        iters = ps.loops.get(node.id, 0)
+        replaying = self._replaying(ps)
+        at_bound = iters >= self.bound_of(node.stmt)
+        if at_bound and not self._extends(iters, True):
+            # only the exit remains
+            if sym.is_concrete(cond):
+                if cond:
+                    self._cut(node.stmt)
+                    return []
+                ps.pc = exit
+                del ps.loops[node.id]
+                return [ps]
+            if not replaying:
+                ps.st.push()
+                ps.st.add_pc(cond)
+                if not ps.st.is_empty():
+                    self._cut(node.stmt)
+                ps.st.pop()
+            ps.pc = exit
+            ps.st.add_pc(z3.Not(cond))
+            del ps.loops[node.id]
+            if not replaying and ps.st.is_empty():
+                return []
+            return [ps]
+
+        res = self._split(ps, cond, body, exit)
+        if at_bound and not replaying and len(res) == 1 and res[0].pc == body:
+            if not sym.is_concrete(cond):
+                # the exit is no longer feasible, stop extending the bound
+                self._cut(node.stmt)
+                return []
+        for s in res:
+            if s.pc == body:
+                s.loops[node.id] = iters + 1
+            else:
+                s.loops.pop(node.id, None)
+        return res
+
+    def _defs(self, node):
+        return super(WorklistExec, self)._defs(node.stmt)
+
+    def _check_inv(self, ps, inv):
+        """Reports an error if inv may fail in ps"""
+        if self._replaying(ps):
+            return
+        if sym.is_concrete(inv):
+            if not inv:
+                self._error(ps.fork(ps.pc))
+            return
+        bad = ps.fork(ps.pc)
+        bad.st.add_pc(z3.Not(inv))
+        if not bad.st.is_empty():
+            self._error(bad)
+
+    def _inv_loop(self, ps, node):
+        body, exit = node.succs
+        self._check_inv(ps, self.visit(node.stmt.inv, state=ps.st))
+        for name in self._defs(node):
+            ps.st.env[name] = z3.FreshInt(name)
+        ps.st.add_pc(self.visit(node.stmt.inv, state=ps.st))
+        if not self._replaying(ps) and ps.st.is_empty():
+            return []
+        cond = self.visit(node.stmt.cond, state=ps.st)
+        return self._split(ps, cond, body, exit)
+
+    def _back(self, ps, node):
+        loop = node.stmt
+        if loop.inv is None:
+            return self._goto(ps, node)
+        # end of an arbitrary iteration, the invariant must be preserved
+        self._check_inv(ps, self.visit(loop.inv, state=ps.st))
+        return []
+
+    def visit_SkipStmt(self, node, *args, **kwargs):
+        return self._goto(kwargs["ps"], kwargs["cfg_node"])
+
+    def visit_PrintStateStmt(self, node, *args, **kwargs):
+        print(kwargs["state"])
+        return self._goto(kwargs["ps"], kwargs["cfg_node"])
+
+    def visit_AsgnStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        self._assign(st, node.lhs.name, self.visit(node.rhs, state=st))
+        return self._goto(kwargs["ps"], kwargs["cfg_node"])
+
+    def visit_HavocStmt(self, node, *args, **kwargs):
+        st = kwargs["state"]
+        for v in node.vars:
+            st.env[v.name] = z3.FreshInt(v.name)
+        return self._goto(kwargs["ps"], kwargs["cfg_node"])
+
+    def visit_AssumeStmt(self, node, *args, **kwargs):
+        ps = kwargs["ps"]
+        cond = self.visit(node.cond, state=ps.st)
+        if sym.is_concrete(cond):
+            return self._goto(ps, kwargs["cfg_node"]) if cond else []
+        ps.st.add_pc(cond)
+        if not self._replaying(ps) and ps.st.is_empty():
+            return []
+        return self._goto(ps, kwargs["cfg_node"])
+
+    def visit_AssertStmt(self, node, *args, **kwargs):
+        ps = kwargs["ps"]
+        cond = self.visit(node.cond, state=ps.st)
+        if sym.is_concrete(cond):
+            if cond:
+                return self._goto(ps, kwargs["cfg_node"])
+            self._error(ps)
+            return []
+        if self._replaying(ps):
+            ps.st.add_pc(cond)
+            return self._goto(ps, kwargs["cfg_node"])
+        bad = ps.fork(ps.pc)
+        bad.st.add_pc(z3.Not(cond))
+        if not bad.st.is_empty():
+            self._error(bad)
+        ps.st.add_pc(cond)
+        if ps.st.is_empty():
+            return []
+        return self._goto(ps, kwargs["cfg_node"])
@@ -29,15 +29,58 @@ from . import ast, int
 from functools import reduce
 
 
+class PathSolver(object):
+    """An incremental solver shared by all states of an exploration
+
+    The solver holds the path condition of the last state that was
+    checked, one push() frame per constraint. To check another state, only
+    the frames past the common prefix of the two path conditions are
+    popped and the new constraints pushed. Sibling states differ in their
+    last constraint, so a query usually costs one pop and one push, and
+    nothing has to be re-asserted when a state is forked.
+    """
+
+    def __init__(self, solver=None):
+        self._solver = solver
+        if self._solver is None:
+            self._solver = z3.Solver()
+        # the constraints currently asserted, one frame each
+        self._frames = []
+        self.num_queries = 0
+
+    def _sync(self, path):
+        frames = self._frames
+        n = min(len(frames), len(path))
+        i = 0
+        while i < n and frames[i] is path[i]:
+            i += 1
+        if i < len(frames):
+            self._solver.pop(len(frames) - i)
+            del frames[i:]
+        for exp in path[i:]:
+            self._solver.push()
+            self._solver.add(exp)
+            frames.append(exp)
+
+    def check(self, path):
+        self.num_queries += 1
+        self._sync(path)
+        return self._solver.check()
+
+    def model(self):
+        return self._solver.model()
+
+
 class SymState(object):
     def __init__(self, solver=None):
         # environment mapping variables to symbolic constants
         self.env = dict()
         # path condition
         self.path = list()
-        self._solver = solver
-        if self._solver is None:
-            self._solver = z3.Solver()
+        if isinstance(solver, PathSolver):
+            self._solver = solver
+        else:
+            self._solver = PathSolver(solver)
 
         # true if this is an error state
         self._is_error = False
@@ -45,7 +88,6 @@ class SymState(object):
     def add_pc(self, *exp):
         """Add constraints to the path condition"""
         self.path.extend(exp)
-        self._solver.append(exp)
 
     def is_error(self):
         return self._is_error
@@ -55,13 +97,13 @@ class SymState(object):
 
     def is_empty(self):
         """Check whether the current symbolic state has any concrete states"""
-        res = self._solver.check()
+        res = self._solver.check(self.path)
         return res == z3.unsat
 
     def pick_concerete(self):
         """Pick a concrete state consistent with the symbolic state.
            Return None if no such state exists"""
-        res = self._solver.check()
+        res = self._solver.check(self.path)
         if res != z3.sat:
             return None
         model = self._solver.model()
@@ -71,10 +113,14 @@ class SymState(object):
         return st
 
     def fork(self):
-        """Fork the current state into two identical states that can evolve separately"""
-        child = SymState()
+        """Fork the current state into two identical states that can evolve separately
+
+        The child shares the solver of the parent, so forking only copies
+        the lists of the environment and of the path condition.
+        """
+        child = SymState(self._solver)
         child.env = dict(self.env)
-        child.add_pc(*self.path)
+        child.path = list(self.path)
 
         return (self, child)
 
@@ -83,7 +129,9 @@ class SymState(object):
 
     def to_smt2(self):
         """Returns the current state as an SMT-LIB2 benchmark"""
-        return self._solver.to_smt2()
+        solver = z3.Solver()
+        solver.add(self.path)
+        return solver.to_smt2()
 
     def __str__(self):
         buf = io.StringIO()
@@ -100,8 +148,11 @@ class SymState(object):
 
 
 class SymExec(ast.AstVisitor):
-    def __init__(self):
-        pass
+    def __init__(self, loop_bound=10):
+        # number of iterations a loop is unrolled to
+        self.loop_bound = loop_bound
+        # map from condition of a loop to the number of paths cut at its bound
+        self.bound_hits = dict()
 
     def run(self, ast, state):
         # set things up and
@@ -205,7 +256,7 @@ class SymExec(ast.AstVisitor):
         updated_state = []
 
         i = 0
-        while i < 11:
+        while i <= self.loop_bound:
             i += 1
             new_state = []
             needBreak = True
@@ -223,6 +274,9 @@ class SymExec(ast.AstVisitor):
             curr_states = new_state
             if needBreak:
                 return updated_state
+        if len(curr_states) > 0:
+            key = str(node.cond)
+            self.bound_hits[key] = self.bound_hits.get(key, 0) + len(curr_states)
         return updated_state
 
     def visit_AssertStmt(self, node, *args, **kwargs):
@@ -271,10 +325,13 @@ class SymExec(ast.AstVisitor):
 
 def _parse_args():
     import argparse
+    import builtins
     ap = argparse.ArgumentParser(prog='sym',
                                  description='WLang Interpreter')
     ap.add_argument('in_file', metavar='FILE',
                     help='WLang program to interpret')
+    ap.add_argument('--loop-bound', type=builtins.int, default=10,
+                    metavar='N', help='Unroll loops at most N times')
     args = ap.parse_args()
     return args
 
@@ -283,7 +340,7 @@ def main():
     args = _parse_args()
     prg = ast.parse_file(args.in_file)
     st = SymState()
-    sym = SymExec()
+    sym = SymExec(args.loop_bound)
 
     states = sym.run(prg, st)
     if states is None:
@@ -295,6 +352,8 @@ def main():
             print('[symexec]: symbolic state reached')
             print(out)
         print('[symexec]: found', count, 'symbolic states')
+    for cond, n in sym.bound_hits.items():
+        print('[symexec]: loop on {} cut {} paths at its bound'.format(cond, n))
     return 0
 
 
@@ -174,3 +174,12 @@ class TestSym (unittest.TestCase):
         out = [s for s in engine.run(ast1, st)]
         self.assertEquals(len(out), 0)
 
+
+    def test_loop_bound(self):
+        prg1 = "havoc x; while x > 0 do x := x - 1"
+        ast1 = ast.parse_string(prg1)
+        engine = sym.SymExec(loop_bound=3)
+        st = sym.SymState()
+        out = [s for s in engine.run(ast1, st)]
+        self.assertEqual(len(out), 4)
+        self.assertEqual(list(engine.bound_hits.values()), [1])